@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+Page Cache Benchmark - cache policies vs. other processes' reads
+================================================================
+
+Description:
+    Streams a set of large files through hash_file() and fast_copy_file()
+    under each cache policy (keep, drop, direct) while a separate "victim"
+    process keeps re-reading its own working set, like a VM image or a
+    database sharing the NAS. Reported per policy:
+
+        stream_mb_s     hash + copy throughput of the tool
+        victim_mb_s     victim read throughput while the tool runs
+        victim_cached   fraction of the victim's file still in the page cache
+        stream_cached   fraction of the streamed files left in the page cache
+
+    Before each policy the streamed files and copies are evicted and the
+    victim's file is read once, so every policy starts from the same cache.
+    The victim only slows down once the stream outgrows free memory: pass
+    --stream-mb above the `available` column of `free -m` to see it.
+    Residency is measured with mincore() (Linux only).
+
+Usage:
+    python benchmarks/bench_cache.py
+    python benchmarks/bench_cache.py --stream-mb 8192 --victim-mb 512 --workdir /mnt/nas/tmp
+"""
+
+import os
+import sys
+import json
+import time
+import ctypes
+import shutil
+import tempfile
+import argparse
+import multiprocessing as mp
+from pathlib import Path
+from typing import Dict, List
+
+TOOLS_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(TOOLS_DIR / "lib"))
+
+import media_common  # noqa: E402
+from media_common import (  # noqa: E402
+    hash_file, fast_copy_file, set_cache_policy, CACHE_POLICIES, METRICS
+)
+
+MB = 1024 * 1024
+
+_libc = ctypes.CDLL(None, use_errno=True)
+_libc.mmap.restype = ctypes.c_void_p
+_libc.mmap.argtypes = [ctypes.c_void_p, ctypes.c_size_t, ctypes.c_int, ctypes.c_int,
+                       ctypes.c_int, ctypes.c_long]
+_libc.munmap.argtypes = [ctypes.c_void_p, ctypes.c_size_t]
+_libc.mincore.argtypes = [ctypes.c_void_p, ctypes.c_size_t, ctypes.c_char_p]
+
+
+def cached_fraction(paths: List[Path]) -> float:
+    """Fraction of the pages of `paths` resident in the page cache (mincore)."""
+    page = os.sysconf('SC_PAGE_SIZE')
+    total = resident = 0
+    for path in paths:
+        size = path.stat().st_size
+        if not size:
+            continue
+        fd = os.open(path, os.O_RDONLY)
+        try:
+            addr = _libc.mmap(None, size, 1, 1, fd, 0)  # PROT_READ, MAP_SHARED
+            if addr in (None, ctypes.c_void_p(-1).value):
+                raise OSError(ctypes.get_errno(), "mmap failed")
+            try:
+                pages = (size + page - 1) // page
+                vec = ctypes.create_string_buffer(pages)
+                if _libc.mincore(addr, size, vec) != 0:
+                    raise OSError(ctypes.get_errno(), "mincore failed")
+                resident += sum(b & 1 for b in vec.raw)
+                total += pages
+            finally:
+                _libc.munmap(addr, size)
+        finally:
+            os.close(fd)
+    return resident / total if total else 0.0
+
+
+def evict(paths: List[Path]):
+    """Drop the clean cached pages of `paths` (writes them back first)."""
+    for path in paths:
+        fd = os.open(path, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+        finally:
+            os.close(fd)
+
+
+def write_file(path: Path, size_mb: int):
+    block = os.urandom(MB)
+    with open(path, 'wb') as f:
+        for _ in range(size_mb):
+            f.write(block)
+
+
+def victim(path: str, stop, results):
+    """Re-read `path` front to back until stopped; report MB/s."""
+    buf = bytearray(MB)
+    read = 0
+    start = time.perf_counter()
+    with open(path, 'rb', buffering=0) as f:
+        while not stop.is_set():
+            f.seek(0)
+            while n := f.readinto(buf):
+                read += n
+                if stop.is_set():
+                    break
+    results.put(read / MB / (time.perf_counter() - start))
+
+
+def run_policy(policy: str, stream: List[Path], victim_file: Path, copy_dir: Path) -> Dict:
+    copies = [copy_dir / p.name for p in stream]
+    for c in copies:
+        if c.exists():
+            c.unlink()
+    evict(stream)
+    with open(victim_file, 'rb') as f:  # Warm the victim's working set
+        while f.read(MB):
+            pass
+
+    set_cache_policy(policy)
+    METRICS.reset()
+    stop, results = mp.Event(), mp.Queue()
+    proc = mp.Process(target=victim, args=(str(victim_file), stop, results))
+    proc.start()
+    time.sleep(0.2)
+    start = time.perf_counter()
+    for src, dst in zip(stream, copies):
+        hash_file(src)
+        fast_copy_file(src, dst)
+    seconds = time.perf_counter() - start
+    stop.set()
+    victim_mb_s = results.get()
+    proc.join()
+
+    counters = METRICS.phases['startup'].counters
+    result = {
+        'stream_mb_s': round(2 * sum(p.stat().st_size for p in stream) / MB / seconds, 1),
+        'victim_mb_s': round(victim_mb_s, 1),
+        'victim_cached': round(cached_fraction([victim_file]), 3),
+        'stream_cached': round(cached_fraction(stream + copies), 3),
+        'dropped_mb': round(counters.get('cache_dropped_bytes', 0) / MB),
+        'direct_io_files': counters.get('direct_io_files', 0),
+    }
+    for c in copies:
+        c.unlink()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Page cache policy benchmark")
+    parser.add_argument("--stream-mb", type=int, default=2048, help="Total size of streamed files (default: 2048)")
+    parser.add_argument("--file-mb", type=int, default=512, help="Size of each streamed file (default: 512)")
+    parser.add_argument("--victim-mb", type=int, default=256, help="Victim working set (default: 256)")
+    parser.add_argument("--policies", default=",".join(CACHE_POLICIES),
+                        help=f"Comma-separated subset of: {', '.join(CACHE_POLICIES)} (default: all)")
+    parser.add_argument("--workdir", help="Directory for the test files (default: a temporary directory)")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    if not sys.platform.startswith('linux'):
+        parser.error("mincore()/posix_fadvise() residency checks need Linux")
+    policies = [p.strip() for p in args.policies.split(",")]
+    unknown = [p for p in policies if p not in CACHE_POLICIES]
+    if unknown:
+        parser.error(f"Unknown policies: {', '.join(unknown)}")
+
+    workdir = Path(tempfile.mkdtemp(prefix="media-cache-", dir=args.workdir))
+    try:
+        print(f"Writing {args.stream_mb:,} MB of stream files and a {args.victim_mb} MB victim "
+              f"in {workdir}...", file=sys.stderr)
+        stream = []
+        for i in range(max(1, args.stream_mb // args.file_mb)):
+            stream.append(workdir / f"stream_{i:03d}.bin")
+            write_file(stream[-1], args.file_mb)
+        victim_file = workdir / "victim.bin"
+        write_file(victim_file, args.victim_mb)
+        copy_dir = workdir / "copies"
+        copy_dir.mkdir()
+
+        results = {}
+        for policy in policies:
+            print(f"Running {policy}...", file=sys.stderr)
+            results[policy] = run_policy(policy, stream, victim_file, copy_dir)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {'stream_mb': args.stream_mb, 'victim_mb': args.victim_mb,
+              'direct_io_threshold_mb': media_common.DIRECT_IO_THRESHOLD // MB, 'results': results}
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(f"{'policy':8} {'stream MB/s':>12} {'victim MB/s':>12} {'victim cached':>14} "
+              f"{'stream cached':>14} {'dropped MB':>11}")
+        for policy, r in results.items():
+            print(f"{policy:8} {r['stream_mb_s']:>12} {r['victim_mb_s']:>12} {r['victim_cached']:>14.1%} "
+                  f"{r['stream_cached']:>14.1%} {r['dropped_mb']:>11}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Date Parsing Benchmark - parse_exif_date() vs strptime
+======================================================
+
+Description:
+    Times media_common.parse_exif_date() / parse_exif_dates() against the
+    strptime-based parsing media-manager (MediaFile.read_metadata) and
+    timestamp sync (parse_date) used before, on synthetic ExifTool date
+    strings: plain, with sub-seconds, with UTC offsets and with 'Z'.
+    The day and offset caches are cleared before every run, so each run pays
+    for its first sight of every value like a real tool run does.
+
+    Also checks that both parsers agree wherever strptime succeeds (the old
+    media-manager path rejects sub-second values; those are reported).
+
+Usage:
+    python benchmarks/bench_dates.py
+    python benchmarks/bench_dates.py --values 500000 --json
+"""
+
+import sys
+import json
+import time
+import random
+import calendar
+import argparse
+from datetime import datetime
+from pathlib import Path
+
+TOOLS_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(TOOLS_DIR / "lib"))
+
+import media_common  # noqa: E402
+from media_common import parse_exif_date, parse_exif_dates  # noqa: E402
+
+
+def synthetic_dates(count: int, seed: int = 42):
+    """ExifTool-style date strings over 12 years, in the mix seen in libraries."""
+    rng = random.Random(seed)
+    base = calendar.timegm((2012, 1, 1, 0, 0, 0))
+    values = []
+    for _ in range(count):
+        text = time.strftime("%Y:%m:%d %H:%M:%S", time.gmtime(base + rng.randrange(12 * 365 * 86400)))
+        kind = rng.random()
+        if kind < 0.10:
+            text += ".%03d" % rng.randrange(1000)                    # SubSecDateTimeOriginal
+        elif kind < 0.25:
+            text += "%+03d:00" % rng.choice([-8, -5, 0, 1, 2, 9])    # OffsetTime / QuickTime
+        elif kind < 0.30:
+            text += "Z"
+        values.append(text)
+    return values
+
+
+def legacy_media_manager(value):
+    """MediaFile.read_metadata() before parse_exif_date()."""
+    try:
+        clean_val = str(value).split('+')[0].replace('Z', '').strip()
+        return datetime.strptime(clean_val, "%Y:%m:%d %H:%M:%S")
+    except (ValueError, TypeError):
+        return None
+
+
+def legacy_timestamp_sync(value):
+    """sync_timestamps.parse_date() before parse_exif_date()."""
+    try:
+        clean_str = value.split('.')[0].split('+')[0].split('-')[0].strip()
+        return datetime.strptime(clean_str, "%Y:%m:%d %H:%M:%S")
+    except ValueError:
+        return None
+
+
+def best_of(fn, runs: int) -> float:
+    best = float('inf')
+    for _ in range(runs):
+        media_common._EXIF_DAYS.clear()
+        media_common._EXIF_OFFSETS.clear()
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ExifTool date parsing benchmark")
+    parser.add_argument("--values", type=int, default=200_000, help="Date strings (default: 200000)")
+    parser.add_argument("--runs", type=int, default=5, help="Runs per parser (best is kept, default: 5)")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    values = synthetic_dates(args.values)
+
+    # Agreement: wall-clock seconds must match wherever strptime parsed the value
+    mismatches = rejected = 0
+    for value, parsed in zip(values, parse_exif_dates(values)):
+        old = legacy_timestamp_sync(value)
+        if old is None or legacy_media_manager(value) is None:
+            rejected += 1
+        if old is not None and (parsed is None or parsed[0] != calendar.timegm(old.timetuple())):
+            mismatches += 1
+
+    timings = {
+        'strptime_media_manager': best_of(lambda: [legacy_media_manager(v) for v in values], args.runs),
+        'strptime_timestamp_sync': best_of(lambda: [legacy_timestamp_sync(v) for v in values], args.runs),
+        'parse_exif_date': best_of(lambda: [parse_exif_date(v) for v in values], args.runs),
+        'parse_exif_dates': best_of(lambda: parse_exif_dates(values), args.runs),
+    }
+    baseline = timings['strptime_timestamp_sync']
+    results = {
+        'values': args.values,
+        'ns_per_value': {name: round(s / args.values * 1e9) for name, s in timings.items()},
+        'speedup_vs_strptime': {name: round(baseline / s, 1) for name, s in timings.items()},
+        'mismatches': mismatches,
+        'rejected_by_old_parsers': rejected,
+    }
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(f"{'parser':26} {'ns/value':>9} {'speedup':>8}")
+        for name in timings:
+            print(f"{name:26} {results['ns_per_value'][name]:>9} {results['speedup_vs_strptime'][name]:>7}x")
+        print(f"Mismatches: {mismatches}; values an old parser rejected: {rejected:,}")
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Memory Benchmark - MediaFile record layout
+==========================================
+
+Description:
+    Measures the memory cost per file of media-manager's MediaFile records
+    (what MediaEngine.files keeps alive for the whole run) against the
+    previous layout (instance __dict__, Path, datetime, keyword set and hex
+    digest), and times Phase 3 grouping over the size and digest columns.
+    No files are read: records are built from synthetic stat results.
+
+Usage:
+    python benchmarks/bench_memory.py
+    python benchmarks/bench_memory.py --files 1000000 --json
+"""
+
+import sys
+import os
+import json
+import time
+import random
+import hashlib
+import argparse
+import tracemalloc
+import importlib.util
+from array import array
+from collections import defaultdict
+from datetime import datetime
+from pathlib import Path
+
+TOOLS_DIR = Path(__file__).resolve().parent.parent
+
+
+def load_media_manager():
+    """Import media-manager.py (hyphenated, so not importable by name)."""
+    sys.path.insert(0, str(TOOLS_DIR))
+    spec = importlib.util.spec_from_file_location("media_manager", TOOLS_DIR / "media-manager.py")
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+class LegacyMediaFile:
+    """The pre-columnar MediaFile attribute layout (for comparison only)."""
+    def __init__(self, path: Path, st: os.stat_result):
+        self.path = path
+        self.hash = ""
+        self.hash_algo = "sha256"
+        self.size = st.st_size
+        self.identity = (st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns)
+        self.dev = st.st_dev
+        self.inode_key = (st.st_dev, st.st_ino)
+        self.dt = datetime.fromtimestamp(st.st_mtime)
+        self.make = ""
+        self.model = ""
+        self.is_video = False
+        self.is_raw = False
+        self.keywords = set()
+        self.rating = 0
+        self.width = 0
+        self.height = 0
+        self.correct_ext = path.suffix.lower()
+        self.xmp_path = None
+        self.paired_path = None
+
+
+def synthetic_library(count: int, seed: int = 42):
+    """Yield (path, stat, digest, keywords) like a real photo library."""
+    rng = random.Random(seed)
+    vocabulary = [f"keyword{i}" for i in range(500)]
+    cameras = [("sony", "ilce_7_rm_3"), ("canon", "eos_r5"), ("apple", "iphone_14_pro")]
+    base = time.time() - 10 * 365 * 86400
+    for i in range(count):
+        folder = f"/mnt/photos/{2014 + i % 10}/{1 + i % 12:02d}/event{i // 400}"
+        path = f"{folder}/IMG_{i:07d}.jpg"
+        size = rng.randrange(500_000, 12_000_000) if i % 20 else 4_000_000  # Some size collisions
+        mtime = base + i * 300
+        st = os.stat_result((0o100644, 100_000 + i, 2049, 1, 1000, 1000, size,
+                             int(mtime), int(mtime), int(mtime)))
+        digest = hashlib.sha256(str(i // 50 if i % 50 == 0 else i).encode()).hexdigest()
+        keywords = rng.sample(vocabulary, rng.randrange(0, 4))
+        yield path, st, digest, keywords, cameras[i % len(cameras)]
+
+
+def measure(build, count: int):
+    """Traced memory per record (bytes) still held by the result of build()."""
+    tracemalloc.start()
+    records = build()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return records, current / count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="MediaFile memory benchmark")
+    parser.add_argument("--files", type=int, default=200_000, help="Synthetic records (default: 200000)")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    mm = load_media_manager()
+    library = list(synthetic_library(args.files))
+
+    def build_legacy():
+        files = []
+        for path, st, digest, keywords, (make, model) in library:
+            f = LegacyMediaFile(Path(path), st)
+            f.hash = digest
+            f.keywords = set(keywords)
+            f.make, f.model = make, model
+            files.append(f)
+        return files
+
+    def build_compact():
+        files = []
+        for path, st, digest, keywords, (make, model) in library:
+            f = mm.MediaFile(path, st)
+            f.digest = bytes.fromhex(digest)
+            f.keywords = keywords
+            f.make, f.model = sys.intern(make), sys.intern(model)
+            files.append(f)
+        return files
+
+    legacy, legacy_bytes = measure(build_legacy, args.files)
+    compact, compact_bytes = measure(build_compact, args.files)
+
+    # Phase 3 grouping: dict-of-lists (old) vs sort/unique over columns (new)
+    start = time.perf_counter()
+    by_size = defaultdict(list)
+    by_hash = defaultdict(list)
+    for f in legacy:
+        by_size[f.size].append(f)
+        by_hash[f.hash].append(f)
+    legacy_groups = sorted(by_hash.values(), key=lambda g: g[0].dt)
+    legacy_group_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    size_groups = mm.group_indices(array('q', (f.size for f in compact)))
+    hash_groups = mm.group_indices([f.digest for f in compact])
+    compact_groups = sorted(hash_groups, key=lambda rows: compact[rows[0]].timestamp)
+    compact_group_s = time.perf_counter() - start
+
+    assert len(legacy_groups) == len(compact_groups) and len(by_size) == len(size_groups)
+
+    results = {
+        "files": args.files,
+        "legacy_bytes_per_file": round(legacy_bytes),
+        "compact_bytes_per_file": round(compact_bytes),
+        "legacy_total_mb": round(legacy_bytes * args.files / 1e6, 1),
+        "compact_total_mb": round(compact_bytes * args.files / 1e6, 1),
+        "reduction": round(1 - compact_bytes / legacy_bytes, 3),
+        "legacy_grouping_s": round(legacy_group_s, 3),
+        "compact_grouping_s": round(compact_group_s, 3),
+        "groups": len(compact_groups),
+    }
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        for key, value in results.items():
+            print(f"{key:24} {value}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Startup Benchmark - time to argument parsing
+============================================
+
+Description:
+    Measures how long each tool takes from process launch until argparse
+    runs (what the PowerShell menus pay on every launch), and checks that
+    `--help` creates no files (logs, configs, caches) in the tools tree.
+
+    Every run launches a fresh interpreter on a small `-c` bootstrap that
+    imports nothing the interpreter has not already loaded, hooks argparse
+    as the tool imports it and then runs the tool script; when the tool calls parse_args() the child prints the
+    wall clock and exits. The time is taken from just before the launch, so
+    the interpreter start and every import the tool pays (argparse
+    included) are counted. Reported per tool (best of N runs, milliseconds):
+
+        python_ms   bare interpreter start, measured the same way
+        startup_ms  launch to parse_args() (compared to --target-ms)
+        imports_ms  startup_ms - python_ms (the tool's own share)
+        help_ms     full `--help` run including exit
+
+    Bytecode is written on a warm-up run first, like an installed copy.
+
+Usage:
+    python benchmarks/bench_startup.py
+    python benchmarks/bench_startup.py --runs 20 --json
+    python benchmarks/bench_startup.py --tools media_manager,scrubber --target-ms 80
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+BENCH_DIR = Path(__file__).resolve().parent
+TOOLS_DIR = BENCH_DIR.parent
+
+TOOL_FILES = {
+    'media_manager': TOOLS_DIR / "media-manager.py",
+    'scrubber': TOOLS_DIR / "metadata-scrubber" / "metadata-scrubber.py",
+    'sidecar': TOOLS_DIR / "xmp-sidecar" / "xmp-sidecar.py",
+    'sync': TOOLS_DIR / "timestamp-sync" / "sync_timestamps.py",
+}
+
+DEFAULT_TARGET_MS = 100.0
+
+
+# Child bootstrap: imports only what the interpreter has loaded at start.
+# argv[1] is the tool script, or empty for the bare interpreter baseline.
+BOOTSTRAP = r"""
+import os, sys, time
+def stop(*args, **kwargs):
+    sys.stdout.write(repr(time.time()) + "\n")
+    sys.stdout.flush()
+    os._exit(0)
+class Hook:
+    def find_spec(self, name, path=None, target=None):
+        if name != "argparse":
+            return None
+        sys.meta_path.remove(self)
+        for finder in sys.meta_path:
+            spec = finder.find_spec(name, path, target)
+            if spec is not None:
+                break
+        exec_module = spec.loader.exec_module
+        def patched(module):
+            exec_module(module)
+            module.ArgumentParser.parse_args = module.ArgumentParser.parse_known_args = stop
+        spec.loader.exec_module = patched
+        return spec
+path = sys.argv[1]
+if not path:
+    stop()
+sys.meta_path.insert(0, Hook())
+sys.argv = [path, "--help"]
+sys.path[0] = os.path.dirname(path)
+with open(path, "rb") as f:
+    code = compile(f.read(), path, "exec")
+exec(code, {"__name__": "__main__", "__file__": path, "__builtins__": __builtins__})
+"""
+
+
+def launch_to_parse(tool_path: str, env: Dict[str, str]) -> Optional[float]:
+    """Seconds from launching the bootstrap until it reaches parse_args()."""
+    start = time.time()
+    proc = subprocess.run([sys.executable, "-c", BOOTSTRAP, tool_path], env=env, stdout=subprocess.PIPE,
+                          stderr=subprocess.DEVNULL, stdin=subprocess.DEVNULL, text=True)
+    try:
+        return float(proc.stdout.strip().splitlines()[-1]) - start
+    except (IndexError, ValueError):
+        return None
+
+
+def timed_run(cmd: List[str], env: Dict[str, str]) -> Tuple[float, str]:
+    start = time.perf_counter()
+    proc = subprocess.run(cmd, env=env, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                          stdin=subprocess.DEVNULL, text=True)
+    return time.perf_counter() - start, proc.stdout
+
+
+def tree_files() -> Set[str]:
+    """Every path under the tools tree, minus bytecode caches."""
+    return {os.path.join(root, name)
+            for root, dirs, files in os.walk(TOOLS_DIR)
+            if '__pycache__' not in root
+            for name in dirs + files
+            if name != '__pycache__'}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tool startup benchmark")
+    parser.add_argument("--tools", default="all",
+                        help=f"Comma-separated subset of: {', '.join(TOOL_FILES)} (default: all)")
+    parser.add_argument("--runs", type=int, default=10, help="Runs per measurement (best is kept, default: 10)")
+    parser.add_argument("--target-ms", type=float, default=DEFAULT_TARGET_MS,
+                        help=f"Startup budget in ms (default: {DEFAULT_TARGET_MS:.0f})")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    tools = list(TOOL_FILES) if args.tools == "all" else [t.strip() for t in args.tools.split(",")]
+    unknown = [t for t in tools if t not in TOOL_FILES]
+    if unknown:
+        parser.error(f"Unknown tools: {', '.join(unknown)}")
+
+    env = dict(os.environ)
+    env.pop("PYTHONDONTWRITEBYTECODE", None)
+    python_s = min(launch_to_parse("", env) for _ in range(args.runs))
+
+    before = tree_files()
+    results = {}
+    for tool in tools:
+        help_cmd = [sys.executable, str(TOOL_FILES[tool]), "--help"]
+        timed_run(help_cmd, env)  # Warm-up: writes bytecode for the shared library
+        startups = [launch_to_parse(str(TOOL_FILES[tool]), env) for _ in range(args.runs)]
+        if None in startups:
+            results[tool] = {'error': "tool exited without parsing arguments"}
+            continue
+        help_s = min(timed_run(help_cmd, env)[0] for _ in range(args.runs))
+        startup_ms = min(startups) * 1000
+        results[tool] = {
+            'python_ms': round(python_s * 1000, 1),
+            'imports_ms': round(startup_ms - python_s * 1000, 1),
+            'startup_ms': round(startup_ms, 1),
+            'help_ms': round(help_s * 1000, 1),
+            'within_target': startup_ms <= args.target_ms,
+        }
+    created = sorted(tree_files() - before)
+
+    report = {'target_ms': args.target_ms, 'runs': args.runs, 'results': results,
+              'created_files': [os.path.relpath(p, TOOLS_DIR) for p in created]}
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(f"{'tool':16} {'python':>8} {'imports':>8} {'startup':>8} {'--help':>8}")
+        for tool, r in results.items():
+            if 'error' in r:
+                print(f"{tool:16} ERROR: {r['error']}")
+                continue
+            flag = "" if r['within_target'] else f"  over {args.target_ms:.0f} ms target"
+            print(f"{tool:16} {r['python_ms']:>8} {r['imports_ms']:>8} {r['startup_ms']:>8} {r['help_ms']:>8}{flag}")
+        print(f"Files created by --help: {', '.join(report['created_files']) or 'none'}")
+
+    ok = all(r.get('within_target') for r in results.values()) and not created
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Synthetic Media Corpus Generator
+================================
+
+Description:
+    Builds a reproducible fake photo library for benchmarks: the same seed
+    and settings always produce the same tree, file names, sizes and bytes.
+    Files carry random content (so hashing and sampling behave like real
+    media) behind a format-appropriate header; metadata is supplied by the
+    stub ExifTool (stub_exiftool.py), which derives it from file names.
+
+Usage:
+    python benchmarks/corpus.py /tmp/corpus --files 2000 --median-kb 2048
+    python benchmarks/corpus.py /tmp/corpus --dup-ratio 0.2 --raw-ratio 0.3 --sidecar-ratio 0.1
+"""
+
+import sys
+import json
+import math
+import random
+import argparse
+from pathlib import Path
+from typing import Dict
+
+# Extensions per kind (all recognized by media_common.ALL_MEDIA_EXTENSIONS)
+JPEG_EXTENSIONS = ['.jpg', '.jpg', '.jpg', '.heic']
+RAW_EXTENSIONS = ['.cr2', '.arw', '.nef', '.dng']
+VIDEO_EXTENSIONS = ['.mp4', '.mov']
+
+HEADERS = {
+    '.jpg': b'\xff\xd8\xff\xe1', '.heic': b'\x00\x00\x00\x18ftypheic',
+    '.cr2': b'II*\x00\x10\x00\x00\x00CR', '.arw': b'II*\x00', '.nef': b'MM\x00*', '.dng': b'II*\x00',
+    '.mp4': b'\x00\x00\x00\x18ftypmp42', '.mov': b'\x00\x00\x00\x14ftypqt  ',
+}
+
+SIDECAR = ('<?xpacket begin="" id="W5M0MpCehiHzreSzNTczkc9d"?>\n'
+           '<x:xmpmeta xmlns:x="adobe:ns:meta/"><rdf:RDF xmlns:rdf="http://www.w3.org/1999/02/22-rdf-syntax-ns#">'
+           '<rdf:Description xmlns:xmp="http://ns.adobe.com/xap/1.0/" xmp:Rating="{rating}"/>'
+           '</rdf:RDF></x:xmpmeta>\n<?xpacket end="w"?>\n')
+
+
+def generate_corpus(root: Path, files: int = 1000, seed: int = 42, median_kb: int = 1024,
+                    max_kb: int = 32 * 1024, sigma: float = 0.8, dup_ratio: float = 0.1,
+                    raw_ratio: float = 0.2, video_ratio: float = 0.05, sidecar_ratio: float = 0.1,
+                    files_per_folder: int = 200) -> Dict:
+    """
+    Write a synthetic library under root.
+
+    Args:
+        root: Target directory (created; must be empty or missing)
+        files: Number of media files
+        seed: RNG seed (same seed + settings = identical corpus)
+        median_kb / max_kb / sigma: Log-normal size distribution, capped at max_kb
+        dup_ratio: Fraction of files that are byte-identical copies of earlier files
+        raw_ratio / video_ratio: Fractions of RAW and video files (rest are JPEG/HEIC)
+        sidecar_ratio: Fraction of media files that get an .xmp sidecar
+        files_per_folder: Files per event folder (folders are grouped per year)
+
+    Returns:
+        Manifest dict (counts and byte totals), also written to root/corpus.json
+    """
+    root = Path(root)
+    root.mkdir(parents=True, exist_ok=True)
+    if any(root.iterdir()):
+        raise FileExistsError(f"Corpus directory is not empty: {root}")
+
+    rng = random.Random(seed)
+    written = []  # (path, ext, size) of original files, for duplicates
+    manifest = {"seed": seed, "files": 0, "bytes": 0, "duplicates": 0, "raw": 0,
+                "video": 0, "sidecars": 0, "folders": 0}
+    folders = set()
+
+    for i in range(files):
+        folder = root / str(2012 + (i // files_per_folder) % 12) / f"event_{i // files_per_folder:04d}"
+        if folder not in folders:
+            folder.mkdir(parents=True, exist_ok=True)
+            folders.add(folder)
+
+        if written and rng.random() < dup_ratio:
+            source, ext, size = written[rng.randrange(len(written))]
+            path = folder / f"DUP_{i:07d}{ext}"
+            with open(source, 'rb') as src, open(path, 'wb') as dst:
+                dst.write(src.read())
+            manifest["duplicates"] += 1
+        else:
+            kind = rng.random()
+            if kind < video_ratio:
+                ext = rng.choice(VIDEO_EXTENSIONS)
+                scale = 8  # Videos are much larger than stills
+                manifest["video"] += 1
+            elif kind < video_ratio + raw_ratio:
+                ext = rng.choice(RAW_EXTENSIONS)
+                scale = 3
+                manifest["raw"] += 1
+            else:
+                ext = rng.choice(JPEG_EXTENSIONS)
+                scale = 1
+            size_kb = min(max_kb, max(4, int(math.exp(rng.gauss(math.log(median_kb * scale), sigma)))))
+            size = size_kb * 1024
+            path = folder / f"IMG_{i:07d}{ext}"
+            header = HEADERS.get(ext, b'')
+            with open(path, 'wb') as f:
+                f.write(header)
+                remaining = size - len(header)
+                while remaining > 0:
+                    chunk = min(remaining, 1024 * 1024)
+                    f.write(rng.randbytes(chunk))
+                    remaining -= chunk
+            written.append((path, ext, size))
+
+        if rng.random() < sidecar_ratio:
+            path.with_suffix('.xmp').write_text(SIDECAR.format(rating=rng.randrange(6)), encoding='utf-8')
+            manifest["sidecars"] += 1
+
+        manifest["files"] += 1
+        manifest["bytes"] += size
+
+    manifest["folders"] = len(folders)
+    (root / "corpus.json").write_text(json.dumps(manifest, indent=2), encoding='utf-8')
+    return manifest
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic media corpus")
+    parser.add_argument("root", help="Target directory (must be empty or missing)")
+    parser.add_argument("--files", type=int, default=1000, help="Media files (default: 1000)")
+    parser.add_argument("--seed", type=int, default=42, help="RNG seed (default: 42)")
+    parser.add_argument("--median-kb", type=int, default=1024, help="Median JPEG size in KB (default: 1024)")
+    parser.add_argument("--max-kb", type=int, default=32 * 1024, help="Largest file in KB (default: 32768)")
+    parser.add_argument("--dup-ratio", type=float, default=0.1, help="Duplicate copies (default: 0.1)")
+    parser.add_argument("--raw-ratio", type=float, default=0.2, help="RAW files (default: 0.2)")
+    parser.add_argument("--video-ratio", type=float, default=0.05, help="Video files (default: 0.05)")
+    parser.add_argument("--sidecar-ratio", type=float, default=0.1, help="Files with .xmp sidecars (default: 0.1)")
+    args = parser.parse_args()
+
+    if sys.version_info < (3, 9):
+        parser.error("Python 3.9+ required (random.randbytes)")
+
+    manifest = generate_corpus(Path(args.root), args.files, args.seed, args.median_kb, args.max_kb,
+                               dup_ratio=args.dup_ratio, raw_ratio=args.raw_ratio,
+                               video_ratio=args.video_ratio, sidecar_ratio=args.sidecar_ratio)
+    print(json.dumps(manifest, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,327 @@
+#!/usr/bin/env python3
+"""
+Media Tools Benchmark Harness
+=============================
+
+Description:
+    Generates a synthetic corpus (corpus.py), puts a stub ExifTool
+    (stub_exiftool.py) first on PATH and times each tool on its own copy of
+    the corpus, each in a fresh process:
+
+        media_manager  MediaEngine phases (scan/hash/metadata, grouping, planning, actions)
+        scrubber       run_scrubber() in place
+        sidecar        export_metadata()
+        sync           timestamp sync main() (read, analyze, write)
+
+    Results are printed as JSON: per-phase seconds, files/s, MB/s and peak
+    RSS (the tool process and its largest child, e.g. an ExifTool stub).
+
+    Tools run from the working directory with their logs, configs and
+    caches redirected there and the media catalog off; the run fails if
+    `git status` shows it changed anything in the tools tree.
+    Linux/macOS only (the stub is installed as a shell shim, tools that use
+    process pools are run with the 'fork' start method).
+
+Usage:
+    python benchmarks/run_benchmarks.py
+    python benchmarks/run_benchmarks.py --files 5000 --workers 8 --latency-ms 2 --output results.json
+    python benchmarks/run_benchmarks.py --tools media_manager --mm-args "--mode organize --execute"
+"""
+
+import os
+import sys
+import json
+import time
+import shlex
+import shutil
+import tempfile
+import argparse
+import subprocess
+import importlib.util
+import multiprocessing as mp
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Set
+
+BENCH_DIR = Path(__file__).resolve().parent
+TOOLS_DIR = BENCH_DIR.parent
+sys.path.insert(0, str(BENCH_DIR))
+
+from corpus import generate_corpus  # noqa: E402
+
+TOOL_FILES = {
+    'media_manager': TOOLS_DIR / "media-manager.py",
+    'scrubber': TOOLS_DIR / "metadata-scrubber" / "metadata-scrubber.py",
+    'sidecar': TOOLS_DIR / "xmp-sidecar" / "xmp-sidecar.py",
+    'sync': TOOLS_DIR / "timestamp-sync" / "sync_timestamps.py",
+}
+
+DEFAULT_MM_ARGS = "--mode deduplicate --execute --no-hash-cache --no-catalog"
+
+# =============================================================================
+# HELPERS
+# =============================================================================
+
+def install_stub(bin_dir: Path) -> Path:
+    """Create an `exiftool` shim in bin_dir that runs stub_exiftool.py."""
+    bin_dir.mkdir(parents=True, exist_ok=True)
+    shim = bin_dir / "exiftool"
+    shim.write_text(f'#!/bin/sh\nexec "{sys.executable}" "{BENCH_DIR / "stub_exiftool.py"}" "$@"\n')
+    shim.chmod(0o755)
+    return shim
+
+
+def load_tool(name: str, state_dir: Path):
+    """
+    Import a tool script by path (several have hyphenated names).
+
+    The logs, configs and caches the tools keep next to themselves
+    (logs/, configs/, cache/exiftool.json, the default catalog) are sent
+    to state_dir, so a run leaves the source tree untouched.
+    """
+    path = TOOL_FILES[name]
+    sys.path.insert(0, str(path.parent))
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+
+    state_dir.mkdir(parents=True, exist_ok=True)
+    common = sys.modules['lib.media_common']
+    common.EXIFTOOL_CACHE_FILE = state_dir / "cache" / "exiftool.json"
+    common.CATALOG_FILE = state_dir / "cache" / "catalog.db"
+    setup_logging = common.setup_logging
+    module.setup_logging = lambda tool, _log_dir, *args, **kwargs: setup_logging(
+        tool, state_dir / "logs", *args, **kwargs)
+    if hasattr(module, 'config_dir'):
+        module.config_dir = state_dir / "configs"
+    return module
+
+
+def tree_status() -> Optional[Set[str]]:
+    """`git status` entries under the tools tree (None outside a git checkout)."""
+    try:
+        proc = subprocess.run(["git", "status", "--porcelain", "--untracked-files=all", "--", "."],
+                              cwd=TOOLS_DIR, capture_output=True, text=True, check=True)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return set(proc.stdout.splitlines())
+
+
+class PhaseTimer:
+    """Accumulates wall time of wrapped functions into named phases."""
+
+    def __init__(self):
+        self.phases: Dict[str, float] = {}
+
+    def wrap(self, owner, attr: str, phase: str):
+        fn = getattr(owner, attr)
+
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self.phases[phase] = self.phases.get(phase, 0.0) + time.perf_counter() - start
+        setattr(owner, attr, timed)
+
+    def run(self, fn: Callable, remainder: str) -> float:
+        """Time fn(); time not covered by wrapped phases goes to `remainder`."""
+        start = time.perf_counter()
+        fn()
+        total = time.perf_counter() - start
+        self.phases[remainder] = max(0.0, total - sum(self.phases.values()))
+        return total
+
+
+def peak_rss_mb() -> Dict[str, float]:
+    """Peak RSS of this process and of its largest child, in MB."""
+    try:
+        import resource
+    except ImportError:
+        return {}
+    scale = 1 if sys.platform == 'darwin' else 1024  # macOS reports bytes, Linux KB
+    return {
+        'self': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale / 1e6, 1),
+        'children': round(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * scale / 1e6, 1),
+    }
+
+# =============================================================================
+# PER-TOOL BENCHMARKS (run inside the worker process)
+# =============================================================================
+
+def bench_media_manager(root: Path, state_dir: Path, workers: int, mm_args: List[str]) -> PhaseTimer:
+    mm = load_tool('media_manager', state_dir)
+    # Caches land in state_dir unless mm_args disables them (the default does)
+    sys.argv = ['media-manager.py', str(root), '--dest', str(root) + "_organized",
+                '--journal', str(state_dir / "journal.jsonl"), '--copy-workers', str(workers),
+                '--hash-cache', str(state_dir / "hash_cache.db"),
+                '--catalog', str(state_dir / "catalog.db")] + mm_args
+    args = mm.parse_arguments()
+    args.dry_run = not args.execute
+    engine = mm.MediaEngine(args)
+
+    timer = PhaseTimer()
+    timer.wrap(engine, 'process', 'scan_hash_metadata')
+    timer.wrap(engine, '_group_staged', 'group')
+    timer.wrap(engine, '_group_by_hash', 'group')
+    timer.wrap(engine, '_merge_near_duplicates', 'near_duplicates')
+    timer.wrap(engine, '_execute_actions', 'actions')
+    timer.run(engine.execute, 'plan')
+    return timer
+
+
+def bench_scrubber(root: Path, state_dir: Path, workers: int, _mm_args) -> PhaseTimer:
+    scrubber = load_tool('scrubber', state_dir)
+    scrubber._quiet_mode = True
+    timer = PhaseTimer()
+    timer.wrap(scrubber, 'find_media_files', 'scan')
+    timer.run(lambda: scrubber.run_scrubber(str(root), None, workers, dry_run=False, keep_backups=False),
+              'scrub')
+    return timer
+
+
+def bench_sidecar(root: Path, state_dir: Path, workers: int, _mm_args) -> PhaseTimer:
+    sidecar = load_tool('sidecar', state_dir)
+    sidecar._quiet_mode = True
+    timer = PhaseTimer()
+    timer.wrap(sidecar, 'find_media_files', 'scan')
+    timer.run(lambda: sidecar.export_metadata(str(root), workers, 50, skip_existing=False,
+                                              dry_run=False, naming='adobe', verbose=False),
+              'export')
+    return timer
+
+
+def bench_sync(root: Path, state_dir: Path, _workers, _mm_args) -> PhaseTimer:
+    sync = load_tool('sync', state_dir)
+    timer = PhaseTimer()
+    timer.wrap(sync, 'get_all_metadata', 'read')
+    timer.wrap(sync, 'batch_update_exif', 'write')
+    sys.argv = ['sync_timestamps.py', str(root), '--no-catalog']
+    timer.run(sync.main, 'analyze')
+    return timer
+
+
+BENCHMARKS = {
+    'media_manager': bench_media_manager,
+    'scrubber': bench_scrubber,
+    'sidecar': bench_sidecar,
+    'sync': bench_sync,
+}
+
+
+def run_worker(tool: str, root: Path, workers: int, mm_args: List[str], result_path: Path):
+    """Child process entry point: run one tool and write its raw result."""
+    if 'fork' in mp.get_all_start_methods():
+        mp.set_start_method('fork', force=True)  # Tool modules are loaded by path
+    start = time.perf_counter()
+    timer = BENCHMARKS[tool](root, root.parent / f"{tool}_state", workers, mm_args)
+    seconds = time.perf_counter() - start
+    result = {
+        'seconds': round(seconds, 3),
+        'phases': {k: round(v, 3) for k, v in timer.phases.items()},
+        'peak_rss_mb': peak_rss_mb(),
+    }
+    result_path.write_text(json.dumps(result), encoding='utf-8')
+
+# =============================================================================
+# MAIN
+# =============================================================================
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the media tools on a synthetic corpus")
+    parser.add_argument("--tools", default="all",
+                        help=f"Comma-separated subset of: {', '.join(BENCHMARKS)} (default: all)")
+    parser.add_argument("--files", type=int, default=1000, help="Corpus size in files (default: 1000)")
+    parser.add_argument("--seed", type=int, default=42, help="Corpus seed (default: 42)")
+    parser.add_argument("--median-kb", type=int, default=1024, help="Median JPEG size in KB (default: 1024)")
+    parser.add_argument("--dup-ratio", type=float, default=0.1, help="Duplicate copies (default: 0.1)")
+    parser.add_argument("--raw-ratio", type=float, default=0.2, help="RAW files (default: 0.2)")
+    parser.add_argument("--video-ratio", type=float, default=0.05, help="Video files (default: 0.05)")
+    parser.add_argument("--sidecar-ratio", type=float, default=0.1, help="Files with sidecars (default: 0.1)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 4, help="Tool worker count")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Stub ExifTool latency per file")
+    parser.add_argument("--startup-ms", type=float, default=0.0, help="Stub ExifTool process startup latency")
+    parser.add_argument("--mm-args", default=DEFAULT_MM_ARGS,
+                        help=f"Extra media-manager arguments (default: \"{DEFAULT_MM_ARGS}\")")
+    parser.add_argument("--workdir", help="Working directory (default: a temporary directory)")
+    parser.add_argument("--keep", action="store_true", help="Keep the working directory")
+    parser.add_argument("--output", help="Also write the JSON results to this file")
+    # Internal: run a single tool in this process
+    parser.add_argument("--worker", choices=list(BENCHMARKS), help=argparse.SUPPRESS)
+    parser.add_argument("--root", help=argparse.SUPPRESS)
+    parser.add_argument("--result", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args.worker, Path(args.root), args.workers, shlex.split(args.mm_args), Path(args.result))
+        return
+
+    tools = list(BENCHMARKS) if args.tools == "all" else [t.strip() for t in args.tools.split(",")]
+    unknown = [t for t in tools if t not in BENCHMARKS]
+    if unknown:
+        parser.error(f"Unknown tools: {', '.join(unknown)}")
+
+    workdir = Path(args.workdir or tempfile.mkdtemp(prefix="media-bench-"))
+    workdir.mkdir(parents=True, exist_ok=True)
+    status_before = tree_status()
+    try:
+        print(f"Generating corpus ({args.files:,} files) in {workdir}...", file=sys.stderr)
+        base = workdir / "corpus"
+        manifest = generate_corpus(base, args.files, args.seed, args.median_kb,
+                                   dup_ratio=args.dup_ratio, raw_ratio=args.raw_ratio,
+                                   video_ratio=args.video_ratio, sidecar_ratio=args.sidecar_ratio)
+        install_stub(workdir / "bin")
+        env = dict(os.environ,
+                   PATH=str(workdir / "bin") + os.pathsep + os.environ.get("PATH", ""),
+                   BENCH_EXIFTOOL_PER_FILE_MS=str(args.latency_ms),
+                   BENCH_EXIFTOOL_STARTUP_MS=str(args.startup_ms))
+
+        results = {}
+        for tool in tools:
+            root = workdir / tool
+            shutil.copytree(base, root)
+            result_path = workdir / f"{tool}.json"
+            print(f"Running {tool}...", file=sys.stderr)
+            with open(workdir / f"{tool}.log", "w", encoding="utf-8") as log:
+                proc = subprocess.run([sys.executable, __file__, "--worker", tool, "--root", str(root),
+                                       "--workers", str(args.workers), "--mm-args", args.mm_args,
+                                       "--result", str(result_path)],
+                                      env=env, cwd=workdir, stdout=log, stderr=subprocess.STDOUT,
+                                      stdin=subprocess.DEVNULL)
+            if proc.returncode != 0 or not result_path.exists():
+                results[tool] = {'error': f"exit code {proc.returncode} (see {workdir / (tool + '.log')})"}
+                continue
+            result = json.loads(result_path.read_text(encoding='utf-8'))
+            seconds = result['seconds'] or 1e-9
+            result['files_per_s'] = round(manifest['files'] / seconds, 1)
+            result['mb_per_s'] = round(manifest['bytes'] / 1e6 / seconds, 1)
+            results[tool] = result
+
+        # Nothing may be written into the tools tree (logs, configs, caches)
+        status_after = tree_status()
+        tree_changes = sorted(status_after - status_before) if status_before is not None else []
+
+        report = {
+            'corpus': manifest,
+            'settings': {'workers': args.workers, 'latency_ms': args.latency_ms,
+                         'startup_ms': args.startup_ms, 'mm_args': args.mm_args,
+                         'python': sys.version.split()[0], 'platform': sys.platform},
+            'results': results,
+            'tree_changes': tree_changes,
+        }
+        text = json.dumps(report, indent=2)
+        print(text)
+        if args.output:
+            Path(args.output).write_text(text + "\n", encoding='utf-8')
+    finally:
+        if args.keep:
+            print(f"Kept working directory: {workdir}", file=sys.stderr)
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+    if tree_changes:
+        print(f"Error: the run changed the tools tree: {', '.join(tree_changes)}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+Stub ExifTool for Benchmarks
+============================
+
+Description:
+    A fast local stand-in for `exiftool` that speaks enough of its command
+    line for every media tool: -ver, JSON reads (-j/-json, -G, tag
+    filters), tag writes ("N image files updated"), sidecar export
+    (-o ... "N image files created"), -@ argfiles with -execute blocks and
+    the -stay_open protocol used by the ExifTool pool (-executeN, -echo4).
+
+    Metadata is derived deterministically from each file name, so repeated
+    runs see the same dates, cameras and keywords. No media file is ever
+    modified; sidecar exports write a small XMP file.
+
+Latency (environment variables, milliseconds):
+    BENCH_EXIFTOOL_STARTUP_MS   Sleep once when the process starts (default: 0)
+    BENCH_EXIFTOOL_PER_FILE_MS  Sleep per file in each request (default: 0)
+
+Usage:
+    Installed as `exiftool` on PATH by run_benchmarks.py (see install_stub()).
+"""
+
+import os
+import sys
+import json
+import time
+import zlib
+from datetime import datetime, timezone
+
+STUB_VERSION = "13.00"
+
+# Options that consume the following argument
+VALUE_OPTIONS = {'-o', '-tagsfromfile', '-echo', '-echo1', '-echo2', '-echo3', '-echo4',
+                 '-charset', '-@', '-api', '-d', '-ext', '-p', '-w', '-x', '-if', '-userparam'}
+
+FILETYPES = {
+    '.jpg': 'JPEG', '.jpeg': 'JPEG', '.png': 'PNG', '.heic': 'HEIC', '.tif': 'TIFF', '.tiff': 'TIFF',
+    '.cr2': 'CR2', '.cr3': 'CR3', '.nef': 'NEF', '.arw': 'ARW', '.dng': 'DNG', '.orf': 'ORF',
+    '.mp4': 'MP4', '.mov': 'MOV', '.m4v': 'M4V', '.avi': 'AVI', '.mkv': 'MKV', '.xmp': 'XMP',
+}
+VIDEO_TYPES = {'MP4', 'MOV', 'M4V', 'AVI', 'MKV'}
+CAMERAS = [("Sony", "ILCE-7RM3"), ("Canon", "Canon EOS R5"), ("Apple", "iPhone 14 Pro"), ("Nikon", "NIKON Z 6")]
+KEYWORDS = ["family", "travel", "beach", "birthday", "hiking", "snow", "city", "pets"]
+
+
+def _sleep_ms(variable: str, count: int = 1):
+    ms = float(os.environ.get(variable, 0) or 0)
+    if ms > 0 and count > 0:
+        time.sleep(ms * count / 1000)
+
+
+def file_tags(path: str) -> dict:
+    """Full grouped tag set for one file (deterministic per file name)."""
+    name = os.path.basename(path)
+    seed = zlib.crc32(name.encode('utf-8', 'surrogateescape'))
+    ftype = FILETYPES.get(os.path.splitext(name)[1].lower(), 'JPEG')
+    st = os.stat(path)
+    modify = datetime.fromtimestamp(st.st_mtime, timezone.utc).strftime("%Y:%m:%d %H:%M:%S+00:00")
+    tags = {'File:FileType': ftype, 'File:FileModifyDate': modify}
+    if ftype == 'XMP':
+        return tags
+
+    taken = "%04d:%02d:%02d %02d:%02d:%02d" % (2012 + seed % 12, 1 + seed % 12, 1 + seed % 28,
+                                                seed % 24, seed % 60, (seed >> 8) % 60)
+    has_date = seed % 10 != 0  # ~10% of files carry no capture date
+    make, model = CAMERAS[seed % len(CAMERAS)]
+    if ftype in VIDEO_TYPES:
+        if has_date:
+            tags.update({'QuickTime:CreateDate': taken, 'QuickTime:CreationDate': taken + "+00:00",
+                         'QuickTime:MediaCreateDate': taken})
+        tags.update({'QuickTime:ImageWidth': 3840, 'QuickTime:ImageHeight': 2160})
+    else:
+        if has_date:
+            tags.update({'EXIF:DateTimeOriginal': taken, 'EXIF:CreateDate': taken, 'EXIF:ModifyDate': taken})
+        tags.update({'EXIF:Make': make, 'EXIF:Model': model,
+                     'EXIF:ImageWidth': 6000, 'EXIF:ImageHeight': 4000, 'EXIF:Orientation': 1})
+        if seed % 3 == 0:
+            tags['XMP:Rating'] = seed % 6
+            tags['XMP:Subject'] = [KEYWORDS[(seed >> s) % len(KEYWORDS)] for s in (0, 4)]
+    return tags
+
+
+def select_tags(tags: dict, requested: list, grouped: bool) -> dict:
+    """Filter a grouped tag set the way ExifTool does for -TAG arguments."""
+    out = {}
+    for key, value in tags.items():
+        group, name = key.split(':', 1)
+        if requested and not any(r == name.lower() or r == key.lower() for r in requested):
+            continue
+        out[key if grouped else name] = value
+    return out
+
+
+def parse(args: list):
+    """Split arguments into (options, option values, tag requests, assignments, files)."""
+    opts, values, requested, assignments, files = set(), {}, [], [], []
+    i = 0
+    while i < len(args):
+        arg = args[i]
+        low = arg.lower()
+        if low in VALUE_OPTIONS and i + 1 < len(args):
+            values[low] = args[i + 1]
+            i += 2
+            continue
+        if arg.startswith('-'):
+            if '=' in arg or '<' in arg:
+                assignments.append(arg)
+            elif low in ('-j', '-json', '-g', '-q', '-fast', '-fast2', '-n', '-b', '-s', '-a', '-u',
+                         '-overwrite_original', '-overwrite_original_in_place', '-r'):
+                opts.add(low)
+            else:
+                requested.append(low[1:].rstrip('#'))
+        else:
+            files.append(arg)
+        i += 1
+    return opts, values, requested, assignments, files
+
+
+def run(args: list, out, err):
+    """Execute one ExifTool command."""
+    opts, values, requested, assignments, files = parse(args)
+    existing = [f for f in files if os.path.isfile(f)]
+    for missing in (f for f in files if f not in existing):
+        err.write(f"Error: File not found - {missing}\n")
+    _sleep_ms('BENCH_EXIFTOOL_PER_FILE_MS', len(existing))
+
+    if '-o' in values:
+        created = 0
+        for f in existing:
+            directory, name = os.path.split(f)
+            stem, ext = os.path.splitext(name)
+            target = values['-o'].replace('%d', directory + os.sep if directory else '')
+            target = target.replace('%f', stem).replace('%e', ext.lstrip('.'))
+            if os.path.exists(target):
+                err.write(f"Error: '{target}' already exists - {f}\n")
+                continue
+            with open(target, 'w', encoding='utf-8') as fh:
+                fh.write('<?xpacket begin=""?><x:xmpmeta xmlns:x="adobe:ns:meta/"/><?xpacket end="w"?>\n')
+            created += 1
+        out.write(f"    {created} image files created\n")
+    elif assignments:
+        out.write(f"    {len(existing)} image files updated\n")
+    elif '-j' in opts or '-json' in opts:
+        grouped = '-g' in opts
+        items = [dict(SourceFile=f, **select_tags(file_tags(f), requested, grouped)) for f in existing]
+        if items:
+            out.write(json.dumps(items, indent=1) + "\n")
+    else:
+        for f in existing:
+            for key, value in select_tags(file_tags(f), requested, False).items():
+                out.write(f"{key:32}: {value}\n")
+
+
+def run_argfile(lines, common: list, stay_open: bool):
+    """Run -execute separated blocks from an argfile or stdin."""
+    block = []
+    for raw in lines:
+        line = raw.rstrip('\r\n')
+        if not line:
+            continue
+        if line.startswith('-execute'):
+            tag = line[len('-execute'):]
+            echo4 = None
+            if '-echo4' in block:
+                i = block.index('-echo4')
+                echo4 = block[i + 1]
+                del block[i:i + 2]
+            run(block + common, sys.stdout, sys.stderr)
+            if echo4 is not None:
+                sys.stderr.write(echo4 + "\n")
+            if stay_open:
+                sys.stdout.write("{ready%s}\n" % tag)
+            sys.stdout.flush()
+            sys.stderr.flush()
+            block = []
+        elif stay_open and block[-1:] == ['-stay_open'] and line.lower() == 'false':
+            return
+        else:
+            block.append(line)
+    if block:
+        run(block + common, sys.stdout, sys.stderr)
+
+
+def main(argv: list):
+    _sleep_ms('BENCH_EXIFTOOL_STARTUP_MS')
+    if argv[:1] == ['-ver']:
+        print(STUB_VERSION)
+        return 0
+
+    common = []
+    if '-common_args' in argv:
+        i = argv.index('-common_args')
+        argv, common = argv[:i], argv[i + 1:]
+
+    if len(argv) >= 4 and argv[0] == '-stay_open' and argv[1].lower() == 'true' and argv[2] == '-@':
+        source = sys.stdin if argv[3] == '-' else open(argv[3], encoding='utf-8')
+        run_argfile(source, common, stay_open=True)
+        return 0
+
+    if argv[:1] == ['-@'] and len(argv) >= 2:
+        with open(argv[1], encoding='utf-8') as fh:
+            run_argfile(fh, common + argv[2:], stay_open=False)
+        return 0
+
+    run(argv + common, sys.stdout, sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
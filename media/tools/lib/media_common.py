@@ -10,189 +10,4091 @@ Shared utilities for all media processing tools:
 - xmp-sidecar.py
 - timestamp-sync.py
 
+ExifTool access goes through a pool of persistent `-stay_open` processes
+(see ExifToolPool), so tools pay Perl startup once per worker, not per file.
+
+Hot paths (hashing, ExifTool requests, copies, pipeline queues) record into
+METRICS, which tools print per phase and can export at exit, and into TRACE,
+a Chrome trace-event timeline written with --trace.
+
+What a tool learns about a file (type, dates, camera, keywords, hash,
+sidecar) goes into the shared MediaCatalog, keyed on path and stat
+identity, so the next tool only reads the files that changed since.
+
+Importing this module is cheap: optional dependencies (tqdm, colorama,
+Pillow, NumPy, xxhash, blake3), SQLite, multiprocessing and the slower
+standard modules (hashlib, subprocess, shutil, json, base64) are imported
+on first use, and nothing touches the filesystem or runs ExifTool until a
+tool asks for it (see benchmarks/bench_startup.py).
+
 Usage:
     from media.tools.lib.media_common import *
 """
 
-__version__ = "1.0.0"
+__version__ = "1.0.0"
+
+import os
+import sys
+import atexit
+import bisect
+import errno
+import functools
+import importlib
+import importlib.util
+import io
+import logging
+import math
+import mmap
+import queue
+import re
+import struct
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from contextlib import contextmanager
+from array import array
+from pathlib import Path
+from datetime import date, datetime
+from typing import Callable, Optional, Dict, Iterable, Iterator, List, Set, Tuple
+
+# =============================================================================
+# OPTIONAL DEPENDENCIES (Imported on first use to keep startup fast)
+# =============================================================================
+
+def module_available(name: str) -> bool:
+    """True if a module can be imported (checked without importing it)."""
+    try:
+        return importlib.util.find_spec(name) is not None
+    except (ImportError, ValueError):
+        return False
+
+@functools.lru_cache(maxsize=None)
+def optional_import(name: str):
+    """Import a module on first use; None if it is not installed."""
+    try:
+        return importlib.import_module(name)
+    except ImportError:
+        return None
+
+def tqdm(*args, **kwargs):
+    """tqdm progress bar; tqdm itself is imported on first use."""
+    from tqdm import tqdm as _tqdm
+    return _tqdm(*args, **kwargs)
+
+# =============================================================================
+# FILE EXTENSION CONSTANTS (Unified across all tools)
+# =============================================================================
+
+PHOTO_EXTENSIONS = {
+    '.jpg', '.jpeg', '.png', '.tiff', '.tif', '.heic', '.heif',
+    '.dng', '.cr2', '.cr3', '.nef', '.arw', '.orf', '.rw2', '.raw',
+    '.avif', '.webp', '.jxl', '.raf', '.srw'
+}
+
+VIDEO_EXTENSIONS = {
+    '.mp4', '.mov', '.avi', '.mkv', '.m4v', '.mpg', '.mpeg',
+    '.wmv', '.flv', '.webm', '.3gp', '.mts', '.m2ts', '.hevc', '.ts'
+}
+
+RAW_EXTENSIONS = {
+    '.arw', '.cr2', '.cr3', '.nef', '.orf', '.dng', '.rw2',
+    '.raf', '.srw', '.raw'
+}
+
+ALL_MEDIA_EXTENSIONS = PHOTO_EXTENSIONS | VIDEO_EXTENSIONS
+
+# ExifTool FileType to Extension Mapping
+FILETYPE_TO_EXT = {
+    'JPEG': '.jpg', 'PNG': '.png', 'HEIC': '.heic', 'HEIF': '.heif',
+    'TIFF': '.tiff', 'WEBP': '.webp', 'AVIF': '.avif', 'JXL': '.jxl',
+    'GIF': '.gif', 'BMP': '.bmp', 'XMP': '.xmp',
+    'CR2': '.cr2', 'CR3': '.cr3', 'NEF': '.nef', 'ARW': '.arw',
+    'ORF': '.orf', 'DNG': '.dng', 'RW2': '.rw2', 'RAF': '.raf',
+    'SRW': '.srw', 'RAW': '.raw',
+    'MOV': '.mov', 'MP4': '.mp4', 'AVI': '.avi', 'MKV': '.mkv',
+    'M4V': '.m4v', 'WEBM': '.webm', 'MTS': '.mts', 'M2TS': '.m2ts',
+    '3GP': '.3gp', 'MPG': '.mpg', 'MPEG': '.mpeg', 'HEVC': '.hevc',
+    'TS': '.ts', 'WMV': '.wmv', 'FLV': '.flv',
+}
+
+# Folders to skip (Memory Protection)
+SKIP_DIRS = {
+    '.git', 'node_modules', 'venv', '.venv', '__pycache__', '.idea',
+    '.vscode', 'AppData', 'Library', '.npm', '.cache', 'Cache', 'Caches',
+    '.gradle', 'target', 'build', 'dist', '.tox', '.mypy_cache',
+    '.pytest_cache', 'System Volume Information', '$RECYCLE.BIN'
+}
+
+# =============================================================================
+# DIRECTORY SCANNER (Single-pass os.scandir walk shared by all tools)
+# =============================================================================
+
+class ScanEntry:
+    """
+    Lightweight scan result: path string, lowercase extension and the stat
+    result gathered during the walk (reuse it instead of calling stat again).
+    """
+    __slots__ = ('path', 'name', 'ext', 'stat')
+
+    def __init__(self, path: str, name: str, ext: str, stat: os.stat_result):
+        self.path = path
+        self.name = name
+        self.ext = ext
+        self.stat = stat
+
+    @property
+    def size(self) -> int:
+        return self.stat.st_size
+
+    def to_path(self) -> Path:
+        return Path(self.path)
+
+    def __repr__(self):
+        return f"ScanEntry({self.path!r})"
+
+def scan_media(sources, extensions: Set[str] = ALL_MEDIA_EXTENSIONS,
+               skip_dirs: Set[str] = SKIP_DIRS, skip_hidden: bool = False,
+               recursive: bool = True) -> Iterator[ScanEntry]:
+    """
+    Walk source directories once with os.scandir, yielding matching files.
+
+    SKIP_DIRS (and optionally hidden '.dirs') are pruned during the walk and
+    the extension filter is applied before any stat call. Directories are
+    visited in the same top-down order as os.walk; symlinked directories are
+    not followed. Unreadable directories are logged and skipped.
+
+    Args:
+        sources: A directory or list of directories
+        extensions: Lowercase extensions (with dot) to yield
+        skip_dirs: Directory names to prune
+        skip_hidden: Also prune directories starting with '.'
+        recursive: Descend into subdirectories
+
+    Yields:
+        ScanEntry for every matching file
+    """
+    if isinstance(sources, (str, os.PathLike)):
+        sources = [sources]
+
+    # DirEntry.stat() on Windows leaves st_ino/st_dev at 0; file identity
+    # (hash cache keys, hardlink detection) needs a real stat there.
+    full_stat = os.name == 'nt'
+
+    for source in sources:
+        stack = [os.fspath(source)]
+        while stack:
+            directory = stack.pop()
+            subdirs = []
+            try:
+                with os.scandir(directory) as it:
+                    for entry in it:
+                        try:
+                            if entry.is_dir():
+                                if (recursive and not entry.is_symlink()
+                                        and entry.name not in skip_dirs
+                                        and not (skip_hidden and entry.name.startswith('.'))):
+                                    subdirs.append(entry.path)
+                                continue
+                            ext = os.path.splitext(entry.name)[1].lower()
+                            if ext not in extensions or not entry.is_file():
+                                continue
+                            st = os.stat(entry.path) if full_stat else entry.stat()
+                        except OSError as e:
+                            logging.warning(f"Cannot stat {entry.path}: {e}")
+                            continue
+                        yield ScanEntry(entry.path, entry.name, ext, st)
+            except OSError as e:
+                logging.warning(f"Cannot scan {directory}: {e}")
+                continue
+            stack.extend(reversed(subdirs))
+
+# =============================================================================
+# COMPACT RECORDS (Interned strings and column grouping for large libraries)
+# =============================================================================
+
+_NUMPY_MIN_ROWS = 4096  # Below this, conversion costs more than it saves
+
+class InternTable:
+    """
+    Thread-safe string <-> small int table.
+
+    Used to store repeated strings (directory paths, keywords) once and keep
+    only an int per record.
+
+    Example:
+        dirs = InternTable()
+        dir_id = dirs.intern("/photos/2024")
+        dirs.value(dir_id)  # "/photos/2024"
+    """
+
+    __slots__ = ('_values', '_ids', '_lock')
+
+    def __init__(self):
+        self._values: List[str] = []
+        self._ids: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def intern(self, value: str) -> int:
+        """Return the id of value, adding it on first use."""
+        idx = self._ids.get(value)
+        if idx is None:
+            with self._lock:
+                idx = self._ids.get(value)
+                if idx is None:
+                    idx = len(self._values)
+                    self._values.append(value)
+                    self._ids[value] = idx
+        return idx
+
+    def value(self, idx: int) -> str:
+        return self._values[idx]
+
+    def __len__(self):
+        return len(self._values)
+
+def group_indices(keys) -> List[List[int]]:
+    """
+    Sort/unique grouping over one column.
+
+    Uses NumPy (stable argsort + boundary detection) when it is installed
+    and the column is an int64 array or equal-length bytes; otherwise a
+    stable Python sort. Both give identical results.
+
+    Args:
+        keys: Indexable column (list, array.array('q'), ...) of comparable keys
+
+    Returns:
+        Lists of row indices sharing a key, in key order; rows keep their
+        original order within a group
+    """
+    n = len(keys)
+    _np = optional_import('numpy') if n >= _NUMPY_MIN_ROWS else None
+    if _np is not None:
+        column = _numpy_column(_np, keys)
+        if column is not None:
+            order = _np.argsort(column, kind='stable')
+            ordered = column[order]
+            bounds = [0] + (_np.flatnonzero(ordered[1:] != ordered[:-1]) + 1).tolist() + [n]
+            rows = order.tolist()
+            return [rows[bounds[i]:bounds[i + 1]] for i in range(len(bounds) - 1)]
+
+    groups: List[List[int]] = []
+    prev = None
+    for i in sorted(range(n), key=keys.__getitem__):
+        key = keys[i]
+        if groups and key == prev:
+            groups[-1].append(i)
+        else:
+            groups.append([i])
+            prev = key
+    return groups
+
+def _numpy_column(_np, keys):
+    """NumPy view of a column, or None if it has no exact fixed-width form."""
+    if isinstance(keys, array) and keys.typecode == 'q':
+        return _np.frombuffer(keys, dtype=_np.int64)
+    if isinstance(keys, list) and keys and isinstance(keys[0], bytes):
+        width = len(keys[0])
+        if width and all(isinstance(k, bytes) and len(k) == width for k in keys):
+            # Void dtype compares raw bytes (no NUL-stripping like 'S')
+            return _np.frombuffer(b"".join(keys), dtype=f"V{width}")
+    return None
+
+# =============================================================================
+# WORKER POOL MANAGEMENT (Performance optimization)
+# =============================================================================
+
+CGROUP_ROOT = "/sys/fs/cgroup"
+
+def cgroup_cpu_limit() -> Optional[float]:
+    """
+    CPUs this process may use under cgroup quotas (e.g. `docker --cpus 2`).
+
+    cgroup v2: the smallest `cpu.max` quota of this process's cgroup and its
+    ancestors; cgroup v1 (and hybrid setups): cpu.cfs_quota_us / cfs_period_us
+    of the cpu controller.
+
+    Returns:
+        Fractional CPU count, or None when no quota applies (or off Linux)
+    """
+    def read(path: str) -> Optional[List[str]]:
+        try:
+            with open(path, encoding='utf-8') as f:
+                return f.read().split()
+        except OSError:
+            return None
+
+    try:
+        with open('/proc/self/cgroup', encoding='utf-8') as f:
+            lines = f.read().splitlines()
+    except OSError:
+        return None
+
+    limits = []
+    for line in lines:
+        if line.count(':') < 2:
+            continue
+        hierarchy, controllers, rel = line.split(':', 2)
+        parts = [p for p in rel.split('/') if p]
+        if hierarchy == '0' and not controllers:
+            # Walk up from our cgroup: any ancestor's quota caps us too
+            for depth in range(len(parts), -1, -1):
+                fields = read(os.path.join(CGROUP_ROOT, *parts[:depth], 'cpu.max'))
+                if fields and len(fields) == 2 and fields[0] != 'max':
+                    limits.append(int(fields[0]) / int(fields[1]))
+        elif 'cpu' in controllers.split(','):
+            # Inside a container the cgroup is usually mounted at the controller root
+            for base in (os.path.join(CGROUP_ROOT, 'cpu', *parts), os.path.join(CGROUP_ROOT, 'cpu')):
+                quota = read(os.path.join(base, 'cpu.cfs_quota_us'))
+                period = read(os.path.join(base, 'cpu.cfs_period_us'))
+                if quota and period:
+                    if int(quota[0]) > 0 and int(period[0]) > 0:
+                        limits.append(int(quota[0]) / int(period[0]))
+                    break
+    return min(limits) if limits else None
+
+@functools.lru_cache(maxsize=None)
+def available_cpus() -> int:
+    """CPUs this process can actually run on: the affinity mask
+    (sched_getaffinity, e.g. `taskset`) capped by the cgroup CPU quota."""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except (AttributeError, OSError):
+        cpus = os.cpu_count() or 1
+    quota = cgroup_cpu_limit()
+    if quota:
+        cpus = min(cpus, math.ceil(quota))
+    return max(1, cpus)
+
+@functools.lru_cache(maxsize=None)
+def get_worker_profiles() -> Dict[str, Dict]:
+    """Worker count presets for the interactive menus (built on first use)."""
+    cores = available_cpus()
+    return {
+        'conservative': {'workers': 2, 'desc': 'Low CPU (2 workers)'},
+        'balanced': {'workers': max(4, cores // 2), 'desc': f'Balanced ({max(4, cores // 2)} workers)'},
+        'fast': {'workers': max(1, cores - 2), 'desc': f'Fast ({max(1, cores - 2)} workers)'},
+        'maximum': {'workers': cores, 'desc': f'Maximum ({cores} workers)'},
+    }
+
+def __getattr__(name: str):
+    # WORKER_PROFILES is still importable by name, but built lazily
+    if name == 'WORKER_PROFILES':
+        return get_worker_profiles()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def get_optimal_workers() -> int:
+    """Auto-detect optimal worker count based on usable CPU cores."""
+    cores = available_cpus()
+    return max(2, cores - 2) if cores > 4 else max(1, cores - 1)
+
+# =============================================================================
+# STORAGE PROFILES (Concurrency and I/O sizes for the storage being read)
+# =============================================================================
+
+# Optional overrides (JSON); $MEDIA_TOOLS_STORAGE_CONFIG points elsewhere
+STORAGE_CONFIG_ENV = "MEDIA_TOOLS_STORAGE_CONFIG"
+STORAGE_CONFIG_FILE = Path(__file__).resolve().parent.parent / "configs" / "storage_profiles.json"
+
+NETWORK_FILESYSTEMS = {
+    'nfs', 'nfs4', 'cifs', 'smb3', 'smbfs', '9p', 'afs', 'ceph', 'glusterfs',
+    'fuse.sshfs', 'fuse.rclone', 'fuse.s3fs', 'davfs',
+}
+MEMORY_FILESYSTEMS = {'tmpfs', 'ramfs'}
+
+# Most conservative first: a run over several devices uses the first kind present
+STORAGE_KINDS = ('hdd', 'network', 'default', 'ssd', 'nvme')
+
+class StorageProfile:
+    """
+    Tuning for one kind of storage.
+
+    Attributes:
+        name: 'nvme', 'ssd', 'hdd', 'network', 'default' or a profile defined in the config
+        detail: Why it was chosen (e.g. "ext4 on sda, rotational")
+        workers: ExifTool processes / process-pool workers
+        hash_workers: Threads reading (hashing, sampling) files
+        read_chunk: Bytes per read when hashing
+        photo_batch, video_batch: Files per ExifTool write/export batch
+        metadata_batch: Files per ExifTool metadata read request
+        copy_workers: Concurrent copy/move operations
+        per_device: Concurrent copies reading from / writing to one device
+        sequential_readers: Concurrent reads of large files from one device
+        io_order: Order pending reads are issued in (see IO_ORDERS)
+    """
+    FIELDS = ('workers', 'hash_workers', 'read_chunk', 'photo_batch', 'video_batch',
+              'metadata_batch', 'copy_workers', 'per_device', 'sequential_readers')
+    TEXT_FIELDS = ('io_order',)
+    __slots__ = ('name', 'detail') + FIELDS + TEXT_FIELDS
+
+    def __init__(self, name: str, detail: str = "", **settings):
+        self.name = name
+        self.detail = detail
+        for field in self.FIELDS:
+            setattr(self, field, max(1, int(settings[field])))
+        self.io_order = settings.get('io_order', 'walk')
+        if self.io_order not in IO_ORDERS:
+            logging.warning(f"Storage profile {name}: unknown io_order '{self.io_order}', using 'walk'")
+            self.io_order = 'walk'
+
+    def as_dict(self) -> Dict:
+        return {'name': self.name, 'detail': self.detail,
+                **{f: getattr(self, f) for f in self.FIELDS + self.TEXT_FIELDS}}
+
+    def describe(self) -> str:
+        return f"{self.name} ({self.detail})" if self.detail else self.name
+
+    def __repr__(self):
+        return f"StorageProfile({self.describe()!r})"
+
+@functools.lru_cache(maxsize=None)
+def _builtin_storage_profiles() -> Dict[str, Dict]:
+    cores = available_cpus()
+    auto = get_optimal_workers()
+    mb = 1024 * 1024
+    return {
+        # The historical fixed settings: used when the storage cannot be identified
+        'default': dict(workers=auto, hash_workers=auto, read_chunk=4 * mb, photo_batch=50,
+                        video_batch=10, metadata_batch=500, copy_workers=auto, per_device=2,
+                        sequential_readers=auto, io_order='walk'),
+        # No seek cost and deep queues: keep many requests in flight
+        'nvme': dict(workers=cores, hash_workers=max(4, cores), read_chunk=8 * mb, photo_batch=50,
+                     video_batch=10, metadata_batch=500, copy_workers=max(4, cores), per_device=8,
+                     sequential_readers=max(4, cores), io_order='walk'),
+        'ssd': dict(workers=auto, hash_workers=max(4, auto), read_chunk=4 * mb, photo_batch=50,
+                    video_batch=10, metadata_batch=500, copy_workers=max(4, auto), per_device=4,
+                    sequential_readers=max(4, auto), io_order='walk'),
+        # One set of heads: few concurrent readers, long sequential reads in on-disk order,
+        # fewer batches
+        'hdd': dict(workers=2, hash_workers=2, read_chunk=16 * mb, photo_batch=100,
+                    video_batch=20, metadata_batch=1000, copy_workers=2, per_device=1,
+                    sequential_readers=1, io_order='physical'),
+        # Latency-bound: more requests in flight and fewer round trips
+        'network': dict(workers=auto, hash_workers=max(4, min(16, cores * 2)), read_chunk=8 * mb,
+                        photo_batch=100, video_batch=20, metadata_batch=1000, copy_workers=4,
+                        per_device=4, sequential_readers=max(4, min(16, cores * 2)), io_order='walk'),
+    }
+
+@functools.lru_cache(maxsize=None)
+def load_storage_config() -> Dict:
+    """
+    Read storage profile overrides.
+
+    Format (every key optional):
+        {
+          "profiles": {"hdd": {"hash_workers": 1},
+                       "nas": {"base": "network", "workers": 8}},
+          "paths": {"/mnt/pool": "hdd", "/mnt/nas": "nas"}
+        }
+
+    "profiles" adjusts built-in profiles or defines new ones (starting from
+    "base", default 'default'); "paths" forces a profile for everything
+    under a directory (e.g. FUSE or mergerfs pools that hide the disks).
+    """
+    import json
+    path = Path(os.environ.get(STORAGE_CONFIG_ENV) or STORAGE_CONFIG_FILE)
+    try:
+        config = json.loads(path.read_text(encoding='utf-8'))
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as e:
+        logging.warning(f"Ignoring storage config {path}: {e}")
+        return {}
+    if not isinstance(config, dict):
+        logging.warning(f"Ignoring storage config {path}: expected a JSON object")
+        return {}
+    return config
+
+def storage_profile_names() -> List[str]:
+    """Built-in and config-defined profile names."""
+    names = list(_builtin_storage_profiles())
+    names += [n for n in load_storage_config().get('profiles', {}) if n not in names]
+    return names
+
+def get_storage_profile(name: str, detail: str = "") -> StorageProfile:
+    """Build a named profile with config overrides applied."""
+    builtin = _builtin_storage_profiles()
+    overrides = load_storage_config().get('profiles', {}).get(name, {})
+    base = name if name in builtin else overrides.get('base', 'default')
+    if base not in builtin:
+        raise ValueError(f"Unknown storage profile: {name}")
+    settings = dict(builtin[base])
+    settings.update({k: v for k, v in overrides.items()
+                     if k in StorageProfile.FIELDS + StorageProfile.TEXT_FIELDS})
+    return StorageProfile(name, detail, **settings)
+
+def storage_profile(paths, name: Optional[str] = None) -> StorageProfile:
+    """
+    Tuning profile for the storage holding one path or several.
+
+    Args:
+        paths: A path or list of paths (missing paths use their nearest
+            existing parent, so destinations can be profiled before creation)
+        name: Force a profile by name; None or 'auto' detects it
+
+    Returns:
+        The profile; with several paths on different kinds of storage the
+        most conservative one (STORAGE_KINDS order) wins
+    """
+    if name and name != 'auto':
+        return get_storage_profile(name, "selected")
+    if isinstance(paths, (str, os.PathLike)):
+        paths = [paths]
+    detected = [detect_storage(p) for p in paths] or [('default', "no paths")]
+    rank = {kind: i for i, kind in enumerate(STORAGE_KINDS)}
+    kind, detail = min(detected, key=lambda d: rank.get(d[0], rank['default']))
+    return get_storage_profile(kind, detail)
+
+def detect_storage(path) -> Tuple[str, str]:
+    """
+    Classify the storage a path lives on.
+
+    Linux: the mount is found in /proc/self/mountinfo; network filesystems
+    are 'network', otherwise the block device's sysfs entry decides between
+    'nvme', 'ssd' and 'hdd' (queue/rotational; device-mapper and md RAID
+    count as rotational if any member disk is). Paths configured under
+    "paths" in the storage config win. Everything else is 'default'.
+
+    Returns:
+        (profile name, human-readable reason)
+    """
+    resolved = os.path.realpath(path)
+    forced = _configured_storage(resolved)
+    if forced:
+        return forced
+    if resolved.startswith('\\\\'):
+        return 'network', "UNC path"
+    dev = device_of(Path(resolved))
+    return _detect_device(dev, resolved)
+
+def _configured_storage(resolved: str) -> Optional[Tuple[str, str]]:
+    best = None
+    for prefix, name in load_storage_config().get('paths', {}).items():
+        prefix = os.path.realpath(prefix)
+        if resolved == prefix or resolved.startswith(prefix.rstrip(os.sep) + os.sep):
+            if best is None or len(prefix) > len(best[0]):
+                best = (prefix, name)
+    return (best[1], f"configured for {best[0]}") if best else None
+
+@functools.lru_cache(maxsize=None)
+def _mountinfo() -> Tuple[Tuple[int, str, str, str], ...]:
+    """(st_dev, mount point, fs type, mount source) per mount; empty off Linux."""
+    def unescape(field: str) -> str:
+        return re.sub(r'\\([0-7]{3})', lambda m: chr(int(m.group(1), 8)), field)
+
+    mounts = []
+    try:
+        with open('/proc/self/mountinfo', encoding='utf-8', errors='replace') as f:
+            for line in f:
+                fields = line.split()
+                try:
+                    sep = fields.index('-', 6)
+                    major, minor = fields[2].split(':')
+                    mounts.append((os.makedev(int(major), int(minor)), unescape(fields[4]),
+                                   fields[sep + 1], unescape(fields[sep + 2])))
+                except (ValueError, IndexError):
+                    continue
+    except OSError:
+        pass
+    return tuple(mounts)
+
+def _detect_device(dev: int, path: str) -> Tuple[str, str]:
+    # `path` picks between mounts sharing a device (bind mounts)
+    def under(mount: str) -> bool:
+        return path == mount or path.startswith(mount.rstrip('/') + '/')
+
+    mounts = _mountinfo()
+    candidates = [m for m in mounts if m[0] == dev] or [m for m in mounts if under(m[1])]
+    if not candidates:
+        return 'default', "storage not identified"
+    _, mount_point, fstype, source = max(candidates, key=lambda m: (under(m[1]), len(m[1])))
+
+    if fstype in NETWORK_FILESYSTEMS or fstype.startswith('nfs'):
+        return 'network', f"{fstype} {source}"
+    if fstype in MEMORY_FILESYSTEMS:
+        return 'nvme', f"{fstype} (memory)"
+
+    block_dev = dev
+    if os.major(dev) == 0:
+        # btrfs and friends report an anonymous device; the mount source names the disk
+        try:
+            block_dev = os.stat(source).st_rdev
+        except OSError:
+            return 'default', f"{fstype} on {source}"
+    found = _block_device(f"/sys/dev/block/{os.major(block_dev)}:{os.minor(block_dev)}")
+    if found is None:
+        return 'default', f"{fstype} on {source}"
+    name, rotational, nvme = found
+    if rotational:
+        return 'hdd', f"{fstype} on {name}, rotational"
+    if nvme:
+        return 'nvme', f"{fstype} on {name}"
+    return 'ssd', f"{fstype} on {name}, non-rotational"
+
+def _block_device(sys_path: str) -> Optional[Tuple[str, bool, bool]]:
+    """(name, rotational, all NVMe) for a /sys block device, following
+    partitions to their disk and dm/md devices to their members."""
+    real = os.path.realpath(sys_path)
+    if not os.path.isdir(real):
+        return None
+    if os.path.exists(os.path.join(real, 'partition')):
+        real = os.path.dirname(real)
+    name = os.path.basename(real)
+    try:
+        members = os.listdir(os.path.join(real, 'slaves'))
+    except OSError:
+        members = []
+    found = [f for f in (_block_device(f"/sys/class/block/{m}") for m in members) if f]
+    if found:
+        return name, any(f[1] for f in found), all(f[2] for f in found)
+    try:
+        with open(os.path.join(real, 'queue', 'rotational'), encoding='ascii') as f:
+            rotational = f.read().strip() == '1'
+    except OSError:
+        return None
+    return name, rotational, name.startswith('nvme')
+
+# =============================================================================
+# METRICS (Counters, gauges and latency histograms per run phase)
+# =============================================================================
+
+# Histogram bucket upper bounds in seconds (plus an overflow bucket)
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+                   0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+
+class Histogram:
+    """Latency histogram over LATENCY_BUCKETS."""
+    __slots__ = ('counts', 'count', 'total', 'max')
+
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(LATENCY_BUCKETS, value)] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def merge(self, counts: List[int], count: int, total: float, maximum: float):
+        for i, n in enumerate(counts):
+            self.counts[i] += n
+        self.count += count
+        self.total += total
+        self.max = max(self.max, maximum)
+
+    def quantile(self, q: float) -> float:
+        """Approximate quantile: upper bound of the bucket it falls in (capped at max)."""
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if n and seen >= rank:
+                return min(LATENCY_BUCKETS[i], self.max) if i < len(LATENCY_BUCKETS) else self.max
+        return self.max
+
+    def to_list(self) -> list:
+        return [list(self.counts), self.count, self.total, self.max]
+
+def _cpu_seconds() -> float:
+    """User + system CPU of this process and its reaped children."""
+    t = os.times()
+    return t.user + t.system + t.children_user + t.children_system
+
+class PhaseStats:
+    """Metrics recorded while one phase was current."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.wall = 0.0
+        self.cpu = 0.0
+        self.counters: Dict[str, float] = {}
+        self.gauges: Dict[str, List[float]] = {}  # name -> [last, max]
+        self.histograms: Dict[str, Histogram] = {}
+        self._started: Optional[Tuple[float, float]] = None
+
+    def begin(self):
+        self._started = (time.perf_counter(), _cpu_seconds())
+
+    def end(self):
+        if self._started:
+            wall, cpu = self._started
+            self.wall += time.perf_counter() - wall
+            self.cpu += _cpu_seconds() - cpu
+            self._started = None
+
+    @property
+    def empty(self) -> bool:
+        return not (self.counters or self.gauges or self.histograms)
+
+class Metrics:
+    """
+    Run metrics grouped by phase: counters, gauges and latency histograms.
+
+    Tools call start_phase() at each phase boundary; everything recorded
+    afterwards (from any thread) counts towards that phase. Recording costs
+    one lock and a dict lookup, so it is safe on per-file hot paths.
+
+    Standard names used by media_common and the tools:
+        hash_seconds, sample_hash_seconds      per-file hashing latency
+        exiftool_seconds, exiftool_wait_seconds  ExifTool round trip / pool wait
+        transfer_seconds                       per-file Phase 4 action
+        bytes_read, bytes_written              data read for hashing / written by copies
+        cache_dropped_bytes, direct_io_files   page cache released behind reads / O_DIRECT reads
+        throttle_wait_seconds                  time spent waiting on THROTTLE caps
+        io_order_files, io_order_fallbacks     files sorted by sort_for_io() / placed by inode only
+        reader_wait_seconds                    large reads waiting for a READERS slot
+        queue_depth_<stage>                    pipeline queue fill (gauge)
+        collision_probes                       destination names tried and found taken
+
+    Work done in ProcessPoolExecutor workers is recorded in the worker and
+    shipped back with the result: submit run_with_metrics(fn, ...) and pass
+    each result through merge_worker_metrics().
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Drop everything and start over in the default 'startup' phase."""
+        with self._lock:
+            self._pid = os.getpid()
+            self.phases: Dict[str, PhaseStats] = {}
+            self._current = self._phase_locked('startup')
+
+    def _phase_locked(self, name: str) -> PhaseStats:
+        phase = self.phases.get(name)
+        if phase is None:
+            phase = self.phases[name] = PhaseStats(name)
+        phase.begin()
+        return phase
+
+    def start_phase(self, name: str):
+        """End the current phase and make `name` current (re-entering accumulates)."""
+        with self._lock:
+            self._current.end()
+            self._current = self._phase_locked(name)
+        TRACE.mark_phase(name)
+
+    def finish(self):
+        """End the current phase (recording continues into it)."""
+        with self._lock:
+            self._current.end()
+        TRACE.mark_phase(None)
+
+    def inc(self, name: str, value: float = 1):
+        with self._lock:
+            counters = self._current.counters
+            counters[name] = counters.get(name, 0) + value
+
+    def set_gauge(self, name: str, value: float):
+        with self._lock:
+            gauge = self._current.gauges.get(name)
+            if gauge is None:
+                self._current.gauges[name] = [value, value]
+            else:
+                gauge[0] = value
+                if value > gauge[1]:
+                    gauge[1] = value
+
+    def observe(self, name: str, seconds: float):
+        with self._lock:
+            hist = self._current.histograms.get(name)
+            if hist is None:
+                hist = self._current.histograms[name] = Histogram()
+            hist.observe(seconds)
+
+    @contextmanager
+    def timer(self, name: str):
+        """Observe the duration of a with-block in histogram `name`."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start)
+
+    def drain(self) -> Dict:
+        """Return and clear what the current phase recorded (picklable)."""
+        with self._lock:
+            phase = self._current
+            data = {
+                'counters': phase.counters,
+                'gauges': phase.gauges,
+                'histograms': {k: h.to_list() for k, h in phase.histograms.items()},
+            }
+            phase.counters, phase.gauges, phase.histograms = {}, {}, {}
+        return data
+
+    def merge(self, data: Dict):
+        """Add a drain() result (e.g. from a worker process) to the current phase."""
+        with self._lock:
+            phase = self._current
+            for name, value in data.get('counters', {}).items():
+                phase.counters[name] = phase.counters.get(name, 0) + value
+            for name, (last, peak) in data.get('gauges', {}).items():
+                gauge = phase.gauges.setdefault(name, [last, peak])
+                gauge[0], gauge[1] = last, max(gauge[1], peak)
+            for name, values in data.get('histograms', {}).items():
+                phase.histograms.setdefault(name, Histogram()).merge(*values)
+
+    def _closed_phases(self) -> List[PhaseStats]:
+        """Phases with the current one's wall/CPU time brought up to date."""
+        with self._lock:
+            current = self._current
+            current.end()
+            current.begin()
+            return [p for p in self.phases.values() if p.wall >= 0.001 or not p.empty]
+
+    # ---- Reporting ----------------------------------------------------------
+
+    def summary_table(self) -> str:
+        """Per-phase table: wall/CPU time, then each metric recorded in the phase.
+
+        'busy' is total histogram time / phase wall time, i.e. how many
+        workers were on average inside that operation: busy close to the
+        worker count on exiftool_seconds means ExifTool-bound, on
+        hash_seconds with high CPU% CPU-bound, with low CPU% disk-bound.
+        """
+        lines = [f"  {'Phase / metric':<28}{'Wall':>9}{'CPU':>9}{'CPU%':>7}"]
+        for phase in self._closed_phases():
+            wall = max(phase.wall, 1e-9)
+            lines.append(f"  {phase.name:<28}{phase.wall:>8.2f}s{phase.cpu:>8.2f}s"
+                         f"{phase.cpu / wall * 100:>6.0f}%")
+            for name, h in sorted(phase.histograms.items()):
+                lines.append(f"    {name:<26}n={h.count:<9,} avg {_fmt_seconds(h.total / h.count)}"
+                             f"  p50 {_fmt_seconds(h.quantile(0.5))}  p95 {_fmt_seconds(h.quantile(0.95))}"
+                             f"  max {_fmt_seconds(h.max)}  busy {h.total / wall:.1f}")
+            for name, value in sorted(phase.counters.items()):
+                if name.startswith('bytes_'):
+                    lines.append(f"    {name:<26}{value / 1e6:,.1f} MB ({value / 1e6 / wall:,.1f} MB/s)")
+                else:
+                    lines.append(f"    {name:<26}{value:,.0f} ({value / wall:,.1f}/s)")
+            for name, (last, peak) in sorted(phase.gauges.items()):
+                lines.append(f"    {name:<26}last {last:,.0f}  max {peak:,.0f}")
+        return "\n".join(lines)
+
+    def print_summary(self):
+        print_phase("Metrics")
+        print(self.summary_table())
+
+    def snapshot(self, tool: str = "media_tools") -> Dict:
+        """Everything recorded so far as a JSON-compatible dict."""
+        phases = []
+        for phase in self._closed_phases():
+            histograms = {}
+            for name, h in phase.histograms.items():
+                histograms[name] = {
+                    'count': h.count, 'sum': round(h.total, 6), 'max': round(h.max, 6),
+                    'p50': h.quantile(0.5), 'p95': h.quantile(0.95), 'p99': h.quantile(0.99),
+                    'buckets': dict(zip([str(b) for b in LATENCY_BUCKETS] + ['+Inf'], h.counts)),
+                }
+            phases.append({
+                'phase': phase.name, 'wall_seconds': round(phase.wall, 3),
+                'cpu_seconds': round(phase.cpu, 3), 'counters': dict(phase.counters),
+                'gauges': {k: {'last': v[0], 'max': v[1]} for k, v in phase.gauges.items()},
+                'histograms': histograms,
+            })
+        return {'tool': tool, 'timestamp': datetime.now().isoformat(), 'phases': phases}
+
+    def prometheus_text(self, tool: str = "media_tools") -> str:
+        """Prometheus text exposition format (for node_exporter's textfile collector)."""
+        families: Dict[str, Tuple[str, List[str]]] = {}
+
+        def sample(family: str, kind: str, line: str):
+            families.setdefault(family, (kind, []))[1].append(line)
+
+        for phase in self._closed_phases():
+            labels = f'tool="{tool}",phase="{phase.name}"'
+            sample("media_tools_phase_seconds", "gauge", f"media_tools_phase_seconds{{{labels}}} {phase.wall:.6f}")
+            sample("media_tools_phase_cpu_seconds", "gauge",
+                   f"media_tools_phase_cpu_seconds{{{labels}}} {phase.cpu:.6f}")
+            for name, value in phase.counters.items():
+                family = f"media_tools_{name}_total"
+                sample(family, "counter", f"{family}{{{labels}}} {value}")
+            for name, (last, peak) in phase.gauges.items():
+                sample(f"media_tools_{name}", "gauge", f"media_tools_{name}{{{labels}}} {last}")
+                sample(f"media_tools_{name}_max", "gauge", f"media_tools_{name}_max{{{labels}}} {peak}")
+            for name, h in phase.histograms.items():
+                family = f"media_tools_{name}"
+                cumulative = 0
+                for bound, n in zip([str(b) for b in LATENCY_BUCKETS] + ['+Inf'], h.counts):
+                    cumulative += n
+                    sample(family, "histogram", f'{family}_bucket{{{labels},le="{bound}"}} {cumulative}')
+                sample(family, "histogram", f"{family}_sum{{{labels}}} {h.total:.6f}")
+                sample(family, "histogram", f"{family}_count{{{labels}}} {h.count}")
+
+        out = []
+        for family, (kind, lines) in families.items():
+            out.append(f"# TYPE {family} {kind}")
+            out.extend(lines)
+        return "\n".join(out) + "\n"
+
+    def export(self, path, tool: str = "media_tools"):
+        """Write metrics to path: Prometheus text for *.prom, JSON otherwise (atomic replace)."""
+        import json
+        path = Path(path)
+        if path.suffix == '.prom':
+            text = self.prometheus_text(tool)
+        else:
+            text = json.dumps(self.snapshot(tool), indent=2) + "\n"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(path.name + ".tmp")
+        tmp.write_text(text, encoding='utf-8')
+        os.replace(tmp, path)
+
+    def export_at_exit(self, path, tool: str = "media_tools"):
+        """Export to path when the process exits (also after sys.exit or an error)."""
+        def export():
+            try:
+                self.export(path, tool)
+            except OSError as e:
+                logging.warning(f"Could not write metrics to {path}: {e}")
+        atexit.register(export)
+
+def _fmt_seconds(seconds: float) -> str:
+    if seconds < 1:
+        return f"{seconds * 1000:.1f}ms"
+    return f"{seconds:.2f}s"
+
+# Process-wide registry used by media_common and the tools
+METRICS = Metrics()
+
+def run_with_metrics(fn: Callable, *args, **kwargs):
+    """
+    Call fn in a pool worker process and return (result, metrics and trace
+    spans it recorded).
+
+    Submit this instead of fn to a ProcessPoolExecutor and pass each result
+    to merge_worker_metrics(). In the main process fn's metrics are recorded
+    directly and None is returned in their place.
+    """
+    import multiprocessing
+    if multiprocessing.parent_process() is None:
+        return fn(*args, **kwargs), None
+    if METRICS._pid != os.getpid():
+        METRICS.reset()  # Drop state inherited from the parent through fork
+    result = fn(*args, **kwargs)
+    return result, {'metrics': METRICS.drain(), 'trace': TRACE.drain()}
+
+def merge_worker_metrics(value):
+    """Unpack a run_with_metrics() result, merging its metrics into METRICS
+    and its spans into TRACE."""
+    result, data = value
+    if data:
+        METRICS.merge(data['metrics'])
+        TRACE.merge(data['trace'])
+    return result
+
+# =============================================================================
+# TRACE EVENTS (Chrome trace-event timeline of worker activity)
+# =============================================================================
+
+# Set for child processes so spawned pool workers record too
+TRACE_ENV = "MEDIA_TOOLS_TRACE"
+
+class Tracer:
+    """
+    Records spans (Chrome trace-event "complete" events) per process/thread.
+
+    Disabled by default; complete() and span() return immediately until
+    enable() is called, so hot paths can call them unconditionally. The
+    saved JSON opens in Perfetto (ui.perfetto.dev) or chrome://tracing, with
+    one track per worker thread and process: stragglers, idle workers and
+    serialization points show up directly on the timeline.
+
+    Example:
+        TRACE.enable()
+        with TRACE.span("scrub_batch", "batch", files=len(batch)):
+            ...
+        TRACE.save("trace.json")
+    """
+
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+        self._events: List[Tuple] = []            # (name, cat, ts_us, dur_us, pid, tid, args)
+        self._threads: Dict[Tuple[int, int], str] = {}
+        self._phase: Optional[Tuple[str, float]] = None
+
+    def enable(self):
+        self.enabled = True
+        os.environ[TRACE_ENV] = "1"
+
+    def _check_fork_locked(self):
+        if os.getpid() != self._pid:  # Forked child: drop the parent's events
+            self._pid, self._events, self._threads = os.getpid(), [], {}
+
+    def complete(self, name: str, cat: str, start: float, end: float, **args):
+        """Record a span from two time.perf_counter() readings."""
+        if not self.enabled:
+            return
+        pid, tid = os.getpid(), threading.get_native_id()
+        with self._lock:
+            self._check_fork_locked()
+            if (pid, tid) not in self._threads:
+                self._threads[(pid, tid)] = threading.current_thread().name
+            self._events.append((name, cat, start * 1e6, (end - start) * 1e6, pid, tid, args))
+
+    @contextmanager
+    def span(self, name: str, cat: str = "", **args):
+        """Record the with-block as a span."""
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.complete(name, cat, start, time.perf_counter(), **args)
+
+    def mark_phase(self, name: Optional[str]):
+        """End the current phase span and start `name` (None just ends it)."""
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        if self._phase:
+            self.complete(self._phase[0], "phase", self._phase[1], now)
+        self._phase = (name, now) if name else None
+
+    def drain(self) -> Dict:
+        """Return and clear recorded events (picklable, for worker processes)."""
+        with self._lock:
+            self._check_fork_locked()
+            data = {'events': self._events, 'threads': list(self._threads.items())}
+            self._events, self._threads = [], {}
+        return data
+
+    def merge(self, data: Dict):
+        with self._lock:
+            self._events.extend(data.get('events', ()))
+            self._threads.update(dict(data.get('threads', ())))
+
+    def save(self, path, tool: str = "media_tools"):
+        """Write the trace as Chrome trace-event JSON (atomic replace)."""
+        import json
+        self.mark_phase(None)
+        with self._lock:
+            events, threads = list(self._events), dict(self._threads)
+        main_pid = os.getpid()
+        out = []
+        for pid in sorted({p for p, _ in threads}):
+            out.append({'name': 'process_name', 'ph': 'M', 'pid': pid, 'tid': 0,
+                        'args': {'name': tool if pid == main_pid else f"{tool} worker {pid}"}})
+        for (pid, tid), thread_name in threads.items():
+            out.append({'name': 'thread_name', 'ph': 'M', 'pid': pid, 'tid': tid,
+                        'args': {'name': thread_name}})
+        for name, cat, ts, dur, pid, tid, args in events:
+            event = {'name': name, 'cat': cat, 'ph': 'X', 'ts': round(ts, 1),
+                     'dur': round(dur, 1), 'pid': pid, 'tid': tid}
+            if args:
+                event['args'] = args
+            out.append(event)
+
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(path.name + ".tmp")
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump({'traceEvents': out, 'displayTimeUnit': 'ms'}, f)
+        os.replace(tmp, path)
+        return len(events)
+
+    def save_at_exit(self, path, tool: str = "media_tools"):
+        """Enable tracing now and save to path when the process exits."""
+        self.enable()
+
+        def save():
+            try:
+                count = self.save(path, tool)
+                logging.info(f"Trace written: {path} ({count:,} spans)")
+            except OSError as e:
+                logging.warning(f"Could not write trace to {path}: {e}")
+        atexit.register(save)
+
+# Process-wide tracer used by media_common and the tools
+TRACE = Tracer(enabled=os.environ.get(TRACE_ENV) == "1")
+
+# =============================================================================
+# ADAPTIVE CONCURRENCY (AIMD worker limits tuned at run time)
+# =============================================================================
+
+AIMD_WINDOW = 2.0           # Minimum seconds per measurement window
+AIMD_DECREASE = 0.7         # Multiplicative decrease on overload
+AIMD_TOLERANCE = 0.1        # Throughput changes smaller than this are noise
+AIMD_LATENCY_LIMIT = 2.0    # Per-item latency vs. the best recent window that counts as overload
+AIMD_HISTORY = 10           # Windows kept for the latency baseline
+
+class AdaptiveLimiter:
+    """
+    Concurrency limit for a pool of workers, optionally tuned at run time.
+
+    Completed work is measured over windows (AIMD_WINDOW seconds and at
+    least one completion per slot): throughput in items/s and latency in
+    slot-seconds per item. With adaptive=True every window adjusts the limit
+    additive-increase / multiplicative-decrease:
+
+    - throughput fell, or per-item latency rose past AIMD_LATENCY_LIMIT x the
+      best recent window without a throughput gain: whatever the workers
+      share (disk, network, ExifTool CPU) is saturated, limit *= AIMD_DECREASE
+    - otherwise, if every slot was busy: limit += 1, up to `maximum`
+
+    The window after a decrease may only grow, so one noisy window cannot
+    ratchet the limit down to the minimum.
+
+    Worker threads call acquire()/release() around each task (threads beyond
+    the limit wait); a single dispatcher uses run_adaptive().
+    """
+
+    def __init__(self, name: str, initial: int, minimum: int = 1, maximum: Optional[int] = None,
+                 adaptive: bool = True, window: float = AIMD_WINDOW):
+        self.name = name
+        # Workers spend part of their time waiting on disks or the network, so
+        # twice the usable CPUs is allowed; the controller backs off if that overloads
+        self.maximum = max(1, maximum or max(initial, 2 * available_cpus()))
+        self.minimum = max(1, min(minimum, self.maximum))
+        self.adaptive = adaptive
+        self.window = window
+        self._limit = min(self.maximum, max(self.minimum, initial))
+        self._in_flight = 0
+        self._cond = threading.Condition()
+        self._latencies = deque(maxlen=AIMD_HISTORY)
+        self._last_throughput: Optional[float] = None
+        self._start_window(time.perf_counter())
+
+    @property
+    def limit(self) -> int:
+        return self._limit
+
+    def describe(self) -> str:
+        if not self.adaptive:
+            return str(self._limit)
+        return f"auto ({self._limit} to start, {self.minimum}-{self.maximum})"
+
+    def reset(self):
+        """Forget past measurements (the next work is different, e.g. a new
+        phase); the current limit is kept."""
+        with self._cond:
+            self._latencies.clear()
+            self._last_throughput = None
+            self._start_window(time.perf_counter())
+
+    def _start_window(self, now: float):
+        self._window_start = now
+        self._completions = 0
+        self._items = 0
+        self._busy = 0.0
+        self._peak = self._in_flight
+
+    def begin(self) -> float:
+        """Count a task as started without waiting (the caller keeps to `limit`)."""
+        with self._cond:
+            self._in_flight += 1
+            self._peak = max(self._peak, self._in_flight)
+        return time.perf_counter()
+
+    def acquire(self) -> float:
+        """Wait for a free slot; returns the start time to pass to release()."""
+        with self._cond:
+            while self._in_flight >= self._limit:
+                self._cond.wait()
+            self._in_flight += 1
+            self._peak = max(self._peak, self._in_flight)
+        return time.perf_counter()
+
+    def release(self, start: float, items: int = 1):
+        """Record a finished task that covered `items` work items (e.g. files in a batch)."""
+        now = time.perf_counter()
+        with self._cond:
+            self._in_flight -= 1
+            self._completions += 1
+            self._items += items
+            self._busy += now - start
+            if now - self._window_start >= self.window and self._completions >= self._limit:
+                self._adjust_locked(now)
+            self._cond.notify_all()
+
+    def _adjust_locked(self, now: float):
+        throughput = self._items / (now - self._window_start)
+        latency = self._busy / max(1, self._items)
+        self._latencies.append(latency)
+        previous = self._last_throughput
+        old = self._limit
+
+        if self.adaptive:
+            gained = previous is not None and throughput > previous * (1 + AIMD_TOLERANCE)
+            overloaded = previous is not None and (
+                throughput < previous * (1 - AIMD_TOLERANCE)
+                or (latency > min(self._latencies) * AIMD_LATENCY_LIMIT and not gained))
+            if overloaded:
+                self._limit = max(self.minimum, int(self._limit * AIMD_DECREASE))
+            elif self._peak >= self._limit and self._limit < self.maximum:
+                self._limit += 1
+
+        self._last_throughput = None if self._limit < old else throughput
+        METRICS.set_gauge(f"{self.name}_limit", self._limit)
+        METRICS.set_gauge(f"{self.name}_items_per_s", round(throughput, 1))
+        if self._limit != old:
+            METRICS.inc(f"{self.name}_{'increases' if self._limit > old else 'decreases'}")
+            logging.info(f"{self.name}: limit {old} -> {self._limit} "
+                         f"({throughput:.1f} items/s, {latency * 1000:.1f} ms per item)")
+        self._start_window(now)
+
+def run_adaptive(submit: Callable, items: Iterable, limiter: AdaptiveLimiter,
+                 weight: Optional[Callable] = None) -> Iterator:
+    """
+    Dispatch items to an executor, keeping `limiter.limit` tasks in flight.
+
+    Args:
+        submit: item -> Future (e.g. lambda b: pool.submit(fn, b)); the
+            executor should have limiter.maximum workers
+        items: Work items
+        limiter: Concurrency limit, fed with each completion
+        weight: item -> work items it covers (e.g. len for batches; default 1)
+
+    Yields:
+        (item, future) in completion order
+    """
+    source = iter(items)
+    pending: Dict = {}
+    limiter.reset()
+
+    def submit_next() -> bool:
+        for item in source:
+            pending[submit(item)] = (item, limiter.begin())
+            return True
+        return False
+
+    while True:
+        while len(pending) < limiter.limit and submit_next():
+            pass
+        if not pending:
+            return
+        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+        finished = [(fut, pending.pop(fut)) for fut in done]
+        for _, (item, start) in finished:
+            limiter.release(start, weight(item) if weight else 1)
+        for fut, (item, _) in finished:
+            yield item, fut
+
+def worker_limiter(name: str, workers, default: int, maximum: Optional[int] = None) -> AdaptiveLimiter:
+    """
+    Limiter for a --workers setting: 'auto' starts at `default` and adapts
+    (up to `maximum`, default: twice the usable CPUs); a number, or None
+    for `default`, stays fixed.
+    """
+    if workers == 'auto':
+        return AdaptiveLimiter(name, default, maximum=maximum)
+    fixed = int(workers or default)
+    return AdaptiveLimiter(name, fixed, minimum=fixed, maximum=fixed, adaptive=False)
+
+def parse_workers(value: str):
+    """argparse type for --workers: a positive number or 'auto'."""
+    if value.lower() == 'auto':
+        return 'auto'
+    try:
+        count = int(value)
+    except ValueError:
+        count = 0
+    if count < 1:
+        import argparse
+        raise argparse.ArgumentTypeError(f"expected a positive number or 'auto', got '{value}'")
+    return count
+
+def positive_int(value: str) -> int:
+    """argparse type for sizes and counts that must be at least 1."""
+    try:
+        number = int(value)
+    except ValueError:
+        number = 0
+    if number < 1:
+        import argparse
+        raise argparse.ArgumentTypeError(f"expected a positive number, got '{value}'")
+    return number
+
+# =============================================================================
+# THROTTLING (Token-bucket I/O caps, process priority and run schedules)
+# =============================================================================
+
+THROTTLE_CAPS = ('read_mb_s', 'write_mb_s', 'files_per_s')
+THROTTLE_RECHECK = 30.0        # Seconds between schedule evaluations
+WEEKDAYS = ('mon', 'tue', 'wed', 'thu', 'fri', 'sat', 'sun')
+
+class TokenBucket:
+    """
+    Thread-safe token bucket refilled at `rate` tokens per second.
+
+    take() is charged after the work is done and may drive the bucket into
+    debt (a 16 MB read against a 4 MB/s cap); the caller then sleeps until
+    the debt is repaid, so concurrent callers share the rate between them.
+    A rate of None means unlimited.
+    """
+
+    def __init__(self, rate: Optional[float] = None):
+        self._lock = threading.Lock()
+        self.set_rate(rate)
+
+    def set_rate(self, rate: Optional[float]):
+        """Change the rate; the burst allowance is one second of tokens."""
+        with self._lock:
+            self.rate = rate or None
+            self.tokens = self.rate or 0.0
+            self.stamp = time.monotonic()
+
+    def take(self, amount: float) -> float:
+        """Consume `amount` tokens, sleeping while in debt. Returns seconds slept."""
+        if self.rate is None:
+            return 0.0
+        with self._lock:
+            if self.rate is None:
+                return 0.0
+            now = time.monotonic()
+            self.tokens = min(self.rate, self.tokens + (now - self.stamp) * self.rate) - amount
+            self.stamp = now
+            delay = -self.tokens / self.rate if self.tokens < 0 else 0.0
+        if delay > 0:
+            time.sleep(delay)
+        return delay
+
+def _parse_clock(text: str) -> int:
+    hours, _, minutes = str(text).partition(':')
+    value = int(hours) * 60 + int(minutes or 0)
+    if not 0 <= value <= 24 * 60:
+        raise ValueError(f"time out of range: {text}")
+    return value
+
+def load_throttle_schedule(path) -> List[Dict]:
+    """
+    Read a throttle schedule.
+
+    Format (JSON):
+        {
+          "windows": [
+            {"start": "01:00", "end": "06:00"},
+            {"start": "08:00", "end": "18:00", "days": ["mon", "tue", "wed", "thu", "fri"],
+             "read_mb_s": 20, "write_mb_s": 20, "files_per_s": 50}
+          ]
+        }
+
+    While a window is open its caps replace the command-line ones; caps it
+    leaves out are unlimited, so a window without caps runs unthrottled.
+    Windows may wrap midnight (start > end); the first matching one wins.
+
+    Raises:
+        ValueError: If the file is missing or malformed
+    """
+    import json
+    try:
+        config = json.loads(Path(path).read_text(encoding='utf-8'))
+    except (OSError, ValueError) as e:
+        raise ValueError(f"cannot read throttle schedule {path}: {e}")
+    windows = config.get('windows') if isinstance(config, dict) else None
+    if not isinstance(windows, list):
+        raise ValueError(f"throttle schedule {path}: expected {{\"windows\": [...]}}")
+    parsed = []
+    for i, window in enumerate(windows, 1):
+        try:
+            days = [d.lower()[:3] for d in window.get('days', WEEKDAYS)]
+            if any(d not in WEEKDAYS for d in days):
+                raise ValueError(f"unknown day in {window['days']}")
+            parsed.append({
+                'start': _parse_clock(window['start']),
+                'end': _parse_clock(window['end']),
+                'days': {WEEKDAYS.index(d) for d in days},
+                'caps': {cap: float(window[cap]) for cap in THROTTLE_CAPS if window.get(cap)},
+            })
+        except KeyError as e:
+            raise ValueError(f"throttle schedule {path}, window {i}: missing {e}")
+        except (TypeError, ValueError, AttributeError) as e:
+            raise ValueError(f"throttle schedule {path}, window {i}: {e}")
+    return parsed
+
+class Throttle:
+    """
+    Process-wide caps on bytes read, bytes written and files started per
+    second, optionally switched by a schedule.
+
+    Hashing (read_chunks), copies (fast_copy_file) and the tools' per-file
+    and per-batch dispatch loops report their work here; each report waits
+    if its token bucket is in debt. With no caps configured every call
+    returns immediately.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.read_bytes = TokenBucket()
+        self.write_bytes = TokenBucket()
+        self.file_starts = TokenBucket()
+        self.configure()
+
+    def configure(self, read_mb_s: Optional[float] = None, write_mb_s: Optional[float] = None,
+                  files_per_s: Optional[float] = None, schedule: Optional[List[Dict]] = None):
+        """Set the default caps (None/0 = unlimited) and an optional schedule (load_throttle_schedule())."""
+        with self._lock:
+            self.defaults = {'read_mb_s': read_mb_s or None, 'write_mb_s': write_mb_s or None,
+                             'files_per_s': files_per_s or None}
+            self.schedule = schedule or []
+            self.enabled = bool(self.schedule) or any(self.defaults.values())
+            self.caps: Optional[Dict] = None
+            self._checked = float('-inf')
+        self._refresh()
+
+    def caps_at(self, when: datetime) -> Dict:
+        """Caps in force at `when` (first open schedule window, else the defaults)."""
+        minute = when.hour * 60 + when.minute
+        for window in self.schedule:
+            start, end = window['start'], window['end']
+            # A window wrapping midnight belongs to the day it started on
+            day = (when.weekday() - 1) % 7 if start > end and minute < end else when.weekday()
+            inside = start <= minute < end if start <= end else (minute >= start or minute < end)
+            if inside and day in window['days']:
+                return {cap: window['caps'].get(cap) for cap in THROTTLE_CAPS}
+        return dict(self.defaults)
+
+    def _refresh(self):
+        now = time.monotonic()
+        if now - self._checked < THROTTLE_RECHECK:
+            return
+        with self._lock:
+            if now - self._checked < THROTTLE_RECHECK:
+                return
+            self._checked = now
+            caps = self.caps_at(datetime.now())
+            if caps == self.caps:
+                return
+            first = self.caps is None
+            self.caps = caps
+        mb = 1024 * 1024
+        self.read_bytes.set_rate(caps['read_mb_s'] and caps['read_mb_s'] * mb)
+        self.write_bytes.set_rate(caps['write_mb_s'] and caps['write_mb_s'] * mb)
+        self.file_starts.set_rate(caps['files_per_s'])
+        if self.enabled and not first:
+            logging.info(f"Throttle: {self.describe()}")
+
+    def describe(self) -> str:
+        """e.g. 'read 20 MB/s, 50 files/s' or 'off'; notes a schedule."""
+        caps = self.caps or self.defaults
+        parts = [f"read {caps['read_mb_s']:g} MB/s" if caps['read_mb_s'] else "",
+                 f"write {caps['write_mb_s']:g} MB/s" if caps['write_mb_s'] else "",
+                 f"{caps['files_per_s']:g} files/s" if caps['files_per_s'] else ""]
+        text = ", ".join(p for p in parts if p) or "off"
+        if self.schedule:
+            text += f" (schedule: {len(self.schedule)} window{'s' if len(self.schedule) != 1 else ''})"
+        return text
+
+    def _take(self, bucket: TokenBucket, amount: float):
+        self._refresh()
+        waited = bucket.take(amount)
+        if waited:
+            METRICS.observe('throttle_wait_seconds', waited)
+
+    def read(self, nbytes: int):
+        """nbytes were read."""
+        if self.enabled:
+            self._take(self.read_bytes, nbytes)
+
+    def write(self, nbytes: int):
+        """nbytes were written."""
+        if self.enabled:
+            self._take(self.write_bytes, nbytes)
+
+    def files(self, count: int = 1):
+        """count files are about to be processed."""
+        if self.enabled:
+            self._take(self.file_starts, count)
+
+    def batch(self, paths: List[Path], read: bool = False, write: bool = False):
+        """
+        A batch of files is about to be handed to a worker (e.g. an ExifTool
+        process). Charges the file count, plus the files' sizes as reads
+        and/or writes when the worker reads or rewrites them whole.
+        """
+        if not self.enabled:
+            return
+        self.files(len(paths))
+        if (read and self.read_bytes.rate) or (write and self.write_bytes.rate):
+            size = 0
+            for path in paths:
+                try:
+                    size += os.path.getsize(path)
+                except OSError:
+                    pass
+            if read:
+                self.read(size)
+            if write:
+                self.write(size)
+
+# Process-wide throttle used by media_common and the tools
+THROTTLE = Throttle()
+
+_IOPRIO_SET_SYSCALL = {'x86_64': 251, 'amd64': 251, 'i386': 289, 'i686': 289,
+                       'aarch64': 30, 'arm64': 30, 'armv7l': 314, 'ppc64le': 273, 's390x': 282}
+IOPRIO_CLASS_IDLE = 3
+
+def set_process_priority(nice: Optional[int] = None, idle_io: bool = False) -> List[str]:
+    """
+    Lower this process's CPU priority (nice level) and/or put its I/O in the
+    idle class (Linux ioprio_set; other processes' I/O always goes first).
+
+    Call before any worker threads, pools or ExifTool processes start: they
+    inherit both settings from the thread that creates them.
+
+    Returns:
+        Descriptions of the settings applied; failures are logged and skipped
+    """
+    applied = []
+    if nice is not None:
+        try:
+            os.setpriority(os.PRIO_PROCESS, 0, nice)
+            applied.append(f"nice {nice}")
+        except (AttributeError, OSError) as e:
+            logging.warning(f"Cannot set nice level {nice}: {e}")
+    if idle_io:
+        import platform
+        syscall = _IOPRIO_SET_SYSCALL.get(platform.machine().lower())
+        if not sys.platform.startswith('linux') or syscall is None:
+            logging.warning("Idle I/O priority needs Linux (ioprio_set) - ignored")
+        else:
+            import ctypes
+            libc = ctypes.CDLL(None, use_errno=True)
+            # ioprio_set(IOPRIO_WHO_PROCESS, 0 = calling thread, class << 13)
+            if libc.syscall(syscall, 1, 0, IOPRIO_CLASS_IDLE << 13) == 0:
+                applied.append("idle I/O")
+            else:
+                logging.warning(f"Cannot set idle I/O priority: {os.strerror(ctypes.get_errno())}")
+    return applied
+
+# =============================================================================
+# STREAMING PIPELINE (Bounded producer/consumer stages)
+# =============================================================================
+
+class PipelineStage:
+    """
+    One stage of a streaming pipeline.
+
+    fn(item) returns the item for the next stage, or None to drop it
+    (stages handle and log their own per-item errors). With a limiter the
+    stage starts limiter.maximum threads, of which limiter.limit run at once.
+    """
+    def __init__(self, name: str, fn: Callable, workers: int = 1,
+                 limiter: Optional[AdaptiveLimiter] = None):
+        self.name = name
+        self.fn = fn
+        self.limiter = limiter
+        self.workers = limiter.maximum if limiter else max(1, workers)
+
+_PIPELINE_DONE = object()
+
+def run_pipeline(source: Iterable, stages: List[PipelineStage], queue_size: int = 64) -> Iterator:
+    """
+    Stream items from `source` through `stages`, each on its own threads.
+
+    Stages are connected by bounded queues: when a downstream stage falls
+    behind, upstream workers (and the source) block instead of piling up
+    work in memory. Results are yielded in completion order as soon as the
+    last stage finishes them.
+
+    Args:
+        source: Iterable of input items (consumed lazily on a feeder thread)
+        stages: Ordered list of PipelineStage
+        queue_size: Capacity of each inter-stage queue
+
+    Yields:
+        Items returned by the final stage
+    """
+    queues = [queue.Queue(maxsize=queue_size) for _ in range(len(stages) + 1)]
+    gauges = [f"queue_depth_{stage.name}" for stage in stages] + ["queue_depth_output"]
+    stop = threading.Event()
+    errors = []
+
+    def put(index: int, item) -> bool:
+        q = queues[index]
+        while not stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                METRICS.set_gauge(gauges[index], q.qsize())
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def get(q):
+        while not stop.is_set():
+            try:
+                return q.get(timeout=0.1)
+            except queue.Empty:
+                continue
+        return _PIPELINE_DONE
+
+    def feeder():
+        try:
+            for item in source:
+                if not put(0, item):
+                    return
+        except Exception as e:
+            errors.append(e)
+        finally:
+            for _ in range(stages[0].workers):
+                put(0, _PIPELINE_DONE)
+
+    def worker(index: int, remaining: List[int], lock: threading.Lock):
+        stage = stages[index]
+        inq = queues[index]
+        while True:
+            item = get(inq)
+            if item is _PIPELINE_DONE:
+                break
+            start = stage.limiter.acquire() if stage.limiter else 0.0
+            try:
+                result = stage.fn(item)
+            except Exception as e:
+                logging.error(f"Pipeline stage '{stage.name}' failed on {item}: {e}")
+                continue
+            finally:
+                if stage.limiter:
+                    stage.limiter.release(start)
+            if result is not None and not put(index + 1, result):
+                return
+        with lock:
+            remaining[0] -= 1
+            last = remaining[0] == 0
+        if last:
+            downstream = stages[index + 1].workers if index + 1 < len(stages) else 1
+            for _ in range(downstream):
+                put(index + 1, _PIPELINE_DONE)
+
+    threads = [threading.Thread(target=feeder, name="pipeline-source", daemon=True)]
+    for i, stage in enumerate(stages):
+        remaining, lock = [stage.workers], threading.Lock()
+        for n in range(stage.workers):
+            threads.append(threading.Thread(target=worker, args=(i, remaining, lock),
+                                            name=f"pipeline-{stage.name}-{n}", daemon=True))
+    for t in threads:
+        t.start()
+
+    try:
+        while True:
+            item = get(queues[-1])
+            if item is _PIPELINE_DONE:
+                break
+            yield item
+    finally:
+        stop.set()
+
+    if errors:
+        raise errors[0]
+
+# =============================================================================
+# DEVICE-AWARE EXECUTOR (Parallel file actions with per-device limits)
+# =============================================================================
+
+def device_of(path: Path, cache: Optional[Dict[str, int]] = None) -> int:
+    """
+    Return st_dev for a path, or for its nearest existing ancestor when the
+    path does not exist yet (e.g. a destination folder about to be created).
+    """
+    path = Path(path)
+    key = str(path)
+    if cache is not None and key in cache:
+        return cache[key]
+    probe = path
+    while True:
+        try:
+            dev = probe.stat().st_dev
+            break
+        except OSError:
+            if probe.parent == probe:
+                dev = 0
+                break
+            probe = probe.parent
+    if cache is not None:
+        cache[key] = dev
+    return dev
+
+def run_device_limited(items: Iterable, fn: Callable, devices: Callable,
+                       workers: int, per_source: int = 2, per_dest: int = 2,
+                       limiter: Optional[AdaptiveLimiter] = None) -> Iterator:
+    """
+    Run fn(item) concurrently while capping concurrency per storage device.
+
+    Each item holds one slot on its source device and one on its destination
+    device for the duration of fn, so one slow disk cannot be hammered by
+    every worker while another sits idle. Slots are always acquired in the
+    same order, so two workers can never deadlock.
+
+    Args:
+        items: Work items
+        fn: Callable run on a worker thread; its return value is yielded
+        devices: item -> (source st_dev, destination st_dev)
+        workers: Total concurrent operations
+        per_source: Concurrent operations reading from one device
+        per_dest: Concurrent operations writing to one device
+        limiter: Optional adaptive limit on total concurrency (then up to
+            limiter.maximum threads run, `workers` is ignored)
+
+    Yields:
+        (item, result) in completion order; result is None if fn raised
+    """
+    limits: Dict[tuple, threading.Semaphore] = {}
+    limits_lock = threading.Lock()
+
+    def slot(kind: str, dev: int, limit: int) -> threading.Semaphore:
+        with limits_lock:
+            if (kind, dev) not in limits:
+                limits[(kind, dev)] = threading.Semaphore(max(1, limit))
+            return limits[(kind, dev)]
+
+    def run(item):
+        src_dev, dst_dev = devices(item)
+        slots = sorted([(('dst', dst_dev), per_dest), (('src', src_dev), per_source)])
+        held = []
+        start = limiter.acquire() if limiter else 0.0
+        try:
+            for (kind, dev), limit in slots:
+                sem = slot(kind, dev, limit)
+                sem.acquire()
+                held.append(sem)
+            return fn(item)
+        finally:
+            for sem in reversed(held):
+                sem.release()
+            if limiter:
+                limiter.release(start)
+
+    workers = limiter.maximum if limiter else max(1, workers)
+    source = iter(items)
+    pending: Dict = {}
+
+    with ThreadPoolExecutor(max_workers=workers) as ex:
+        def submit_next() -> bool:
+            for item in source:
+                pending[ex.submit(run, item)] = item
+                return True
+            return False
+
+        # Keep a bounded number of submitted actions instead of one future per item
+        for _ in range(workers * 4):
+            if not submit_next():
+                break
+
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for fut in done:
+                item = pending.pop(fut)
+                try:
+                    result = fut.result()
+                except Exception as e:
+                    logging.error(f"Action failed for {item}: {e}")
+                    result = None
+                submit_next()
+                yield item, result
+
+# =============================================================================
+# LOGGING UTILITIES (Consistent logging across tools)
+# =============================================================================
+
+LOG_FORMAT = '%(asctime)s | %(levelname)-7s | %(message)s'
+LOG_DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+LOG_MAX_BYTES = 100 * 1024 * 1024   # Rotate the log file beyond this size
+LOG_BACKUP_COUNT = 5                # Rotated files kept (name.log.1 ... .5)
+LOG_FLUSH_RECORDS = 512             # Flush after this many buffered records
+LOG_FLUSH_INTERVAL = 1.0            # ... or this many seconds
+
+# Per-file action lines (COPIED/MOVED/WOULD ...) go through this logger (see log_action)
+ACTION_LOGGER = logging.getLogger("media_tools.actions")
+
+class BatchedFileHandler(logging.FileHandler):
+    """
+    File handler that writes formatted records in batches.
+
+    Records are buffered and written with one write+flush once
+    `flush_records` are pending or `flush_interval` seconds have passed
+    (the background log writer also flushes when idle, and on close). The
+    file is rotated to name.1 ... name.N once it grows past max_bytes.
+
+    In a forked worker process (no background writer there) every record
+    is written and flushed immediately.
+    """
+
+    def __init__(self, filename, mode: str = 'a', encoding: str = 'utf-8',
+                 max_bytes: int = LOG_MAX_BYTES, backup_count: int = LOG_BACKUP_COUNT,
+                 flush_records: int = LOG_FLUSH_RECORDS, flush_interval: float = LOG_FLUSH_INTERVAL):
+        super().__init__(filename, mode=mode, encoding=encoding)
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.flush_records = flush_records
+        self.flush_interval = flush_interval
+        self._pending: List[str] = []
+        self._last_flush = time.monotonic()
+        self._size = self.stream.tell() if self.stream else 0
+        self._pid = os.getpid()
+
+    def emit(self, record):
+        try:
+            msg = self.format(record) + self.terminator
+        except Exception:
+            self.handleError(record)
+            return
+        if os.getpid() != self._pid:
+            self._pid, self._pending = os.getpid(), []  # Parent writes its own pending records
+            self.flush_records = 1
+        self._pending.append(msg)
+        if (len(self._pending) >= self.flush_records
+                or time.monotonic() - self._last_flush >= self.flush_interval):
+            self.flush()
+
+    def flush(self):
+        self.acquire()
+        try:
+            if self._pending and self.stream:
+                data, self._pending = ''.join(self._pending), []
+                if self.max_bytes and self._size and self._size + len(data) > self.max_bytes:
+                    self._rotate()
+                self.stream.write(data)
+                self.stream.flush()
+                self._size += len(data)  # Characters, close enough to bytes for rotation
+            self._last_flush = time.monotonic()
+        finally:
+            self.release()
+
+    def _rotate(self):
+        self.stream.close()
+        for i in range(self.backup_count - 1, 0, -1):
+            src = f"{self.baseFilename}.{i}"
+            if os.path.exists(src):
+                os.replace(src, f"{self.baseFilename}.{i + 1}")
+        if self.backup_count > 0:
+            os.replace(self.baseFilename, f"{self.baseFilename}.1")
+        self.mode = 'w'
+        self.stream = self._open()
+        self._size = 0
+
+class JsonLinesFormatter(logging.Formatter):
+    """One compact JSON object per record: time, level and the record's `fields` (or message)."""
+    def format(self, record):
+        import json
+        entry = {'ts': round(record.created, 3), 'level': record.levelname}
+        fields = getattr(record, 'fields', None)
+        if fields:
+            entry.update(fields)
+        else:
+            entry['msg'] = record.getMessage()
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+class SampleFilter(logging.Filter):
+    """Pass one in `every` INFO records (warnings and errors always pass)."""
+    def __init__(self, every: int):
+        super().__init__()
+        self.every = max(1, every)
+        self._seen = 0
+
+    def filter(self, record):
+        if record.levelno > logging.INFO:
+            return True
+        self._seen += 1
+        return (self._seen - 1) % self.every == 0
+
+class _LogListener:
+    """
+    Background thread that hands queued records to the log handlers and
+    flushes them whenever the queue is idle. (Same role as
+    logging.handlers.QueueListener, which would pull socket and pickle
+    into every tool's startup.)
+    """
+    def __init__(self, q: queue.Queue, *handlers, flush_interval: float = LOG_FLUSH_INTERVAL):
+        self.queue = q
+        self.handlers = handlers
+        self.flush_interval = flush_interval
+        self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        """Write every queued record, then end the thread."""
+        self.queue.put(None)
+        self._thread.join()
+
+    def _run(self):
+        while True:
+            try:
+                record = self.queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                for handler in self.handlers:
+                    handler.flush()
+                continue
+            if record is None:
+                break
+            self.handle(record)
+        for handler in self.handlers:
+            handler.flush()
+
+    def handle(self, record):
+        for handler in self.handlers:
+            if record.levelno >= handler.level:
+                handler.handle(record)
+
+class _AsyncLogHandler(logging.Handler):
+    """
+    Queue records for the listener thread; forked workers (no listener
+    thread there) write synchronously instead.
+    """
+    def __init__(self, q: queue.Queue, listener: _LogListener):
+        super().__init__()
+        self.queue = q
+        self.listener = listener
+        self._pid = os.getpid()
+
+    def emit(self, record):
+        if os.getpid() != self._pid:
+            self.listener.handle(record)
+            return
+        try:
+            self.queue.put_nowait(self.prepare(record))
+        except Exception:
+            self.handleError(record)
+
+    def prepare(self, record) -> logging.LogRecord:
+        # Merge args and traceback into the message now, in the caller's thread
+        msg = self.format(record)
+        record = logging.makeLogRecord(record.__dict__)
+        record.message = record.msg = msg
+        record.args = record.exc_info = record.exc_text = record.stack_info = None
+        return record
+
+_log_listener: Optional[_LogListener] = None
+_log_file: Optional[Path] = None
+
+def setup_logging(tool_name: str, log_dir: Path, action_log: Optional[Path] = None,
+                  sample_every: int = 1) -> Path:
+    """
+    Setup standardized logging for media tools.
+
+    Records are queued by the calling thread and written by one background
+    thread, in batches, so per-file logging
+    does not put a synchronous write+flush on worker hot paths. Queued
+    records are flushed at exit (also after an unhandled exception) and
+    on flush_logs().
+
+    Args:
+        tool_name: Name of the tool (e.g., 'deduplicate', 'scrubber')
+        log_dir: Directory to store logs
+        action_log: Write per-file action records (log_action) as compact
+            JSON lines to this file instead of the text log and console
+        sample_every: Keep one in N per-file action lines in the text log
+
+    Returns:
+        Path to the log file
+    """
+    global _log_listener, _log_file
+    if _log_listener is not None:
+        return _log_file  # Already configured (like logging.basicConfig)
+
+    log_dir.mkdir(exist_ok=True)
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    log_file = log_dir / f"{tool_name}_{timestamp}.log"
+
+    formatter = logging.Formatter(LOG_FORMAT, datefmt=LOG_DATE_FORMAT)
+    file_handler = BatchedFileHandler(log_file, mode='w')
+    console_handler = logging.StreamHandler()
+    handlers = [file_handler, console_handler]
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    def is_action(record) -> bool:
+        return record.name == ACTION_LOGGER.name
+
+    if action_log:
+        action_log = Path(action_log)
+        action_log.parent.mkdir(parents=True, exist_ok=True)
+        json_handler = BatchedFileHandler(action_log)
+        json_handler.setFormatter(JsonLinesFormatter())
+        json_handler.addFilter(is_action)
+        file_handler.addFilter(lambda record: not is_action(record))
+        console_handler.addFilter(lambda record: not is_action(record))
+        handlers.append(json_handler)
+    elif sample_every > 1:
+        ACTION_LOGGER.addFilter(SampleFilter(sample_every))
+
+    log_queue: "queue.Queue[logging.LogRecord]" = queue.Queue()
+    listener = _LogListener(log_queue, *handlers)
+    root = logging.getLogger()
+    root.setLevel(logging.INFO)
+    root.addHandler(_AsyncLogHandler(log_queue, listener))
+    listener.start()
+
+    _log_listener, _log_file = listener, log_file
+    atexit.register(shutdown_logging)
+    return log_file
+
+def log_action(message: str, **fields):
+    """
+    Log one per-file action (e.g. a copy): a text line in the log, or a
+    JSON record with `fields` when setup_logging() was given an action_log.
+    """
+    ACTION_LOGGER.info(message, extra={'fields': fields})
+
+def flush_logs():
+    """Write out every queued and buffered log record now."""
+    listener = _log_listener
+    if listener is None:
+        return
+    deadline = time.monotonic() + 5
+    while not listener.queue.empty() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    for handler in listener.handlers:
+        handler.flush()
+
+def shutdown_logging():
+    """Drain the log queue, stop the background writer and close log files (runs at exit)."""
+    global _log_listener
+    listener = _log_listener
+    if listener is None:
+        return
+    _log_listener = None
+    try:
+        listener.stop()  # Processes every queued record first
+    except Exception:
+        pass
+    for handler in listener.handlers:
+        handler.close()
+
+# =============================================================================
+# EXIFTOOL INTERFACE (Unified metadata access)
+# =============================================================================
+
+# Resolved ExifTool path and version, reused across runs until the binary changes
+EXIFTOOL_CACHE_FILE = Path(__file__).resolve().parent.parent / "cache" / "exiftool.json"
+
+def check_exiftool() -> bool:
+    """Verify ExifTool is installed and accessible."""
+    return find_exiftool() is not None
+
+@functools.lru_cache(maxsize=None)
+def find_exiftool() -> Optional[Tuple[str, str]]:
+    """
+    Resolve the ExifTool executable and its version.
+
+    `exiftool -ver` starts Perl (100+ ms), so the result is cached in
+    EXIFTOOL_CACHE_FILE and reused while the binary's path, size and mtime
+    are unchanged.
+
+    Returns:
+        (path, version), or None if ExifTool is missing or does not run
+    """
+    import json
+    import shutil
+    import subprocess
+    path = shutil.which(get_exiftool_path())
+    if path is None:
+        return None
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    key = {'path': path, 'size': st.st_size, 'mtime_ns': st.st_mtime_ns}
+    try:
+        cached = json.loads(EXIFTOOL_CACHE_FILE.read_text(encoding='utf-8'))
+        if all(cached.get(k) == v for k, v in key.items()) and cached.get('version'):
+            return path, cached['version']
+    except (OSError, ValueError, AttributeError):
+        pass
+
+    try:
+        result = subprocess.run([path, '-ver'], capture_output=True, text=True, timeout=30, check=True)
+    except (OSError, subprocess.SubprocessError):
+        return None
+    version = result.stdout.strip()
+    try:
+        EXIFTOOL_CACHE_FILE.parent.mkdir(parents=True, exist_ok=True)
+        tmp = EXIFTOOL_CACHE_FILE.with_name(f"{EXIFTOOL_CACHE_FILE.name}.{os.getpid()}.tmp")
+        tmp.write_text(json.dumps(dict(key, version=version)), encoding='utf-8')
+        os.replace(tmp, EXIFTOOL_CACHE_FILE)
+    except OSError:
+        pass  # Read-only install: probe again next run
+    return path, version
+
+def get_exiftool_version() -> Optional[str]:
+    """Installed ExifTool version (e.g. '12.76'), or None if not found."""
+    found = find_exiftool()
+    return found[1] if found else None
+
+def get_exiftool_path() -> str:
+    """Locate ExifTool executable (Windows + Unix)."""
+    # Common Windows paths
+    windows_paths = [
+        r"D:\Files\Programs-Portable\ExifTool\exiftool.exe",
+        r"C:\Windows\exiftool.exe",
+        r"C:\Program Files\ExifTool\exiftool.exe"
+    ]
+
+    for p in windows_paths:
+        if os.path.exists(p):
+            return p
+
+    # Fallback to PATH
+    return "exiftool"
+
+# Tags requested by get_metadata() (shared by media-manager and friends)
+METADATA_TAGS = [
+    '-FileType', '-DateTimeOriginal', '-CreateDate',
+    '-QuickTime:CreationDate', '-MediaCreateDate', '-ModifyDate',
+    '-Subject', '-Keywords',
+    '-Rating', '-ImageWidth', '-ImageHeight',
+    '-Make', '-Model'
+]
+
+def _metadata_args(is_video: bool) -> List[str]:
+    """Build the ExifTool argument list used by get_metadata()."""
+    args = ['-j', '-G', '-q'] + METADATA_TAGS
+    if not is_video:
+        args.append('-fast2')
+    return args
+
+def get_metadata(file_path: Path, is_video: bool = False) -> Dict:
+    """
+    Extract metadata from a media file using ExifTool.
+
+    Runs on the shared persistent ExifTool pool, so no process is spawned
+    per file.
+
+    Args:
+        file_path: Path to media file
+        is_video: Whether file is a video (disables -fast2 for full scan)
+
+    Returns:
+        Dictionary of metadata tags and values
+    """
+    try:
+        return get_exiftool_pool().get_metadata(file_path, _metadata_args(is_video))
+    except Exception as e:
+        logging.error(f"Failed to read metadata from {file_path}: {e}")
+
+    return {}
+
+def get_metadata_batch(file_paths: List[Path], is_video: bool = False) -> List[Dict]:
+    """
+    Extract metadata for several files with a single ExifTool request.
+
+    Args:
+        file_paths: Paths to media files
+        is_video: Whether the files are videos (disables -fast2)
+
+    Returns:
+        List of metadata dictionaries, aligned with file_paths
+        (empty dict for files ExifTool could not read)
+    """
+    try:
+        return get_exiftool_pool().get_metadata_batch(file_paths, _metadata_args(is_video))
+    except Exception as e:
+        logging.error(f"Failed to read metadata for batch of {len(file_paths)} files: {e}")
+
+    return [{} for _ in file_paths]
+
+def run_exiftool(cmd: List[str], files: int = 0, **kwargs) -> 'subprocess.CompletedProcess':
+    """
+    subprocess.run() for a one-shot ExifTool command, recorded in METRICS
+    (exiftool_seconds includes process startup; counted in exiftool_launches).
+
+    Args:
+        cmd: Full command line
+        files: Number of files the command covers (exiftool_files counter)
+        **kwargs: Passed to subprocess.run (exceptions propagate unchanged)
+    """
+    import subprocess
+    METRICS.inc('exiftool_launches')
+    METRICS.inc('exiftool_files', files)
+    start = time.perf_counter()
+    try:
+        return subprocess.run(cmd, **kwargs)
+    finally:
+        end = time.perf_counter()
+        METRICS.observe('exiftool_seconds', end - start)
+        TRACE.complete('exiftool_launch', 'exiftool', start, end, files=files)
+
+# =============================================================================
+# DATE PARSING (Fixed-format ExifTool dates without strptime)
+# =============================================================================
+
+_UNIX_EPOCH_ORDINAL = 719163        # date(1970, 1, 1).toordinal()
+_UNSEEN = object()
+
+# A library spans a few thousand days and a handful of UTC offsets, so those
+# fields are parsed once per distinct text
+_EXIF_DAYS: Dict[str, Optional[int]] = {}      # 'YYYY:MM:DD' -> days since 1970-01-01
+_EXIF_OFFSETS: Dict[str, Optional[int]] = {}   # '+02:00', 'Z', ... -> seconds east of UTC
+
+def _exif_day(text: str) -> Optional[int]:
+    days = None
+    if text[4] == text[7] and text[4] in ':-':
+        try:
+            days = date(int(text[:4]), int(text[5:7]), int(text[8:])).toordinal() - _UNIX_EPOCH_ORDINAL
+        except ValueError:
+            pass
+    _EXIF_DAYS[text] = days
+    return days
+
+def _exif_offset(text: str) -> Optional[int]:
+    offset = None
+    if text[0] == 'Z':
+        offset = 0
+    elif text[0] in '+-':
+        digits = text[1:6].replace(':', '')
+        if digits[:4].isdigit():
+            offset = int(digits[:2]) * 3600 + int(digits[2:4]) * 60
+        elif digits[:2].isdigit():
+            offset = int(digits[:2]) * 3600
+        if offset is not None and text[0] == '-':
+            offset = -offset
+    _EXIF_OFFSETS[text] = offset
+    return offset
+
+def parse_exif_date(value) -> Optional[Tuple[int, Optional[int]]]:
+    """
+    Parse an ExifTool date/time 'YYYY:MM:DD HH:MM:SS[.sss][+HH:MM|-HH:MM|Z]'.
+
+    Fields sit at fixed positions, so the string is sliced instead of going
+    through datetime.strptime (several times slower, see
+    benchmarks/bench_dates.py). ISO 8601 separators ('-', 'T') are accepted,
+    sub-seconds are dropped and unrecognized suffixes are ignored.
+
+    Returns:
+        (seconds, offset): the wall-clock time as written, in seconds since
+        1970-01-01, and its UTC offset in seconds (None when the string has
+        none; the UTC instant is seconds - offset). None for empty, zero
+        ('0000:00:00 00:00:00') or malformed dates.
+    """
+    if not isinstance(value, str):
+        return None
+    s = value.strip()
+    if len(s) < 19 or s[13] != ':' or s[16] != ':' or s[10] not in ' T':
+        return None
+    days = _EXIF_DAYS.get(s[:10], _UNSEEN)
+    if days is _UNSEEN:
+        days = _exif_day(s[:10])
+    if days is None:
+        return None
+    try:
+        hour, minute, second = int(s[11:13]), int(s[14:16]), int(s[17:19])
+    except ValueError:
+        return None
+    if not (0 <= hour <= 23 and 0 <= minute <= 59 and 0 <= second <= 59):
+        return None
+    seconds = days * 86400 + hour * 3600 + minute * 60 + second
+
+    rest = s[19:]
+    if rest[:1] == '.':
+        rest = rest[1:].lstrip('0123456789')
+    if not rest:
+        return seconds, None
+    offset = _EXIF_OFFSETS.get(rest, _UNSEEN)
+    if offset is _UNSEEN:
+        offset = _exif_offset(rest)
+    return seconds, offset
+
+def parse_exif_dates(values: Iterable) -> List[Optional[Tuple[int, Optional[int]]]]:
+    """parse_exif_date() for a list of strings (e.g. one tag across a batch
+    of files), in order."""
+    parse = parse_exif_date
+    return [parse(v) for v in values]
+
+# =============================================================================
+# EXIFTOOL PROCESS POOL (Persistent -stay_open workers)
+# =============================================================================
+
+class ExifToolError(RuntimeError):
+    """Raised when a persistent ExifTool process crashes."""
+
+class ExifToolTimeout(ExifToolError):
+    """Raised when an ExifTool request exceeds its timeout."""
+
+class ExifToolProcess:
+    """
+    A single long-lived `exiftool -stay_open True -@ -` process.
+
+    Arguments are written to stdin one per line, terminated by -executeNUM.
+    ExifTool answers with {readyNUM} on stdout; an -echo4 sentinel marks the
+    end of the matching stderr output. Pipes are drained by reader threads so
+    timeouts work on Windows as well as Unix.
+
+    Not thread-safe: ExifToolPool hands each process to one thread at a time.
+    """
+
+    def __init__(self, executable: Optional[str] = None):
+        self.executable = executable or get_exiftool_path()
+        self.requests = 0
+        self._proc: Optional['subprocess.Popen'] = None
+        self._stdout: "queue.Queue[Optional[bytes]]" = queue.Queue()
+        self._stderr: "queue.Queue[Optional[bytes]]" = queue.Queue()
+        self._seq = 0
+
+    @property
+    def alive(self) -> bool:
+        return self._proc is not None and self._proc.poll() is None
+
+    def start(self):
+        """Launch the ExifTool process and its pipe reader threads."""
+        import subprocess
+        self._stdout = queue.Queue()
+        self._stderr = queue.Queue()
+        self._proc = subprocess.Popen(
+            [self.executable, '-stay_open', 'True', '-@', '-',
+             '-common_args', '-charset', 'filename=utf8'],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+        )
+        for stream, q in ((self._proc.stdout, self._stdout), (self._proc.stderr, self._stderr)):
+            threading.Thread(target=self._reader, args=(stream, q), daemon=True).start()
+
+    @staticmethod
+    def _reader(stream, q: "queue.Queue[Optional[bytes]]"):
+        for line in iter(stream.readline, b''):
+            q.put(line)
+        q.put(None)  # EOF marker: process exited
+
+    def _read_until(self, q: "queue.Queue[Optional[bytes]]", sentinel: bytes, deadline: float) -> str:
+        """Collect lines from a pipe queue until the sentinel line arrives."""
+        lines = []
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise ExifToolTimeout("ExifTool request timed out")
+            try:
+                line = q.get(timeout=remaining)
+            except queue.Empty:
+                raise ExifToolTimeout("ExifTool request timed out")
+            if line is None:
+                raise ExifToolError(f"ExifTool exited unexpectedly (code {self._proc.poll()})")
+            stripped = line.strip()
+            if stripped == sentinel:
+                return b''.join(lines).decode('utf-8', errors='replace')
+            if stripped.startswith(b'{ready') and stripped.endswith(b'}'):
+                lines = []  # Leftover from an abandoned request
+                continue
+            lines.append(line)
+
+    def execute(self, args: List[str], timeout: float = 30) -> Tuple[str, str]:
+        """
+        Run one ExifTool command.
+
+        Args:
+            args: ExifTool arguments (one per list item, no newlines)
+            timeout: Seconds to wait for the response
+
+        Returns:
+            Tuple of (stdout, stderr) text
+        """
+        if not self.alive:
+            self.start()
+
+        self._seq += 1
+        sentinel = f"{{ready{self._seq}}}"
+        payload = '\n'.join(list(args) + ['-echo4', sentinel, f'-execute{self._seq}']) + '\n'
+
+        try:
+            self._proc.stdin.write(payload.encode('utf-8'))
+            self._proc.stdin.flush()
+        except (BrokenPipeError, OSError) as e:
+            raise ExifToolError(f"ExifTool pipe closed: {e}")
+
+        start = time.perf_counter()
+        deadline = time.monotonic() + timeout
+        stdout = self._read_until(self._stdout, sentinel.encode(), deadline)
+        stderr = self._read_until(self._stderr, sentinel.encode(), deadline)
+        self.requests += 1
+        end = time.perf_counter()
+        METRICS.observe('exiftool_seconds', end - start)
+        METRICS.inc('exiftool_requests')
+        TRACE.complete('exiftool', 'exiftool', start, end, exiftool_pid=self._proc.pid, seq=self._seq)
+        return stdout, stderr
+
+    def close(self, timeout: float = 5):
+        """Ask ExifTool to exit, killing it if it does not comply."""
+        import subprocess
+        if self._proc is None:
+            return
+        try:
+            if self._proc.poll() is None:
+                self._proc.stdin.write(b'-stay_open\nFalse\n')
+                self._proc.stdin.flush()
+                self._proc.wait(timeout=timeout)
+        except (OSError, subprocess.TimeoutExpired):
+            self.kill()
+        finally:
+            for stream in (self._proc.stdin, self._proc.stdout, self._proc.stderr):
+                try:
+                    stream.close()
+                except OSError:
+                    pass
+            self._proc = None
+
+    def kill(self):
+        """Forcefully terminate a hung process."""
+        import subprocess
+        if self._proc is not None and self._proc.poll() is None:
+            self._proc.kill()
+            try:
+                self._proc.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                pass
+
+class ExifToolPool:
+    """
+    Pool of persistent ExifTool processes shared across threads.
+
+    Processes are started lazily (up to `size`), handed to one request at a
+    time, killed and replaced when a request times out, and restarted (with
+    one retry) when they crash.
+
+    Example:
+        with ExifToolPool(size=4) as pool:
+            meta = pool.get_metadata(path, ['-j', '-G', '-FileType'])
+    """
+
+    def __init__(self, size: Optional[int] = None, executable: Optional[str] = None,
+                 timeout: float = 30):
+        self.size = max(1, size or get_optimal_workers())
+        self.executable = executable or get_exiftool_path()
+        self.timeout = timeout
+        self.restarts = 0
+        self._idle: "queue.LifoQueue[ExifToolProcess]" = queue.LifoQueue()
+        self._count = 0
+        self._lock = threading.Lock()
+        self._processes: List[ExifToolProcess] = []
+        self._closed = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _acquire(self) -> ExifToolProcess:
+        if self._closed:
+            raise ExifToolError("ExifTool pool is closed")
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._count < self.size:
+                self._count += 1
+                proc = ExifToolProcess(self.executable)
+                self._processes.append(proc)
+                return proc
+        return self._idle.get()
+
+    def _release(self, proc: ExifToolProcess):
+        self._idle.put(proc)
+
+    def execute(self, args: List[str], timeout: Optional[float] = None) -> Tuple[str, str]:
+        """
+        Run one ExifTool command on a pooled process.
+
+        Returns:
+            Tuple of (stdout, stderr) text
+
+        Raises:
+            ExifToolTimeout: If the request exceeds its timeout (process is replaced)
+            ExifToolError: If the process crashes twice in a row
+        """
+        timeout = timeout or self.timeout
+        with METRICS.timer('exiftool_wait_seconds'):
+            proc = self._acquire()
+        try:
+            for attempt in range(2):
+                try:
+                    return proc.execute(args, timeout)
+                except ExifToolTimeout:
+                    logging.warning(f"ExifTool timed out after {timeout}s - restarting process")
+                    proc.kill()
+                    proc.close()
+                    self.restarts += 1
+                    METRICS.inc('exiftool_restarts')
+                    raise
+                except ExifToolError:
+                    proc.close()
+                    self.restarts += 1
+                    METRICS.inc('exiftool_restarts')
+                    if attempt:
+                        raise
+                    logging.warning("ExifTool process crashed - restarting")
+        finally:
+            self._release(proc)
+
+    def get_metadata(self, file_path: Path, args: List[str],
+                     timeout: Optional[float] = None) -> Dict:
+        """Run a JSON (-j) request for a single file and return its tag dict."""
+        return self.get_metadata_batch([file_path], args, timeout)[0]
+
+    def get_metadata_batch(self, file_paths: List[Path], args: List[str],
+                           timeout: Optional[float] = None) -> List[Dict]:
+        """
+        Run one JSON (-j) request for several files.
+
+        Returns:
+            List of tag dicts aligned with file_paths (empty dict when
+            ExifTool returned nothing for a file)
+        """
+        import json
+        if not file_paths:
+            return []
+        METRICS.inc('exiftool_files', len(file_paths))
+        stdout, _ = self.execute(list(args) + [str(p) for p in file_paths], timeout)
+        if not stdout.strip():
+            return [{} for _ in file_paths]
+
+        by_source = {}
+        for item in json.loads(stdout):
+            by_source[_path_key(item.get('SourceFile', ''))] = item
+        return [by_source.get(_path_key(str(p)), {}) for p in file_paths]
+
+    def close(self):
+        """Shut down every process in the pool."""
+        self._closed = True
+        with self._lock:
+            processes, self._processes = self._processes, []
+        for proc in processes:
+            proc.close()
+
+def _path_key(path: str) -> str:
+    """Normalize paths for matching ExifTool's SourceFile (uses '/' on Windows)."""
+    return os.path.normcase(os.path.normpath(path))
+
+_exiftool_pool: Optional[ExifToolPool] = None
+_exiftool_pool_lock = threading.Lock()
+
+def get_exiftool_pool(size: Optional[int] = None) -> ExifToolPool:
+    """Return the process-wide ExifTool pool, creating it (with `size`
+    processes, default get_optimal_workers()) on first use."""
+    global _exiftool_pool
+    with _exiftool_pool_lock:
+        if _exiftool_pool is None or _exiftool_pool._closed:
+            _exiftool_pool = ExifToolPool(size)
+        return _exiftool_pool
+
+def shutdown_exiftool_pool():
+    """Close the process-wide ExifTool pool (registered with atexit)."""
+    global _exiftool_pool
+    with _exiftool_pool_lock:
+        if _exiftool_pool is not None:
+            _exiftool_pool.close()
+            _exiftool_pool = None
+
+atexit.register(shutdown_exiftool_pool)
+
+# =============================================================================
+# CONTENT HASHING (Pluggable algorithms, zero-allocation reads)
+# =============================================================================
+
+HASH_CHUNK_SIZE = 4 * 1024 * 1024  # 4MB reads
+
+# Algorithm name -> constructor. sha256 stays the default because renamed
+# files embed the SHA-256 prefix; the others are for identity-only runs.
+# hashlib (OpenSSL) is imported when the first hasher is created.
+HASHERS: Dict[str, Callable] = {
+    'sha256': lambda: importlib.import_module('hashlib').sha256(),
+    'blake2b': lambda: importlib.import_module('hashlib').blake2b(digest_size=32),
+}
+
+# Optional C implementations, imported when the first hasher is created
+if module_available('xxhash'):
+    HASHERS['xxh3_128'] = lambda: optional_import('xxhash').xxh3_128()
+
+if module_available('blake3'):
+    HASHERS['blake3'] = lambda: optional_import('blake3').blake3()
+
+DEFAULT_HASH_ALGORITHM = 'sha256'
+
+_hash_buffers = threading.local()
+
+def get_hasher(algorithm: str = DEFAULT_HASH_ALGORITHM):
+    """
+    Create a new hash object for a registered algorithm.
+
+    Raises:
+        ValueError: If the algorithm is unknown or its module is not installed
+    """
+    try:
+        return HASHERS[algorithm]()
+    except KeyError:
+        raise ValueError(f"Unknown hash algorithm '{algorithm}' "
+                         f"(available: {', '.join(sorted(HASHERS))})")
+
+def _read_buffer(size: int) -> memoryview:
+    """
+    Per-thread reusable read buffer (avoids a new bytes object per chunk).
+
+    Backed by an anonymous map, so it is page-aligned as O_DIRECT requires.
+    """
+    buf = getattr(_hash_buffers, 'buf', None)
+    if buf is None or len(buf) != size:
+        buf = memoryview(mmap.mmap(-1, size))
+        _hash_buffers.buf = buf
+    return buf
+
+def hash_file(path, algorithm: str = DEFAULT_HASH_ALGORITHM,
+              chunk_size: int = HASH_CHUNK_SIZE) -> str:
+    """
+    Hash a whole file.
+
+    Data is streamed through read_chunks() (readinto a reused buffer, page
+    cache hints per the cache policy, throttle and per-device reader slots);
+    hashlib releases the GIL for large updates, so threads hash in parallel.
+
+    Args:
+        path: File to hash
+        algorithm: Name registered in HASHERS
+        chunk_size: Read size
+
+    Returns:
+        Hex digest
+    """
+    start = time.perf_counter()
+    h = get_hasher(algorithm)
+    read = 0
+    for chunk in read_chunks(path, chunk_size):
+        h.update(chunk)
+        read += len(chunk)
+    end = time.perf_counter()
+    METRICS.observe('hash_seconds', end - start)
+    METRICS.inc('bytes_read', read)
+    TRACE.complete('hash', 'hash', start, end, file=str(path), bytes=read)
+    return h.hexdigest()
+
+# Tree hashing: files at least TREE_HASH_THRESHOLD bytes are split into
+# fixed-size segments hashed in parallel, then combined into a root digest.
+TREE_HASH_CHUNK_SIZE = 64 * 1024 * 1024
+TREE_HASH_THRESHOLD = 1024 * 1024 * 1024
+
+_segment_executor: Optional[ThreadPoolExecutor] = None
+_segment_executor_lock = threading.Lock()
+_segment_workers: Optional[int] = None  # None = get_optimal_workers()
+
+def set_tree_hash_workers(workers: int):
+    """
+    Size the shared tree-hash segment pool.
+
+    Callers that hash on their own worker threads pass what those workers
+    leave free, so segments do not multiply the read and CPU concurrency.
+    """
+    global _segment_executor, _segment_workers
+    with _segment_executor_lock:
+        _segment_workers = max(1, workers)
+        if _segment_executor is not None:
+            _segment_executor.shutdown(wait=False)
+            _segment_executor = None
+
+def _get_segment_executor() -> ThreadPoolExecutor:
+    """Shared pool for tree-hash segments (separate from callers' pools to avoid deadlock)."""
+    global _segment_executor
+    with _segment_executor_lock:
+        if _segment_executor is None:
+            _segment_executor = ThreadPoolExecutor(max_workers=_segment_workers or get_optimal_workers(),
+                                                   thread_name_prefix="tree-hash")
+        return _segment_executor
+
+def tree_hash_algorithm(algorithm: str = DEFAULT_HASH_ALGORITHM,
+                        chunk_size: int = TREE_HASH_CHUNK_SIZE) -> str:
+    """Name recorded for tree digests, e.g. 'sha256-tree-64M' (never mixed with flat digests)."""
+    if chunk_size % (1024 * 1024) == 0:
+        return f"{algorithm}-tree-{chunk_size // (1024 * 1024)}M"
+    return f"{algorithm}-tree-{chunk_size}"
+
+def _hash_segment(path, offset: int, length: int, algorithm: str) -> bytes:
+    """Hash `length` bytes starting at `offset` with its own file handle."""
+    start = time.perf_counter()
+    h = get_hasher(algorithm)
+    for chunk in read_chunks(path, HASH_CHUNK_SIZE, offset, length):
+        h.update(chunk)
+    TRACE.complete('hash_segment', 'hash', start, time.perf_counter(), file=str(path), offset=offset)
+    return h.digest()
+
+def tree_hash_file(path, algorithm: str = DEFAULT_HASH_ALGORITHM,
+                   chunk_size: int = TREE_HASH_CHUNK_SIZE, size: Optional[int] = None) -> str:
+    """
+    Hash a large file as a one-level hash tree.
+
+    Fixed-size segments are hashed in parallel on a shared thread pool; the
+    root digest covers a header (algorithm, chunk size, file size) followed
+    by the leaf digests in file order. The result is deterministic for a
+    given algorithm and chunk size but differs from the flat hash, so it is
+    recorded under tree_hash_algorithm().
+
+    Returns:
+        Hex root digest
+    """
+    start = time.perf_counter()
+    if size is None:
+        size = os.path.getsize(path)
+    offsets = range(0, max(size, 1), chunk_size)
+    executor = _get_segment_executor()
+    leaves = executor.map(lambda off: _hash_segment(path, off, chunk_size, algorithm), offsets)
+
+    root = get_hasher(algorithm)
+    root.update(f"tree:{algorithm}:{chunk_size}:{size}\n".encode())
+    for leaf in leaves:
+        root.update(leaf)
+    end = time.perf_counter()
+    METRICS.observe('hash_seconds', end - start)
+    METRICS.inc('bytes_read', size)
+    TRACE.complete('tree_hash', 'hash', start, end, file=str(path), bytes=size)
+    return root.hexdigest()
+
+# =============================================================================
+# PAGE CACHE HINTS (posix_fadvise read-ahead / drop-behind, O_DIRECT)
+# =============================================================================
+
+# How streamed files (hashing, copies) treat the page cache:
+#   keep   - read-ahead hints only; pages stay cached (the kernel default)
+#   drop   - read-ahead, plus POSIX_FADV_DONTNEED behind the cursor so a
+#            terabyte pass does not evict everything else on the host
+#   direct - like drop, but reads of files >= DIRECT_IO_THRESHOLD bypass
+#            the page cache with O_DIRECT (falls back where unsupported)
+CACHE_POLICIES = ('keep', 'drop', 'direct')
+DEFAULT_CACHE_POLICY = 'keep'
+READAHEAD_WINDOW = 32 * 1024 * 1024        # Bytes kept queued ahead with POSIX_FADV_WILLNEED
+DIRECT_IO_THRESHOLD = 256 * 1024 * 1024
+DIRECT_IO_ALIGN = 4096                     # O_DIRECT offset/length/buffer alignment
+
+FADVISE_AVAILABLE = hasattr(os, 'posix_fadvise')
+_cache_policy = DEFAULT_CACHE_POLICY
+
+def set_cache_policy(policy: str):
+    """
+    Set the process-wide page cache policy for streamed files.
+
+    Raises:
+        ValueError: If policy is not one of CACHE_POLICIES
+    """
+    global _cache_policy
+    if policy not in CACHE_POLICIES:
+        raise ValueError(f"Unknown cache policy '{policy}' (available: {', '.join(CACHE_POLICIES)})")
+    _cache_policy = policy
+
+def get_cache_policy() -> str:
+    return _cache_policy
+
+def _fadvise(fd: int, offset: int, length: int, advice_name: str):
+    """posix_fadvise that never fails (advice is optional; ESPIPE/EINVAL on some filesystems)."""
+    if FADVISE_AVAILABLE:
+        try:
+            os.posix_fadvise(fd, offset, length, getattr(os, advice_name))
+        except OSError:
+            pass
+
+class CacheHints:
+    """
+    Page cache hints for one file streamed front to back.
+
+    Readers are marked POSIX_FADV_SEQUENTIAL (doubles kernel read-ahead) and
+    keep `window` bytes queued ahead with POSIX_FADV_WILLNEED. Under the
+    'drop' and 'direct' policies, pages behind the cursor are released with
+    POSIX_FADV_DONTNEED as the stream advances.
+
+    For written files DONTNEED first starts writeback, and only clean pages
+    can be dropped, so each range is advised twice: once when written and
+    again one window later, by which time it has usually reached the disk.
+    """
+
+    def __init__(self, fd: int, policy: Optional[str] = None, window: int = READAHEAD_WINDOW,
+                 offset: int = 0, write: bool = False):
+        self.fd = fd
+        self.drop = (policy or _cache_policy) != 'keep'
+        self.window = window
+        self.write = write
+        self.start = offset      # First byte not yet dropped
+        self.pending = offset    # Written files: end of the range advised once
+        self.ahead = offset      # Readers: end of the range queued with WILLNEED
+        if not write:
+            _fadvise(fd, offset, 0, 'POSIX_FADV_SEQUENTIAL')
+            self._read_ahead(offset)
+
+    def _read_ahead(self, pos: int):
+        if pos + self.window // 2 >= self.ahead:
+            _fadvise(self.fd, pos, self.window, 'POSIX_FADV_WILLNEED')
+            self.ahead = pos + self.window
+
+    def advance(self, pos: int):
+        """Data before `pos` has been consumed (read) or handed to the kernel (written)."""
+        if not self.write:
+            self._read_ahead(pos)
+        if not self.drop or pos - self.start < self.window:
+            return
+        if self.write:
+            _fadvise(self.fd, self.start, pos - self.start, 'POSIX_FADV_DONTNEED')
+            self.start, self.pending = self.pending, pos
+        else:
+            _fadvise(self.fd, self.start, pos - self.start, 'POSIX_FADV_DONTNEED')
+            METRICS.inc('cache_dropped_bytes', pos - self.start)
+            self.start = pos
+
+    def finish(self, end: int = 0):
+        """Release everything from the last dropped position to `end` (0: end of file)."""
+        if self.drop:
+            _fadvise(self.fd, self.start, max(end - self.start, 0) if end else 0,
+                     'POSIX_FADV_DONTNEED')
+            if end and not self.write:
+                METRICS.inc('cache_dropped_bytes', end - self.start)
+            self.start = end
+
+def _open_direct(path) -> Optional[int]:
+    """Open path with O_DIRECT, or None where the platform/filesystem refuses it (tmpfs, FUSE, macOS)."""
+    flag = getattr(os, 'O_DIRECT', 0)
+    if not flag:
+        return None
+    try:
+        return os.open(path, os.O_RDONLY | flag)
+    except OSError as e:
+        if e.errno in (errno.EINVAL, errno.EOPNOTSUPP):
+            return None
+        raise
 
-import os
-import sys
-import logging
-import subprocess
-import json
-import re
-import multiprocessing as mp
-from pathlib import Path
-from datetime import datetime
-from typing import Optional, Dict, Set
+def read_chunks(path, chunk_size: int = HASH_CHUNK_SIZE, offset: int = 0,
+                length: Optional[int] = None, policy: Optional[str] = None,
+                size: Optional[int] = None) -> Iterator[memoryview]:
+    """
+    Stream a file (or `length` bytes from `offset`) with page cache hints.
+
+    Chunks are read into a reusable per-thread buffer; each yielded view is
+    only valid until the next one. Under the 'direct' policy, files of at
+    least DIRECT_IO_THRESHOLD bytes are read with O_DIRECT when the offset is
+    aligned and the filesystem supports it, otherwise through CacheHints.
+    Large files also wait for a READERS slot on their device.
+
+    Args:
+        path: File to read
+        chunk_size: Bytes per read
+        offset: First byte to read
+        length: Bytes to read (default: to the end of the file)
+        policy: One of CACHE_POLICIES (default: set_cache_policy() value)
+        size: File size if already known (saves a stat for the O_DIRECT check)
+    """
+    policy = policy or _cache_policy
+    remaining = float('inf') if length is None else length
+    fd = None
+    if policy == 'direct' and offset % DIRECT_IO_ALIGN == 0:
+        if size is None:
+            size = os.path.getsize(path)
+        if size >= DIRECT_IO_THRESHOLD:
+            fd = _open_direct(path)
+    if fd is not None:
+        METRICS.inc('direct_io_files')
+        chunk_size = -(-chunk_size // DIRECT_IO_ALIGN) * DIRECT_IO_ALIGN
+        buf = _read_buffer(chunk_size)
+        try:
+            st = os.fstat(fd)
+            with READERS.reading(st.st_dev, min(st.st_size - offset, remaining)):
+                os.lseek(fd, offset, os.SEEK_SET)
+                while remaining > 0:
+                    n = os.readv(fd, [buf])  # Full aligned buffer; short reads only at EOF
+                    if not n:
+                        break
+                    n = int(min(n, remaining))
+                    THROTTLE.read(n)
+                    yield buf[:n]
+                    remaining -= n
+        finally:
+            os.close(fd)
+        return
+
+    buf = _read_buffer(chunk_size)
+    with open(path, 'rb', buffering=0) as f:
+        st = os.fstat(f.fileno())
+        with READERS.reading(st.st_dev, min(st.st_size - offset, remaining)):
+            hints = CacheHints(f.fileno(), policy, max(READAHEAD_WINDOW, 2 * chunk_size), offset)
+            pos = offset
+            if offset:
+                f.seek(offset)
+            try:
+                while remaining > 0:
+                    n = f.readinto(buf[:int(min(chunk_size, remaining))])
+                    if not n:
+                        break
+                    THROTTLE.read(n)
+                    yield buf[:n]
+                    pos += n
+                    remaining -= n
+                    hints.advance(pos)
+            finally:
+                hints.finish(pos if length is not None else 0)
 
 # =============================================================================
-# FILE EXTENSION CONSTANTS (Unified across all tools)
+# PHYSICAL I/O ORDER (Inode / FIEMAP ordering and per-spindle readers for HDDs)
 # =============================================================================
 
-PHOTO_EXTENSIONS = {
-    '.jpg', '.jpeg', '.png', '.tiff', '.tif', '.heic', '.heif',
-    '.dng', '.cr2', '.cr3', '.nef', '.arw', '.orf', '.rw2', '.raw',
-    '.avif', '.webp', '.jxl', '.raf', '.srw'
-}
+# Order pending reads are issued in:
+#   walk     - directory walk order (no extra work, streams from the scan)
+#   inode    - by (device, inode number); filesystems allocate roughly in inode order
+#   physical - by (device, physical offset of the first extent) via FIEMAP,
+#              falling back to the inode number where FIEMAP is unavailable
+IO_ORDERS = ('walk', 'inode', 'physical')
 
-VIDEO_EXTENSIONS = {
-    '.mp4', '.mov', '.avi', '.mkv', '.m4v', '.mpg', '.mpeg',
-    '.wmv', '.flv', '.webm', '.3gp', '.mts', '.m2ts', '.hevc', '.ts'
-}
+FS_IOC_FIEMAP = 0xC020660B
+FIEMAP_EXTENT_UNKNOWN = 0x2
+_FIEMAP_HEADER = struct.Struct('=QQIIII')        # struct fiemap
+_FIEMAP_EXTENT = struct.Struct('=QQQQQIIII')     # struct fiemap_extent
+# One-extent request covering the whole file
+_FIEMAP_REQUEST = (_FIEMAP_HEADER.pack(0, 0xFFFFFFFFFFFFFFFF, 0, 0, 1, 0)
+                   + bytes(_FIEMAP_EXTENT.size))
 
-RAW_EXTENSIONS = {
-    '.arw', '.cr2', '.cr3', '.nef', '.orf', '.dng', '.rw2',
-    '.raf', '.srw', '.raw'
-}
+LARGE_READ_SIZE = 16 * 1024 * 1024   # Files at least this large count as sequential streams
 
-ALL_MEDIA_EXTENSIONS = PHOTO_EXTENSIONS | VIDEO_EXTENSIONS
+def physical_offset(path) -> Optional[int]:
+    """
+    Physical byte offset of a file's first extent (Linux FS_IOC_FIEMAP; no
+    privileges needed). None off Linux, on filesystems without FIEMAP (tmpfs,
+    NFS, SMB) and for empty, inline or not yet allocated files.
+    """
+    if not sys.platform.startswith('linux'):
+        return None
+    import fcntl
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return None
+    try:
+        buf = bytearray(_FIEMAP_REQUEST)
+        fcntl.ioctl(fd, FS_IOC_FIEMAP, buf)
+    except OSError:
+        return None
+    finally:
+        os.close(fd)
+    if not _FIEMAP_HEADER.unpack_from(buf)[3]:      # fm_mapped_extents
+        return None
+    extent = _FIEMAP_EXTENT.unpack_from(buf, _FIEMAP_HEADER.size)
+    if extent[5] & FIEMAP_EXTENT_UNKNOWN:           # fe_flags: location not known yet
+        return None
+    return extent[1]                                 # fe_physical
 
-# ExifTool FileType to Extension Mapping
-FILETYPE_TO_EXT = {
-    'JPEG': '.jpg', 'PNG': '.png', 'HEIC': '.heic', 'HEIF': '.heif',
-    'TIFF': '.tiff', 'WEBP': '.webp', 'AVIF': '.avif', 'JXL': '.jxl',
-    'GIF': '.gif', 'BMP': '.bmp', 'XMP': '.xmp',
-    'CR2': '.cr2', 'CR3': '.cr3', 'NEF': '.nef', 'ARW': '.arw',
-    'ORF': '.orf', 'DNG': '.dng', 'RW2': '.rw2', 'RAF': '.raf',
-    'SRW': '.srw', 'RAW': '.raw',
-    'MOV': '.mov', 'MP4': '.mp4', 'AVI': '.avi', 'MKV': '.mkv',
-    'M4V': '.m4v', 'WEBM': '.webm', 'MTS': '.mts', 'M2TS': '.m2ts',
-    '3GP': '.3gp', 'MPG': '.mpg', 'MPEG': '.mpeg', 'HEVC': '.hevc',
-    'TS': '.ts', 'WMV': '.wmv', 'FLV': '.flv',
-}
+def sort_for_io(items: Iterable, order: str, path: Callable = lambda item: item,
+                inode: Optional[Callable] = None) -> List:
+    """
+    Sort pending reads so a spinning disk sweeps across the platter instead
+    of seeking back and forth.
 
-# Folders to skip (Memory Protection)
-SKIP_DIRS = {
-    '.git', 'node_modules', 'venv', '.venv', '__pycache__', '.idea',
-    '.vscode', 'AppData', 'Library', '.npm', '.cache', 'Cache', 'Caches',
-    '.gradle', 'target', 'build', 'dist', '.tox', '.mypy_cache',
-    '.pytest_cache', 'System Volume Information', '$RECYCLE.BIN'
-}
+    Items are grouped by device, then ordered by physical offset ('physical')
+    or inode number ('inode'). Files FIEMAP cannot place follow those it can,
+    in inode order; files without usable inode numbers keep their relative
+    order at the end. 'walk' returns the items unchanged.
+
+    Args:
+        items: Work items (paths, scan entries, MediaFiles, ...)
+        order: One of IO_ORDERS
+        path: item -> file path
+        inode: item -> (st_dev, st_ino) when already known (saves a stat per file)
+
+    Returns:
+        The items as a list, in read order
+    """
+    items = list(items)
+    if order == 'walk' or len(items) < 2:
+        return items
+    if order not in IO_ORDERS:
+        raise ValueError(f"Unknown I/O order '{order}' (available: {', '.join(IO_ORDERS)})")
+
+    start = time.perf_counter()
+    fallbacks = 0
+
+    def key(item) -> Tuple[int, int, int]:
+        nonlocal fallbacks
+        if inode is not None:
+            dev, ino = inode(item)
+        else:
+            try:
+                st = os.stat(path(item))
+                dev, ino = st.st_dev, st.st_ino
+            except OSError:
+                return (0, 3, 0)
+        if order == 'physical':
+            offset = physical_offset(path(item))
+            if offset is not None:
+                return (dev, 0, offset)
+            fallbacks += 1
+        return (dev, 1, ino) if ino else (dev, 2, 0)
+
+    items.sort(key=key)
+    seconds = time.perf_counter() - start
+    METRICS.inc('io_order_files', len(items))
+    if fallbacks:
+        METRICS.inc('io_order_fallbacks', fallbacks)
+    logging.info(f"I/O order: {order} for {len(items):,} files in {seconds:.2f}s"
+                 + (f" ({fallbacks:,} without a known extent, by inode)" if fallbacks else ""))
+    return items
+
+class SequentialReaders:
+    """
+    Caps concurrent reads of large files (>= LARGE_READ_SIZE) per device.
+
+    Two streams on one spindle make the heads alternate between them, so on
+    HDDs a second large reader waits for the first to finish; small files
+    are never held back. read_chunks() takes a slot for every file it
+    streams.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._slots: Dict[int, threading.BoundedSemaphore] = {}
+        self.per_device: Optional[int] = None
+        self.threshold = LARGE_READ_SIZE
+
+    def configure(self, per_device: Optional[int], threshold: int = LARGE_READ_SIZE):
+        """Set the cap (None = unlimited); takes effect for devices not seen yet."""
+        with self._lock:
+            self.per_device = per_device
+            self.threshold = threshold
+            self._slots.clear()
+
+    @contextmanager
+    def reading(self, dev: int, size: int):
+        """Hold a reader slot on `dev` while streaming a file of `size` bytes."""
+        if self.per_device is None or size < self.threshold:
+            yield
+            return
+        with self._lock:
+            slots = self._slots.get(dev)
+            if slots is None:
+                slots = self._slots[dev] = threading.BoundedSemaphore(self.per_device)
+        start = time.perf_counter()
+        slots.acquire()
+        waited = time.perf_counter() - start
+        if waited > 0.001:
+            METRICS.observe('reader_wait_seconds', waited)
+        try:
+            yield
+        finally:
+            slots.release()
+
+# Process-wide reader cap used by read_chunks()
+READERS = SequentialReaders()
 
 # =============================================================================
-# WORKER POOL MANAGEMENT (Performance optimization)
+# PERCEPTUAL HASHING (Near-duplicate detection from embedded previews)
 # =============================================================================
 
-WORKER_PROFILES = {
-    'conservative': {'workers': 2, 'desc': 'Low CPU (2 workers)'},
-    'balanced': {'workers': max(4, mp.cpu_count() // 2), 'desc': f'Balanced ({max(4, mp.cpu_count() // 2)} workers)'},
-    'fast': {'workers': max(1, mp.cpu_count() - 2), 'desc': f'Fast ({max(1, mp.cpu_count() - 2)} workers)'},
-    'maximum': {'workers': mp.cpu_count(), 'desc': f'Maximum ({mp.cpu_count()} workers)'},
-}
+# Optional: Pillow is only needed (and only imported) for perceptual hashing
+PERCEPTUAL_HASH_AVAILABLE = module_available('PIL')
 
-def get_optimal_workers() -> int:
-    """Auto-detect optimal worker count based on CPU cores."""
-    cores = mp.cpu_count()
-    return max(2, cores - 2) if cores > 4 else max(1, cores - 1)
+# Embedded previews, smallest first. RAW files usually carry all of them;
+# camera JPEGs and HEICs carry a ~160px EXIF thumbnail.
+PREVIEW_TAGS = ['ThumbnailImage', 'PreviewImage']
+
+# Formats small/cheap enough to decode directly (JPEG decodes at 1/8 scale
+# via draft mode) when no embedded preview exists
+DIRECT_DECODE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.gif', '.bmp', '.webp'}
+
+# EXIF Orientation -> PIL transpose method (applied before hashing so a
+# rotated re-save matches its original)
+_ORIENTATION_TRANSPOSE = {2: 'FLIP_LEFT_RIGHT', 3: 'ROTATE_180', 4: 'FLIP_TOP_BOTTOM',
+                          5: 'TRANSPOSE', 6: 'ROTATE_270', 7: 'TRANSVERSE', 8: 'ROTATE_90'}
+
+def dhash(image, orientation: int = 1) -> Optional[int]:
+    """
+    64-bit difference hash (dHash) of an image.
+
+    The image is reduced to 9x8 grayscale and each bit records whether a
+    pixel is brighter than its right neighbour, so resizing, re-encoding
+    and format conversion barely change the hash.
+
+    Args:
+        image: Encoded image bytes or a file path
+        orientation: EXIF Orientation value to undo before hashing
+
+    Returns:
+        Hash as an int, or None if the image cannot be decoded
+    """
+    Image = optional_import('PIL.Image')
+    if Image is None:
+        return None
+    try:
+        with Image.open(io.BytesIO(image) if isinstance(image, bytes) else image) as img:
+            img.draft('L', (64, 64))  # JPEG: decode at reduced scale
+            img = img.convert('L')
+            if method := _ORIENTATION_TRANSPOSE.get(orientation):
+                img = img.transpose(getattr(getattr(Image, 'Transpose', Image), method))
+            pixels = img.resize((9, 8), getattr(Image, 'Resampling', Image).BOX).tobytes()
+    except Exception:
+        return None
+
+    value = 0
+    for row in range(8):
+        for col in range(8):
+            value = (value << 1) | (pixels[row * 9 + col] > pixels[row * 9 + col + 1])
+    return value
+
+def hamming_distance(a: int, b: int) -> int:
+    """Number of differing bits between two hashes."""
+    return bin(a ^ b).count('1')
+
+def perceptual_hashes(file_paths: List[Path]) -> List[Optional[int]]:
+    """
+    dHash several files from their embedded previews.
+
+    Previews are extracted with one ExifTool request per preview tag, so
+    full-size images are never decoded. Files without a preview fall back
+    to a reduced-scale decode when their format allows it.
+
+    Returns:
+        Hashes aligned with file_paths (None where no hash could be made)
+    """
+    import base64
+    results: List[Optional[int]] = [None] * len(file_paths)
+    orientations = [1] * len(file_paths)
+    pending = list(range(len(file_paths)))
+    pool = get_exiftool_pool()
+
+    for tag in PREVIEW_TAGS:
+        if not pending:
+            break
+        try:
+            metas = pool.get_metadata_batch([file_paths[i] for i in pending],
+                                            ['-json', '-b', f'-{tag}', '-Orientation#'])
+        except Exception as e:
+            logging.error(f"Failed to extract {tag} for batch of {len(pending)} files: {e}")
+            break
+        still_pending = []
+        for i, meta in zip(pending, metas):
+            if isinstance(meta.get('Orientation'), int):
+                orientations[i] = meta['Orientation']
+            data = meta.get(tag)
+            if isinstance(data, str) and data.startswith('base64:'):
+                results[i] = dhash(base64.b64decode(data[7:]), orientations[i])
+            if results[i] is None:
+                still_pending.append(i)
+        pending = still_pending
+
+    for i in pending:
+        if Path(file_paths[i]).suffix.lower() in DIRECT_DECODE_EXTENSIONS:
+            results[i] = dhash(str(file_paths[i]), orientations[i])
+    return results
+
+class BKTree:
+    """
+    Burkhard-Keller tree for Hamming-radius queries over 64-bit hashes.
+
+    Each child edge is labelled with its distance to the parent, so the
+    triangle inequality prunes every subtree outside [d - r, d + r] and a
+    query touches a small fraction of the tree instead of every hash.
+
+    Example:
+        tree = BKTree()
+        tree.add(0x8f3c..., "a.jpg")
+        tree.query(0x8f3d..., radius=6)  # [(1, "a.jpg")]
+    """
+
+    __slots__ = ('_root', '_size')
+
+    def __init__(self):
+        self._root = None  # Node: [hash, [items], {distance: child}]
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def add(self, value: int, item):
+        """Insert item under hash value."""
+        self._size += 1
+        if self._root is None:
+            self._root = [value, [item], {}]
+            return
+        node = self._root
+        while True:
+            distance = hamming_distance(value, node[0])
+            if distance == 0:
+                node[1].append(item)
+                return
+            child = node[2].get(distance)
+            if child is None:
+                node[2][distance] = [value, [item], {}]
+                return
+            node = child
+
+    def query(self, value: int, radius: int) -> List[Tuple[int, object]]:
+        """Return (distance, item) for every item within radius, nearest first."""
+        found = []
+        stack = [self._root] if self._root is not None else []
+        while stack:
+            node = stack.pop()
+            distance = hamming_distance(value, node[0])
+            if distance <= radius:
+                found.extend((distance, item) for item in node[1])
+            for edge, child in node[2].items():
+                if distance - radius <= edge <= distance + radius:
+                    stack.append(child)
+        found.sort(key=lambda pair: pair[0])
+        return found
 
 # =============================================================================
-# LOGGING UTILITIES (Consistent logging across tools)
+# HASH CACHE (Skip re-hashing unchanged files)
 # =============================================================================
 
-class FlushingFileHandler(logging.FileHandler):
-    """File handler that flushes after every write for real-time logs."""
-    def emit(self, record):
-        super().emit(record)
+FileIdentity = Tuple[int, int, int, int]  # (st_dev, st_ino, st_size, st_mtime_ns)
+
+def file_identity(st: os.stat_result) -> Optional[FileIdentity]:
+    """
+    Build a cache key from a stat result.
+
+    Returns None when the filesystem does not report stable inode numbers
+    (some SMB/FAT mounts return 0), since such keys could collide.
+    """
+    if not st.st_ino:
+        return None
+    return (st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns)
+
+class HashCache:
+    """
+    Persistent content-hash cache backed by SQLite (WAL mode).
+
+    Entries are keyed on (device, inode, size, mtime_ns) plus the hash
+    algorithm: any write to a file changes its mtime or size and therefore
+    misses the cache, and digests of different algorithms never mix. Lookups
+    can be done in bulk; writes and last-seen updates from worker threads
+    are buffered and committed in batches. Entries not seen for
+    `max_age_days` (and the oldest entries beyond `max_entries`) are evicted
+    when the cache is closed.
+
+    Example:
+        cache = HashCache(Path("cache/hash_cache.db"))
+        digest = cache.get(file_identity(path.stat()))
+        ...
+        cache.put(key, digest, path)
+        cache.close()
+    """
+
+    SCHEMA_VERSION = 2
+    _LOOKUP_CHUNK = 200  # Keys per SELECT (4 bound params each)
+
+    def __init__(self, db_path: Path, algorithm: str = DEFAULT_HASH_ALGORITHM, batch_size: int = 1000,
+                 max_age_days: Optional[int] = 180, max_entries: Optional[int] = None):
+        self.db_path = Path(db_path)
+        self.algorithm = algorithm
+        self.batch_size = batch_size
+        self.max_age_days = max_age_days
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._pending_puts: List[tuple] = []
+        self._pending_touches: List[Tuple[FileIdentity, str]] = []
+
+        import sqlite3
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._init_schema()
+
+    def _init_schema(self):
+        version = self._conn.execute("PRAGMA user_version").fetchone()[0]
+        if version != self.SCHEMA_VERSION:
+            # Cache contents are derived data - rebuild rather than migrate
+            self._conn.execute("DROP TABLE IF EXISTS hashes")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS hashes (
+                dev INTEGER NOT NULL,
+                ino INTEGER NOT NULL,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                algo TEXT NOT NULL,
+                digest TEXT NOT NULL,
+                path TEXT,
+                last_seen INTEGER NOT NULL,
+                PRIMARY KEY (dev, ino, size, mtime_ns, algo)
+            ) WITHOUT ROWID
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_hashes_last_seen ON hashes(last_seen)")
+        self._conn.execute(f"PRAGMA user_version = {self.SCHEMA_VERSION}")
+        self._conn.commit()
+
+    def lookup_many(self, keys: List[Optional[FileIdentity]],
+                    algorithm: Optional[str] = None) -> Dict[FileIdentity, str]:
+        """
+        Look up many file identities at once.
+
+        Args:
+            keys: File identities (None entries are ignored)
+            algorithm: Override the cache's algorithm (e.g. tree digests)
+
+        Returns:
+            Mapping of identity -> digest for every key found
+        """
+        algorithm = algorithm or self.algorithm
+        keys = [k for k in keys if k is not None]
+        found: Dict[FileIdentity, str] = {}
+        with self._lock:
+            for i in range(0, len(keys), self._LOOKUP_CHUNK):
+                chunk = keys[i:i + self._LOOKUP_CHUNK]
+                values = ",".join(["(?,?,?,?)"] * len(chunk))
+                params = [v for k in chunk for v in k] + [algorithm]
+                rows = self._conn.execute(
+                    f"SELECT dev, ino, size, mtime_ns, digest FROM hashes "
+                    f"WHERE (dev, ino, size, mtime_ns) IN (VALUES {values}) AND algo = ?",
+                    params
+                )
+                for dev, ino, size, mtime_ns, digest in rows:
+                    found[(dev, ino, size, mtime_ns)] = digest
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+            METRICS.inc('hash_cache_hits', len(found))
+            METRICS.inc('hash_cache_misses', len(keys) - len(found))
+            self._pending_touches.extend((key, algorithm) for key in found)
+            self._maybe_flush()
+        return found
+
+    def get(self, key: Optional[FileIdentity], algorithm: Optional[str] = None) -> Optional[str]:
+        """Look up a single file identity."""
+        if key is None:
+            return None
+        return self.lookup_many([key], algorithm).get(key)
+
+    def put(self, key: Optional[FileIdentity], digest: str, path: Optional[Path] = None,
+            algorithm: Optional[str] = None):
+        """Queue a digest for write-back (committed in batches)."""
+        if key is None:
+            return
+        with self._lock:
+            self._pending_puts.append((*key, algorithm or self.algorithm, digest,
+                                       str(path) if path else None))
+            self._maybe_flush()
+
+    def _maybe_flush(self):
+        if len(self._pending_puts) + len(self._pending_touches) >= self.batch_size:
+            self._flush_locked()
+
+    def _flush_locked(self):
+        if not self._pending_puts and not self._pending_touches:
+            return
+        now = int(time.time())
+        with self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO hashes (dev, ino, size, mtime_ns, algo, digest, path, last_seen) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [row + (now,) for row in self._pending_puts]
+            )
+            self._conn.executemany(
+                "UPDATE hashes SET last_seen = ? "
+                "WHERE dev = ? AND ino = ? AND size = ? AND mtime_ns = ? AND algo = ?",
+                [(now, *key, algorithm) for key, algorithm in self._pending_touches]
+            )
+        self._pending_puts.clear()
+        self._pending_touches.clear()
+
+    def flush(self):
+        """Commit all buffered writes."""
+        with self._lock:
+            self._flush_locked()
+
+    def evict(self) -> int:
+        """
+        Apply the eviction policy.
+
+        Returns:
+            Number of entries removed
+        """
+        removed = 0
+        with self._lock, self._conn:
+            if self.max_age_days is not None:
+                cutoff = int(time.time()) - self.max_age_days * 86400
+                removed += self._conn.execute(
+                    "DELETE FROM hashes WHERE last_seen < ?", (cutoff,)
+                ).rowcount
+            if self.max_entries is not None:
+                total = self._conn.execute("SELECT COUNT(*) FROM hashes").fetchone()[0]
+                excess = total - self.max_entries
+                if excess > 0:
+                    # WITHOUT ROWID table: delete the oldest rows by primary key
+                    removed += self._conn.execute(
+                        "DELETE FROM hashes WHERE (dev, ino, size, mtime_ns, algo) IN "
+                        "(SELECT dev, ino, size, mtime_ns, algo FROM hashes ORDER BY last_seen LIMIT ?)",
+                        (excess,)
+                    ).rowcount
+        return removed
+
+    def close(self):
+        """Flush pending writes, evict stale entries and close the database."""
         self.flush()
+        self.evict()
+        with self._lock:
+            self._conn.close()
+
+# =============================================================================
+# MEDIA CATALOG (Shared per-file facts, so each tool reads only what changed)
+# =============================================================================
+
+# Shared by every tool; $MEDIA_TOOLS_CATALOG points elsewhere
+CATALOG_ENV = "MEDIA_TOOLS_CATALOG"
+CATALOG_FILE = Path(__file__).resolve().parent.parent / "cache" / "catalog.db"
 
-def setup_logging(tool_name: str, log_dir: Path) -> Path:
+# Facts a tool can record. None means "not known yet"; '', 0, [] and {} are
+# known values ("no make", "no keywords", ...). `sidecar` is the XMP file
+# xmp-sidecar exported from the file's current content.
+CATALOG_FIELDS = ('file_type', 'dates', 'make', 'model', 'width', 'height',
+                  'keywords', 'rating', 'hash', 'hash_algo', 'sidecar')
+_CATALOG_JSON_FIELDS = ('dates', 'keywords')
+
+# Date tags kept per file as raw ExifTool text under their -G group prefix
+# ('EXIF:DateTimeOriginal'), so each tool keeps its own group priority.
+# Without -a ExifTool returns every tag name once, so dropping the prefix
+# gives exactly its plain output. A tool recording `dates` must have asked
+# ExifTool for all of them, so a tag missing from a stored dict means the
+# file does not have it.
+CATALOG_DATE_TAGS = ('DateTimeOriginal', 'CreateDate', 'CreationDate', 'MediaCreateDate', 'ModifyDate')
+
+def default_catalog_path() -> Path:
+    """Catalog location: $MEDIA_TOOLS_CATALOG, else cache/catalog.db in the tools tree."""
+    return Path(os.environ.get(CATALOG_ENV) or CATALOG_FILE)
+
+def catalog_dates(meta: Dict) -> Dict[str, str]:
+    """Pick the CATALOG_DATE_TAGS out of a group-prefixed (-G) ExifTool JSON record."""
+    return {key: str(value) for key, value in meta.items()
+            if key.partition(':')[2] in CATALOG_DATE_TAGS and value not in (None, '')}
+
+def _catalog_identity(st) -> Tuple[int, int, int, int]:
+    """(dev, ino, size, mtime_ns) from a stat result or such a tuple."""
+    if isinstance(st, os.stat_result):  # Itself a tuple subclass
+        return (st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns)
+    return tuple(st)
+
+class MediaCatalog:
     """
-    Setup standardized logging for media tools.
+    What the tools have learned about each file, shared through SQLite (WAL).
 
-    Args:
-        tool_name: Name of the tool (e.g., 'deduplicate', 'scrubber')
-        log_dir: Directory to store logs
+    Rows are keyed on the absolute path and stamped with the file's stat
+    identity (device, inode, size, mtime_ns). Lookups only return rows whose
+    identity still matches, so anything that modified a file since it was
+    recorded is read again; a file that was renamed or moved within a
+    device is found by its (device, inode) index. Recording merges into the
+    existing row while the identity is unchanged and replaces it otherwise.
+    Writes from any thread are buffered and committed in batches; rows not
+    seen for `max_age_days` are evicted when the catalog is closed.
 
-    Returns:
-        Path to the log file
+    Example:
+        catalog = MediaCatalog(default_catalog_path())
+        known = catalog.lookup_many(paths)
+        ...
+        catalog.record(path, path.stat(), file_type='JPEG', dates=catalog_dates(meta))
+        catalog.close()
     """
-    log_dir.mkdir(exist_ok=True)
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    log_file = log_dir / f"{tool_name}_{timestamp}.log"
 
-    logging.basicConfig(
-        level=logging.INFO,
-        format='%(asctime)s | %(levelname)-7s | %(message)s',
-        datefmt='%Y-%m-%d %H:%M:%S',
-        handlers=[
-            FlushingFileHandler(log_file, encoding="utf-8", mode='w'),
-            logging.StreamHandler()
-        ]
-    )
+    SCHEMA_VERSION = 2  # 2: dates keep their group prefix
+    _LOOKUP_CHUNK = 500  # Paths per SELECT
 
-    return log_file
+    def __init__(self, db_path: Path, batch_size: int = 1000, max_age_days: Optional[int] = 365):
+        self.db_path = Path(db_path)
+        self.batch_size = batch_size
+        self.max_age_days = max_age_days
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._pending_puts: List[tuple] = []
+        self._pending_copies: List[tuple] = []
+        self._pending_restats: List[tuple] = []
+        self._pending_forgets: List[Tuple[str]] = []
+        self._pending_touches: List[Tuple[str]] = []
+
+        import sqlite3
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        # Several tools may share the catalog: wait for another writer's batch
+        self._conn = sqlite3.connect(str(self.db_path), timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._init_schema()
+
+        columns = ", ".join(CATALOG_FIELDS)
+        same = "dev = excluded.dev AND ino = excluded.ino AND size = excluded.size AND mtime_ns = excluded.mtime_ns"
+        merges = ", ".join(f"{c} = CASE WHEN {same} THEN COALESCE(excluded.{c}, {c}) ELSE excluded.{c} END"
+                           for c in CATALOG_FIELDS)
+        self._upsert_sql = (
+            f"INSERT INTO files (path, dev, ino, size, mtime_ns, {columns}, last_seen) "
+            f"VALUES ({', '.join(['?'] * (len(CATALOG_FIELDS) + 6))}) "
+            f"ON CONFLICT(path) DO UPDATE SET {merges}, dev = excluded.dev, ino = excluded.ino, "
+            f"size = excluded.size, mtime_ns = excluded.mtime_ns, last_seen = excluded.last_seen"
+        )
+        copied = ", ".join("CASE WHEN sidecar IS NULL THEN NULL ELSE ? END" if c == 'sidecar' else c
+                           for c in CATALOG_FIELDS)
+        self._copy_sql = (
+            f"INSERT OR REPLACE INTO files (path, dev, ino, size, mtime_ns, {columns}, last_seen) "
+            f"SELECT ?, ?, ?, ?, ?, {copied}, ? FROM files "
+            f"WHERE path = ? AND dev = ? AND ino = ? AND size = ? AND mtime_ns = ?"
+        )
+
+    def _init_schema(self):
+        version = self._conn.execute("PRAGMA user_version").fetchone()[0]
+        if version != self.SCHEMA_VERSION:
+            # Catalog contents are derived data - rebuild rather than migrate
+            self._conn.execute("DROP TABLE IF EXISTS files")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS files (
+                path TEXT PRIMARY KEY,
+                dev INTEGER NOT NULL,
+                ino INTEGER NOT NULL,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                file_type TEXT,
+                dates TEXT,
+                make TEXT,
+                model TEXT,
+                width INTEGER,
+                height INTEGER,
+                keywords TEXT,
+                rating INTEGER,
+                hash TEXT,
+                hash_algo TEXT,
+                sidecar TEXT,
+                last_seen INTEGER NOT NULL
+            ) WITHOUT ROWID
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_files_inode ON files(dev, ino)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_files_last_seen ON files(last_seen)")
+        self._conn.execute(f"PRAGMA user_version = {self.SCHEMA_VERSION}")
+        self._conn.commit()
+
+    @staticmethod
+    def _key(path) -> str:
+        return os.path.abspath(os.fspath(path))
+
+    @staticmethod
+    def _decode(row) -> Dict:
+        import json
+        record = dict(zip(CATALOG_FIELDS, row))
+        for field in _CATALOG_JSON_FIELDS:
+            if record[field] is not None:
+                record[field] = json.loads(record[field])
+        return record
+
+    def lookup_many(self, paths: Iterable, stats: Optional[Iterable] = None) -> Dict[str, Dict]:
+        """
+        Look up many files at once.
+
+        Args:
+            paths: File paths
+            stats: Matching stat results (or identity tuples); files are
+                   stat()ed when omitted and skipped if they do not exist
+
+        Returns:
+            Mapping of str(path) -> record (CATALOG_FIELDS, None = unknown)
+            for every file whose stored identity still matches
+        """
+        paths = [os.fspath(p) for p in paths]
+        if stats is None:
+            stats = []
+            for p in paths:
+                try:
+                    stats.append(os.stat(p))
+                except OSError:
+                    stats.append(None)
+        wanted: Dict[str, Tuple[str, Tuple[int, int, int, int]]] = {}
+        for p, st in zip(paths, stats):
+            if st is not None:
+                wanted[self._key(p)] = (p, _catalog_identity(st))
+
+        found: Dict[str, Dict] = {}
+        columns = ", ".join(CATALOG_FIELDS)
+        keys = list(wanted)
+        with self._lock:
+            for i in range(0, len(keys), self._LOOKUP_CHUNK):
+                chunk = keys[i:i + self._LOOKUP_CHUNK]
+                rows = self._conn.execute(
+                    f"SELECT path, dev, ino, size, mtime_ns, {columns} FROM files "
+                    f"WHERE path IN ({','.join(['?'] * len(chunk))})", chunk
+                )
+                for key, *identity_and_fields in rows:
+                    path, identity = wanted[key]
+                    if tuple(identity_and_fields[:4]) == identity:
+                        found[path] = self._decode(identity_and_fields[4:])
+                        self._pending_touches.append((key,))
+
+            # Renamed or moved files keep their inode, size and mtime (their
+            # old sidecar path no longer applies)
+            moved = {identity: key for key, (path, identity) in wanted.items()
+                     if path not in found and identity[1]}
+            inodes = list({identity[:2] for identity in moved})
+            for i in range(0, len(inodes), self._LOOKUP_CHUNK):
+                chunk = inodes[i:i + self._LOOKUP_CHUNK]
+                rows = self._conn.execute(
+                    f"SELECT dev, ino, size, mtime_ns, {columns} FROM files "
+                    f"WHERE (dev, ino) IN (VALUES {','.join(['(?,?)'] * len(chunk))})",
+                    [v for inode in chunk for v in inode]
+                )
+                for row in rows:
+                    key = moved.pop(tuple(row[:4]), None)
+                    if key is not None:
+                        record = dict(self._decode(row[4:]), sidecar=None)
+                        found[wanted[key][0]] = record
+                        self._queue_put(key, tuple(row[:4]), record)
+
+            self.hits += len(found)
+            self.misses += len(wanted) - len(found)
+            METRICS.inc('catalog_hits', len(found))
+            METRICS.inc('catalog_misses', len(wanted) - len(found))
+            self._maybe_flush()
+        return found
+
+    def get(self, path, st) -> Optional[Dict]:
+        """Look up a single file (None when unknown or changed)."""
+        return self.lookup_many([path], [st]).get(os.fspath(path))
+
+    def record(self, path, st, **facts):
+        """
+        Queue what was learned about a file (committed in batches).
+
+        Args:
+            path: File path
+            st: The file's stat result (or identity tuple) the facts belong to
+            **facts: Any of CATALOG_FIELDS; omitted fields keep their stored
+                     value while the identity matches
+        """
+        unknown = set(facts) - set(CATALOG_FIELDS)
+        if unknown:
+            raise TypeError(f"Unknown catalog fields: {', '.join(sorted(unknown))}")
+        with self._lock:
+            self._queue_put(self._key(path), _catalog_identity(st), facts)
+            self._maybe_flush()
+
+    def copy(self, src, src_st, dst, dst_st, sidecar: Optional[str] = None):
+        """Queue the record of `src` for `dst`, a copy, move or link of it
+        (skipped unless src's stored identity is `src_st`). An exported
+        sidecar carries over as `sidecar`, the path it was copied to."""
+        now = int(time.time())
+        with self._lock:
+            self._pending_copies.append((self._key(dst), *_catalog_identity(dst_st), sidecar, now,
+                                         self._key(src), *_catalog_identity(src_st)))
+            self._maybe_flush()
+
+    def restat(self, path, st):
+        """Queue a new identity for a file whose content did not change
+        (e.g. only its timestamps were set); its facts are kept."""
+        with self._lock:
+            self._pending_restats.append((*_catalog_identity(st), self._key(path)))
+            self._maybe_flush()
+
+    def forget(self, path):
+        """Queue removal of a file that was deleted or moved away."""
+        with self._lock:
+            self._pending_forgets.append((self._key(path),))
+            self._maybe_flush()
+
+    def _queue_put(self, key: str, identity: Tuple[int, int, int, int], facts: Dict):
+        import json
+        values = []
+        for field in CATALOG_FIELDS:
+            value = facts.get(field)
+            if value is not None and field in _CATALOG_JSON_FIELDS:
+                value = json.dumps(value, ensure_ascii=False)
+            values.append(value)
+        self._pending_puts.append((key, *identity, *values))
+
+    def _maybe_flush(self):
+        pending = (len(self._pending_puts) + len(self._pending_copies) + len(self._pending_restats)
+                   + len(self._pending_forgets) + len(self._pending_touches))
+        if pending >= self.batch_size:
+            self._flush_locked()
+
+    def _flush_locked(self):
+        if not (self._pending_puts or self._pending_copies or self._pending_restats
+                or self._pending_forgets or self._pending_touches):
+            return
+        now = int(time.time())
+        # One transaction, applied in the order the tools' changes happen:
+        # new facts, then copies of them, then re-stamps, then removals
+        with self._conn:
+            self._conn.executemany(self._upsert_sql, [row + (now,) for row in self._pending_puts])
+            self._conn.executemany(self._copy_sql, self._pending_copies)
+            self._conn.executemany(
+                "UPDATE files SET dev = ?, ino = ?, size = ?, mtime_ns = ? WHERE path = ?",
+                self._pending_restats
+            )
+            self._conn.executemany("DELETE FROM files WHERE path = ?", self._pending_forgets)
+            self._conn.executemany("UPDATE files SET last_seen = ? WHERE path = ?",
+                                   [(now, key) for key, in self._pending_touches])
+        METRICS.inc('catalog_writes', len(self._pending_puts) + len(self._pending_copies)
+                    + len(self._pending_restats) + len(self._pending_forgets))
+        self._pending_puts.clear()
+        self._pending_copies.clear()
+        self._pending_restats.clear()
+        self._pending_forgets.clear()
+        self._pending_touches.clear()
+
+    def flush(self):
+        """Commit all buffered writes."""
+        with self._lock:
+            self._flush_locked()
+
+    def evict(self) -> int:
+        """
+        Remove rows not seen for max_age_days.
+
+        Returns:
+            Number of rows removed
+        """
+        if self.max_age_days is None:
+            return 0
+        cutoff = int(time.time()) - self.max_age_days * 86400
+        with self._lock, self._conn:
+            return self._conn.execute("DELETE FROM files WHERE last_seen < ?", (cutoff,)).rowcount
+
+    def close(self):
+        """Flush pending writes, evict stale rows and close the database."""
+        self.flush()
+        self.evict()
+        with self._lock:
+            self._conn.close()
 
 # =============================================================================
-# EXIFTOOL INTERFACE (Unified metadata access)
+# FILE TRANSFER (Reflink, copy_file_range, sendfile, sparse-aware copies)
 # =============================================================================
 
-def check_exiftool() -> bool:
-    """Verify ExifTool is installed and accessible."""
+FICLONE = 0x40049409                       # Linux ioctl: clone whole file (btrfs, XFS, ...)
+PREALLOCATE_THRESHOLD = 64 * 1024 * 1024   # fallocate destinations at least this large
+_COPY_CHUNK = 1 << 30                      # Max bytes per copy_file_range/sendfile call
+
+_libc = None
+_reflink_warned = threading.Event()
+
+def _fallocate(fd: int, size: int) -> bool:
+    """
+    Reserve `size` bytes for fd with the fallocate syscall.
+
+    Uses libc fallocate() rather than os.posix_fallocate(), because glibc
+    emulates the latter by writing every block on filesystems without
+    native support (SMB/NFS), which would double the I/O.
+    """
+    global _libc
+    if not sys.platform.startswith('linux'):
+        return False
     try:
-        subprocess.run(['exiftool', '-ver'], capture_output=True, check=True)
-        return True
-    except (FileNotFoundError, subprocess.CalledProcessError):
+        if _libc is None:
+            import ctypes
+            _libc = ctypes.CDLL(None, use_errno=True)
+            _libc.fallocate.argtypes = [ctypes.c_int, ctypes.c_int, ctypes.c_longlong, ctypes.c_longlong]
+        return _libc.fallocate(fd, 0, 0, size) == 0
+    except (OSError, AttributeError):
         return False
 
-def get_exiftool_path() -> str:
-    """Locate ExifTool executable (Windows + Unix)."""
-    # Common Windows paths
-    windows_paths = [
-        r"D:\Files\Programs-Portable\ExifTool\exiftool.exe",
-        r"C:\Windows\exiftool.exe",
-        r"C:\Program Files\ExifTool\exiftool.exe"
-    ]
+def reflink_file(src, dst):
+    """
+    Clone src into a new file dst (copy-on-write, no data is copied).
 
-    for p in windows_paths:
-        if os.path.exists(p):
-            return p
+    Raises:
+        FileExistsError: If dst already exists (it is left untouched)
+        OSError: If the platform or filesystem does not support cloning
+    """
+    if not sys.platform.startswith('linux'):
+        raise OSError(errno.EOPNOTSUPP, "reflink not supported on this platform")
+    import fcntl
+    import shutil
+    with open(src, 'rb') as fsrc, open(dst, 'xb') as fdst:
+        # Only a dst created here is removed on failure; an existing file
+        # raises FileExistsError above and is left alone
+        try:
+            fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+        except OSError:
+            _unlink_quiet(dst)
+            raise
+    shutil.copystat(src, dst)
 
-    # Fallback to PATH
-    return "exiftool"
+def _unlink_quiet(path):
+    try:
+        os.unlink(path)
+    except OSError:
+        pass
 
-def get_metadata(file_path: Path, is_video: bool = False) -> Dict:
+def _data_segments(fd: int, size: int, sparse: bool) -> Iterator[Tuple[int, int]]:
+    """Yield (offset, length) of data regions, skipping holes when sparse."""
+    if not sparse:
+        yield 0, size
+        return
+    offset = 0
+    while offset < size:
+        try:
+            data = os.lseek(fd, offset, os.SEEK_DATA)
+        except OSError as e:
+            if e.errno == errno.ENXIO:  # Only a hole remains
+                return
+            raise
+        hole = os.lseek(fd, data, os.SEEK_HOLE)
+        yield data, hole - data
+        offset = hole
+
+def _copy_progress(state: Dict, offset: int):
+    """Charge the throttle and advance the cache hints after copying up to offset."""
+    copied, state['pos'] = offset - state['pos'], offset
+    THROTTLE.read(copied)
+    THROTTLE.write(copied)
+    for hints in state['hints']:
+        hints.advance(offset)
+
+def _copy_range(src_fd: int, dst_fd: int, offset: int, length: int, state: Dict) -> None:
+    """Copy one region in-kernel: copy_file_range, then sendfile, then read/write."""
+    end = offset + length
+    step = state['step']
+    state['pos'] = offset
+    if state['method'] == 'copy_file_range':
+        try:
+            while offset < end:
+                n = os.copy_file_range(src_fd, dst_fd, min(end - offset, step), offset, offset)
+                if n == 0:
+                    break
+                offset += n
+                _copy_progress(state, offset)
+        except (AttributeError, OSError) as e:
+            if isinstance(e, OSError) and e.errno not in (errno.EXDEV, errno.ENOSYS, errno.EINVAL,
+                                                          errno.EOPNOTSUPP, errno.EPERM):
+                raise
+            state['method'] = 'sendfile'
+    if offset < end and state['method'] == 'sendfile':
+        try:
+            os.lseek(dst_fd, offset, os.SEEK_SET)
+            while offset < end:
+                n = os.sendfile(dst_fd, src_fd, offset, min(end - offset, step))
+                if n == 0:
+                    break
+                offset += n
+                _copy_progress(state, offset)
+        except (AttributeError, OSError) as e:
+            if isinstance(e, OSError) and e.errno not in (errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP):
+                raise
+            state['method'] = 'copy'
+    if offset < end:
+        state['method'] = 'copy'
+        os.lseek(src_fd, offset, os.SEEK_SET)
+        os.lseek(dst_fd, offset, os.SEEK_SET)
+        while offset < end:
+            chunk = os.read(src_fd, min(end - offset, HASH_CHUNK_SIZE))
+            if not chunk:
+                break
+            os.write(dst_fd, chunk)
+            offset += len(chunk)
+            _copy_progress(state, offset)
+
+def fast_copy_file(src, dst, clone: bool = False) -> str:
     """
-    Extract metadata from a media file using ExifTool.
+    Copy src to dst (data + metadata, like shutil.copy2) with the cheapest
+    mechanism available.
 
-    Args:
-        file_path: Path to media file
-        is_video: Whether file is a video (disables -fast2 for full scan)
+    Order of preference:
+        1. FICLONE reflink (only when clone=True; shares extents, no data copied)
+        2. os.copy_file_range (in-kernel; server-side copy on NFS/SMB, and
+           itself a clone on btrfs/XFS)
+        3. os.sendfile
+        4. plain read/write
+
+    Sparse sources are copied region by region with SEEK_DATA/SEEK_HOLE so
+    holes stay holes; large dense files are preallocated with fallocate.
+    Unless the cache policy is 'keep', source and destination pages are
+    released behind the copy (CacheHints), one READAHEAD_WINDOW at a time;
+    THROTTLE byte caps are charged per step.
+    Non-Linux platforms use shutil.copy2.
 
     Returns:
-        Dictionary of metadata tags and values
+        Name of the mechanism used ('reflink', 'copy_file_range', 'sendfile', 'copy')
+
+    Raises:
+        FileExistsError: If dst already exists (it is left untouched)
     """
+    import shutil
+    if clone:
+        try:
+            reflink_file(src, dst)
+            return 'reflink'
+        except FileExistsError:
+            raise
+        except OSError:
+            pass
+
+    if not sys.platform.startswith('linux'):
+        open(dst, 'xb').close()  # Reserve dst; never replace an existing file
+        try:
+            shutil.copy2(src, dst)
+        except BaseException:
+            _unlink_quiet(dst)
+            raise
+        size = os.path.getsize(dst)
+        METRICS.inc('bytes_written', size)
+        THROTTLE.read(size)
+        THROTTLE.write(size)
+        return 'copy'
+
+    state = {'method': 'copy_file_range', 'step': _COPY_CHUNK, 'hints': ()}
+    src_fd = os.open(src, os.O_RDONLY)
     try:
-        cmd = [
-            get_exiftool_path(),
-            '-j', '-G', '-q',
-            '-FileType', '-DateTimeOriginal', '-CreateDate',
-            '-QuickTime:CreationDate', '-Subject', '-Keywords',
-            '-Rating', '-ImageWidth', '-ImageHeight',
-            '-Make', '-Model'
-        ]
-
-        if not is_video:
-            cmd.append('-fast2')
-
-        cmd.append(str(file_path))
-
-        result = subprocess.run(
-            cmd,
-            capture_output=True,
-            text=True,
-            encoding='utf-8',
-            errors='replace',
-            timeout=30
-        )
+        st = os.fstat(src_fd)
+        dst_fd = os.open(dst, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o666)  # Never replace an existing dst
+        try:
+            if _cache_policy != 'keep' or THROTTLE.enabled:
+                state['step'] = READAHEAD_WINDOW
+            if _cache_policy != 'keep':
+                state['hints'] = (CacheHints(src_fd), CacheHints(dst_fd, write=True))
+            sparse = hasattr(os, 'SEEK_DATA') and st.st_blocks * 512 < st.st_size
+            if not sparse and st.st_size >= PREALLOCATE_THRESHOLD:
+                _fallocate(dst_fd, st.st_size)
+            for offset, length in _data_segments(src_fd, st.st_size, sparse):
+                _copy_range(src_fd, dst_fd, offset, length, state)
+            os.ftruncate(dst_fd, st.st_size)  # Trailing hole / trim preallocation
+            for hints in state['hints']:
+                hints.finish()
+        except BaseException:
+            os.close(dst_fd)
+            _unlink_quiet(dst)
+            raise
+        os.close(dst_fd)
+    finally:
+        os.close(src_fd)
 
-        if result.returncode == 0 and result.stdout:
-            return json.loads(result.stdout)[0]
-    except Exception as e:
-        logging.error(f"Failed to read metadata from {file_path}: {e}")
+    shutil.copystat(src, dst)
+    METRICS.inc('bytes_written', st.st_size)
+    return state['method']
 
-    return {}
+def transfer_file(src, dst, action: str = 'copy') -> str:
+    """
+    Perform one file action.
+
+    Args:
+        src: Source file
+        dst: Destination file (must not exist)
+        action: 'copy', 'move', 'reflink', 'hardlink' or 'auto'
+            copy     - in-kernel copy (copy_file_range/sendfile)
+            move     - rename; across filesystems, in-kernel copy + delete
+            reflink  - clone extents, falling back to copy (warned once)
+            hardlink - hard link, falling back to reflink/copy across devices
+            auto     - clone when possible, else copy
+
+    Returns:
+        Mechanism used ('rename', 'hardlink', 'reflink', 'copy_file_range', 'sendfile', 'copy')
+
+    Raises:
+        FileExistsError: If dst already exists (except same-device moves, which use os.rename)
+    """
+    start = time.perf_counter()
+    method = _transfer(str(src), str(dst), action)
+    end = time.perf_counter()
+    METRICS.observe('transfer_seconds', end - start)
+    METRICS.inc(f'transfer_{method}')
+    TRACE.complete('transfer', 'copy', start, end, file=str(src), method=method)
+    return method
+
+def _transfer(src: str, dst: str, action: str) -> str:
+    if action == 'move':
+        try:
+            os.rename(src, dst)
+            return 'rename'
+        except OSError as e:
+            if e.errno != errno.EXDEV:
+                raise
+        method = fast_copy_file(src, dst)
+        os.unlink(src)
+        return method
+
+    if action == 'hardlink':
+        try:
+            os.link(src, dst)
+            return 'hardlink'
+        except OSError as e:
+            if e.errno not in (errno.EXDEV, errno.EPERM, errno.EMLINK, errno.ENOTSUP):
+                raise
+            logging.info(f"Hardlink not possible ({e.strerror}), copying instead: {src}")
+        return fast_copy_file(src, dst, clone=True)
+
+    method = fast_copy_file(src, dst, clone=action in ('reflink', 'auto'))
+    if action == 'reflink' and method != 'reflink' and not _reflink_warned.is_set():
+        _reflink_warned.set()
+        logging.warning(f"Reflink not supported for {dst} - falling back to {method}")
+    return method
+
+# =============================================================================
+# ACTION JOURNAL (Append-only record of planned/completed actions)
+# =============================================================================
+
+class ActionJournal:
+    """
+    Append-only JSON-lines journal used to resume interrupted runs.
+
+    Every record is a JSON object with a "t" (type) field, e.g.
+        {"t": "run", ...}                   run configuration (first line)
+        {"t": "plan", "id": 0, "src": ...}  one planned action
+        {"t": "planned", "count": N}        planning finished
+        {"t": "done", "id": 0}              action completed
+        {"t": "end"}                        run finished
+
+    Records are flushed as they are written and fsync'd at most every
+    `sync_interval` seconds (and on sync()/close()), so a crash loses at
+    most the last few completion records - callers must treat a missing
+    "done" as "maybe done". A torn final line is discarded on load.
+
+    Example:
+        journal = ActionJournal(Path("cache/action_journal.jsonl"), resume=True)
+        completed = {r['id'] for r in journal.records if r['t'] == 'done'}
+        journal.append('done', id=7)
+        journal.close()
+    """
+
+    def __init__(self, path: Path, resume: bool = False, sync_interval: float = 1.0):
+        self.path = Path(path)
+        self.sync_interval = sync_interval
+        self.records: List[Dict] = []
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        if resume and self.path.exists():
+            self.records = self._load()
+            self._file = open(self.path, 'a', encoding='utf-8')
+        else:
+            self._file = open(self.path, 'w', encoding='utf-8')
+        self._lock = threading.Lock()
+        self._last_sync = time.monotonic()
+
+    def _load(self) -> List[Dict]:
+        """Read existing records, truncating a torn trailing line."""
+        import json
+        records = []
+        good_bytes = 0
+        with open(self.path, 'rb') as f:
+            for line in f:
+                if not line.endswith(b'\n'):
+                    break
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    break
+                good_bytes += len(line)
+        if good_bytes != self.path.stat().st_size:
+            logging.warning(f"Journal {self.path}: discarding incomplete tail")
+            os.truncate(self.path, good_bytes)
+        return records
+
+    def header(self) -> Optional[Dict]:
+        """Run record of the loaded journal (None if empty)."""
+        return self.records[0] if self.records and self.records[0].get('t') == 'run' else None
+
+    def append(self, kind: str, **fields):
+        """Append one record (thread-safe)."""
+        import json
+        line = json.dumps({'t': kind, **fields}, ensure_ascii=False) + "\n"
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+            if time.monotonic() - self._last_sync >= self.sync_interval:
+                self._sync_locked()
+
+    def sync(self):
+        """Force journal contents to stable storage."""
+        with self._lock:
+            self._sync_locked()
+
+    def _sync_locked(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._last_sync = time.monotonic()
+
+    def close(self):
+        """Sync and close the journal file."""
+        if self._file.closed:
+            return
+        self.sync()
+        self._file.close()
 
 # =============================================================================
 # FILENAME UTILITIES (Sanitization and formatting)
@@ -248,17 +4150,34 @@ def sanitize_camera_str(s: str) -> str:
 # UI HELPERS (Colorized output for better UX)
 # =============================================================================
 
-try:
-    from colorama import init, Fore, Style
-    init(autoreset=True)
-    COLORS_AVAILABLE = True
-except ImportError:
-    # Fallback if colorama not installed
-    class Fore:
-        GREEN = RED = YELLOW = CYAN = MAGENTA = BLUE = WHITE = ''
-    class Style:
-        BRIGHT = RESET_ALL = ''
-    COLORS_AVAILABLE = False
+COLORS_AVAILABLE = module_available('colorama')
+
+@functools.lru_cache(maxsize=None)
+def _colorama():
+    colorama = optional_import('colorama')
+    if colorama is not None:
+        colorama.init(autoreset=True)
+    return colorama
+
+class _Colors:
+    """
+    Stand-in for colorama's Fore / Style: colorama is imported and
+    initialized on the first color lookup (plain '' without colorama).
+    """
+
+    def __init__(self, name: str):
+        self._name = name
+
+    def __getattr__(self, attr: str) -> str:
+        if attr.startswith('_'):
+            raise AttributeError(attr)
+        colorama = _colorama()
+        value = getattr(getattr(colorama, self._name), attr) if colorama else ''
+        setattr(self, attr, value)
+        return value
+
+Fore = _Colors('Fore')
+Style = _Colors('Style')
 
 def print_phase(phase: str, message: str = ""):
     """Print a section header with visual separation."""
@@ -280,6 +4199,10 @@ def print_warning(message: str):
     """Print warning message in yellow."""
     print(f"{Fore.YELLOW}⚠ {message}{Style.RESET_ALL}")
 
+def print_info(message: str):
+    """Print informational message in cyan."""
+    print(f"{Fore.CYAN}{message}{Style.RESET_ALL}")
+
 # =============================================================================
 # DEPENDENCY CHECKER
 # =============================================================================
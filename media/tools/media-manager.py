@@ -21,19 +21,24 @@ Usage:
 
     # Full Processing (Move + Dedupe + Rename + Organize)
     python media-manager.py /source /dest --mode all --action move --execute
+
+    # Continue an interrupted run (same options + --resume)
+    python media-manager.py /source /dest --mode all --action move --execute --resume
 """
 
 import sys
 import os
 import argparse
-import shutil
-import hashlib
 import logging
+import calendar
+import time
+from array import array
 from pathlib import Path
-from datetime import datetime
+from datetime import datetime, timedelta
 from collections import defaultdict
-from typing import List, Dict, Optional, Set
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from itertools import islice
+from typing import Iterable, Iterator, List, Dict, Optional, Set, Tuple
+from concurrent.futures import ThreadPoolExecutor
 
 # Import shared library
 try:
@@ -42,13 +47,24 @@ try:
     from lib.media_common import (
         get_metadata, safe_filename, sanitize_camera_str,
         print_phase, print_success, print_warning, print_error,
-        setup_logging, get_optimal_workers,
+        setup_logging, log_action, HashCache, file_identity,
+        scan_media, ScanEntry, PipelineStage, run_pipeline,
+        hash_file, get_hasher, HASHERS, DEFAULT_HASH_ALGORITHM, HASH_CHUNK_SIZE,
+        tree_hash_file, tree_hash_algorithm, TREE_HASH_THRESHOLD,
+        run_device_limited, device_of, transfer_file, ActionJournal,
+        InternTable, group_indices, FileIdentity,
+        perceptual_hashes, BKTree, PERCEPTUAL_HASH_AVAILABLE, METRICS, TRACE,
         ALL_MEDIA_EXTENSIONS, VIDEO_EXTENSIONS, RAW_EXTENSIONS,
-        FILETYPE_TO_EXT, SKIP_DIRS
+        FILETYPE_TO_EXT, tqdm, module_available,
+        get_exiftool_pool, storage_profile, storage_profile_names, parse_exif_date,
+        AdaptiveLimiter, worker_limiter, run_adaptive, parse_workers, positive_int,
+        get_optimal_workers, set_tree_hash_workers,
+        set_cache_policy, CACHE_POLICIES,
+        THROTTLE, load_throttle_schedule, set_process_priority,
+        sort_for_io, READERS, IO_ORDERS,
+        MediaCatalog, catalog_dates, default_catalog_path
     )
-    try:
-        from tqdm import tqdm
-    except ImportError:
+    if not module_available('tqdm'):
         print_warning("tqdm not installed - progress bars disabled")
         def tqdm(iterable, **kwargs):
             return iterable
@@ -59,92 +75,300 @@ except ImportError as e:
 
 __version__ = "1.0.0"
 
+# Phase 4: --action choices and the verb logged for each
+ACTION_VERBS = {
+    'copy': 'COPIED',
+    'move': 'MOVED',
+    'reflink': 'REFLINKED',
+    'hardlink': 'HARDLINKED',
+    'auto': 'COPIED',
+}
+
+# Phase 2: capacity of each bounded queue between pipeline stages
+PIPELINE_QUEUE_SIZE = 256
+
+# Phase 2: scan entries per batched media catalog / hash cache lookup
+PREFETCH_BATCH = 500
+
+# Staged dedupe: size of each head/middle/tail sample block
+SAMPLE_BLOCK_SIZE = 64 * 1024
+
+# Near-duplicate detection: files per ExifTool preview request
+PHASH_BATCH_SIZE = 32
+
+# MediaFile.cataloged: what the media catalog already holds for the file
+CATALOG_METADATA = 1
+CATALOG_HASH = 2
+
+# Catalog fields read_metadata() fills; a record with all of them replaces the ExifTool read
+CATALOG_METADATA_FIELDS = ('file_type', 'dates', 'make', 'model', 'width', 'height', 'keywords', 'rating')
+
+# Date tags (-G keys) in the order they are preferred for the file's date.
+# QuickTime:CreateDate is UTC by spec, so videos without CreationDate keep the mtime.
+DATE_PRIORITY = ('EXIF:DateTimeOriginal', 'XMP:DateTimeOriginal', 'QuickTime:CreationDate', 'EXIF:CreateDate')
+
 # =============================================================================
 # DATA CLASSES
 # =============================================================================
 
+# Shared string tables for MediaFile records
+DIRECTORIES = InternTable()
+KEYWORDS = InternTable()
+
+EPOCH = datetime(1970, 1, 1)
+
 class MediaFile:
-    """Represents a single media file with metadata and hash."""
-    def __init__(self, path: Path):
-        self.path = path
-        self.hash: str = ""
-        self.size: int = path.stat().st_size
-        self.dt: datetime = datetime.fromtimestamp(path.stat().st_mtime)
+    """Represents a single media file with metadata and hash.
+
+    One record is kept per file for the whole run, so the layout is compact:
+    __slots__, the directory as an id into DIRECTORIES, the date as integer
+    seconds, the digest as raw bytes and keywords as ids into KEYWORDS.
+    path, dt, hash, keywords and xmp_path are derived on access.
+    """
+    __slots__ = ('dir_id', 'name', 'digest', 'hash_algo', 'size', 'dev', 'ino', 'mtime_ns',
+                 'timestamp', 'make', 'model', 'is_video', 'is_raw', 'keyword_ids',
+                 'rating', 'width', 'height', 'correct_ext', 'xmp_name', 'cataloged')
+
+    def __init__(self, path: Path, st: Optional[os.stat_result] = None):
+        if st is None:
+            st = os.stat(path)
+        directory, self.name = os.path.split(os.fspath(path))
+        self.dir_id: int = DIRECTORIES.intern(directory)
+        self.digest: bytes = b""
+        self.hash_algo: str = DEFAULT_HASH_ALGORITHM  # Algorithm that produced self.digest
+        self.size: int = st.st_size
+        self.dev: int = st.st_dev
+        self.ino: int = st.st_ino
+        self.mtime_ns: int = st.st_mtime_ns
+        # Naive local time as seconds since 1970-01-01 (see dt)
+        self.timestamp: int = calendar.timegm(time.localtime(st.st_mtime))
         self.make: str = ""
         self.model: str = ""
-        self.is_video: bool = path.suffix.lower() in VIDEO_EXTENSIONS
-        self.is_raw: bool = path.suffix.lower() in RAW_EXTENSIONS
-        self.keywords: Set[str] = set()
+        ext = sys.intern(os.path.splitext(self.name)[1].lower())
+        self.is_video: bool = ext in VIDEO_EXTENSIONS
+        self.is_raw: bool = ext in RAW_EXTENSIONS
+        self.keyword_ids: Tuple[int, ...] = ()
         self.rating: int = 0
         self.width: int = 0
         self.height: int = 0
-        self.correct_ext: str = path.suffix.lower()
-        self.xmp_path: Optional[Path] = None
-        self.paired_path: Optional[Path] = None  # For RAW+JPG
+        self.correct_ext: str = ext
+        self.xmp_name: Optional[str] = None  # Sidecars live next to their file
+        self.cataloged: int = 0  # CATALOG_* flags
+
+    @property
+    def path(self) -> Path:
+        return Path(DIRECTORIES.value(self.dir_id), self.name)
+
+    @property
+    def dt(self) -> datetime:
+        return EPOCH + timedelta(seconds=self.timestamp)
+
+    @dt.setter
+    def dt(self, value: datetime):
+        self.timestamp = int((value - EPOCH).total_seconds())
+
+    @property
+    def hash(self) -> str:
+        """Hex digest ("" until hashed)."""
+        return self.digest.hex()
+
+    @hash.setter
+    def hash(self, value: str):
+        self.digest = bytes.fromhex(value) if value else b""
+
+    @property
+    def keywords(self) -> Set[str]:
+        return {KEYWORDS.value(i) for i in self.keyword_ids}
+
+    @keywords.setter
+    def keywords(self, values):
+        self.keyword_ids = tuple(sorted({KEYWORDS.intern(str(v)) for v in values}))
+
+    @property
+    def identity(self) -> Optional[FileIdentity]:
+        return (self.dev, self.ino, self.size, self.mtime_ns) if self.ino else None
+
+    @property
+    def stat_identity(self) -> FileIdentity:
+        """(dev, ino, size, mtime_ns), also when the inode number is not stable."""
+        return (self.dev, self.ino, self.size, self.mtime_ns)
+
+    @property
+    def inode_key(self) -> Optional[Tuple[int, int]]:
+        return (self.dev, self.ino) if self.ino else None
+
+    @property
+    def xmp_path(self) -> Optional[Path]:
+        return Path(DIRECTORIES.value(self.dir_id), self.xmp_name) if self.xmp_name else None
+
+    @xmp_path.setter
+    def xmp_path(self, value: Optional[Path]):
+        self.xmp_name = Path(value).name if value else None
+
+    def process(self, hash_cache: Optional[HashCache] = None, rehash: bool = False,
+                compute_hash: bool = True, algorithm: str = DEFAULT_HASH_ALGORITHM,
+                tree_chunk_size: Optional[int] = None):
+        """Calculates hash and extracts metadata.
+
+        With a hash cache, unchanged files (same device, inode, size and
+        mtime) reuse their stored hash without reading any data. `rehash`
+        ignores cached values but still refreshes the cache. Staged dedupe
+        passes compute_hash=False and hashes only the files that need it.
+        """
+        if compute_hash:
+            self.compute_hash(hash_cache, rehash, algorithm, tree_chunk_size)
+        self.read_metadata()
+
+    def compute_hash(self, hash_cache: Optional[HashCache] = None, rehash: bool = False,
+                     algorithm: str = DEFAULT_HASH_ALGORITHM,
+                     tree_chunk_size: Optional[int] = None, chunk_size: int = HASH_CHUNK_SIZE,
+                     lookup: bool = True) -> int:
+        """Calculates the full content hash. Returns the number of bytes read.
+
+        With tree_chunk_size set, files of TREE_HASH_THRESHOLD bytes or more
+        get a parallel tree digest (recorded as e.g. 'sha256-tree-64M').
+        Duplicates always share a size, so they always get the same kind.
+        Callers that already looked the file up in the cache (in bulk, with
+        HashCache.lookup_many) pass lookup=False; the result is still stored.
+        """
+        self.hash_algo = self.hash_kind(algorithm, tree_chunk_size)
 
-    def process(self):
-        """Calculates hash and extracts metadata."""
-        # 1. Calculate Hash (4MB chunks)
-        h = hashlib.sha256()
-        with open(self.path, "rb") as f:
-            while chunk := f.read(4 * 1024 * 1024):
-                h.update(chunk)
-        self.hash = h.hexdigest()
+        cached = (hash_cache.get(self.identity, self.hash_algo)
+                  if hash_cache and lookup and not rehash else None)
+        if cached:
+            self.hash = cached
+            return 0
+
+        if self.hash_algo != algorithm:
+            self.hash = tree_hash_file(self.path, algorithm, tree_chunk_size, self.size)
+        else:
+            self.hash = hash_file(self.path, algorithm, chunk_size)
+        if hash_cache:
+            hash_cache.put(self.identity, self.hash, self.path, self.hash_algo)
+        return self.size
+
+    def hash_kind(self, algorithm: str = DEFAULT_HASH_ALGORITHM,
+                  tree_chunk_size: Optional[int] = None) -> str:
+        """Name of the digest compute_hash() produces for this file."""
+        return self.kind_for_size(self.size, algorithm, tree_chunk_size)
 
-        # 2. Extract Metadata
+    @staticmethod
+    def kind_for_size(size: int, algorithm: str = DEFAULT_HASH_ALGORITHM,
+                      tree_chunk_size: Optional[int] = None) -> str:
+        """hash_kind() for a file of `size` bytes (before its MediaFile exists)."""
+        if tree_chunk_size is not None and size >= TREE_HASH_THRESHOLD:
+            return tree_hash_algorithm(algorithm, tree_chunk_size)
+        return algorithm
+
+    def sample_hash(self, block_size: int = SAMPLE_BLOCK_SIZE,
+                    algorithm: str = DEFAULT_HASH_ALGORITHM) -> Tuple[bytes, int]:
+        """
+        Hash the head, middle and tail blocks of the file.
+
+        Files no larger than three blocks are read completely, in which case
+        the full hash is also set as a side effect.
+
+        Returns:
+            Tuple of (sample digest, bytes read)
+        """
+        start = time.perf_counter()
+        if self.size <= 3 * block_size:
+            with open(self.path, "rb") as f:
+                data = f.read()
+            THROTTLE.read(len(data))
+            h = get_hasher(algorithm)
+            h.update(data)
+            self.digest = h.digest()
+            self.hash_algo = algorithm
+            end = time.perf_counter()
+            METRICS.observe('sample_hash_seconds', end - start)
+            METRICS.inc('bytes_read', len(data))
+            TRACE.complete('sample_hash', 'hash', start, end, file=str(self.path), bytes=len(data))
+            return self.digest, len(data)
+
+        h = get_hasher(algorithm)
+        read = 0
+        with open(self.path, "rb") as f:
+            for offset in (0, (self.size - block_size) // 2, self.size - block_size):
+                f.seek(offset)
+                block = f.read(block_size)
+                read += len(block)
+                THROTTLE.read(len(block))
+                h.update(block)
+        end = time.perf_counter()
+        METRICS.observe('sample_hash_seconds', end - start)
+        METRICS.inc('bytes_read', read)
+        TRACE.complete('sample_hash', 'hash', start, end, file=str(self.path), bytes=read)
+        return h.digest(), read
+
+    def read_metadata(self) -> Dict:
+        """Extracts date, camera, keyword, rating and dimension metadata.
+
+        Returns the values read, as media catalog fields (see load_facts).
+        """
         meta = get_metadata(self.path, self.is_video)
 
-        # Date Logic (prioritize EXIF over filesystem)
-        date_tags = [
-            'EXIF:DateTimeOriginal',
-            'XMP:DateTimeOriginal',
-            'QuickTime:CreationDate',
-            'EXIF:CreateDate',
-            'CreateDate'
-        ]
-        for tag in date_tags:
-            if val := meta.get(tag):
-                try:
-                    # Clean timezone/UTC markers
-                    clean_val = str(val).split('+')[0].replace('Z', '').strip()
-                    self.dt = datetime.strptime(clean_val, "%Y:%m:%d %H:%M:%S")
-                    break
-                except (ValueError, TypeError):
-                    continue
+        keywords = meta.get('XMP:Subject') or meta.get('IPTC:Keywords') or []
+        if isinstance(keywords, str):
+            keywords = [keywords]
+        elif not isinstance(keywords, list):
+            keywords = []
 
-        # Camera Data
-        self.make = sanitize_camera_str(meta.get('EXIF:Make', '') or meta.get('Make', ''))
-        self.model = sanitize_camera_str(meta.get('EXIF:Model', '') or meta.get('Model', ''))
-
-        # Keywords
-        if keywords := meta.get('XMP:Subject') or meta.get('IPTC:Keywords'):
-            if isinstance(keywords, list):
-                self.keywords = set(keywords)
-            elif isinstance(keywords, str):
-                self.keywords = {keywords}
-
-        # Rating
-        if rating := meta.get('XMP:Rating'):
+        rating = 0
+        if value := meta.get('XMP:Rating'):
             try:
-                self.rating = int(rating)
+                rating = int(value)
             except (ValueError, TypeError):
                 pass
 
-        # Dimensions
         try:
-            self.width = int(meta.get('EXIF:ImageWidth', 0) or meta.get('ImageWidth', 0))
-            self.height = int(meta.get('EXIF:ImageHeight', 0) or meta.get('ImageHeight', 0))
+            width = int(meta.get('EXIF:ImageWidth', 0) or meta.get('ImageWidth', 0))
+            height = int(meta.get('EXIF:ImageHeight', 0) or meta.get('ImageHeight', 0))
         except (ValueError, TypeError):
-            pass
+            width = height = 0
+
+        facts = {
+            'file_type': meta.get('File:FileType', ''),
+            'dates': catalog_dates(meta),
+            'make': str(meta.get('EXIF:Make', '') or meta.get('Make', '')),
+            'model': str(meta.get('EXIF:Model', '') or meta.get('Model', '')),
+            'width': width,
+            'height': height,
+            'keywords': [str(k) for k in keywords],
+            'rating': rating,
+        }
+        self.load_facts(facts)
+        self.find_sidecar()
+        return facts
+
+    def load_facts(self, facts: Dict):
+        """Set the metadata fields from read_metadata() output or a catalog record."""
+        # Date Logic (prioritize EXIF over filesystem)
+        for tag in DATE_PRIORITY:
+            # Wall-clock time as written (offset ignored), like the filesystem fallback
+            if parsed := parse_exif_date(facts['dates'].get(tag)):
+                self.timestamp = parsed[0]
+                break
+
+        # Camera Data
+        self.make = sys.intern(sanitize_camera_str(facts['make']))
+        self.model = sys.intern(sanitize_camera_str(facts['model']))
+
+        self.keywords = facts['keywords']
+        self.rating = facts['rating']
+        self.width = facts['width']
+        self.height = facts['height']
 
         # Extension Correction (use FileType for accurate extension)
-        if ftype := meta.get('File:FileType'):
-            self.correct_ext = FILETYPE_TO_EXT.get(ftype, self.path.suffix.lower())
+        if ftype := facts['file_type']:
+            self.correct_ext = sys.intern(FILETYPE_TO_EXT.get(ftype, self.correct_ext))
 
-        # Check for XMP Sidecar (both .xmp and .ext.xmp formats)
-        xmp_cand = self.path.with_suffix('.xmp')
+    def find_sidecar(self):
+        """Check for an XMP Sidecar (both .xmp and .ext.xmp formats)."""
+        path = self.path
+        xmp_cand = path.with_suffix('.xmp')
         if not xmp_cand.exists():
-            xmp_cand = Path(str(self.path) + ".xmp")
+            xmp_cand = Path(str(path) + ".xmp")
         if xmp_cand.exists():
             self.xmp_path = xmp_cand
 
@@ -155,10 +379,23 @@ class MediaFile:
         score += self.rating * 1000  # Rating has high weight
         if self.is_raw:
             score *= 3.0  # Prefer RAW as source of truth
-        if self.keywords:
-            score += len(self.keywords) * 100  # Bonus for keyword richness
+        if self.keyword_ids:
+            score += len(self.keyword_ids) * 100  # Bonus for keyword richness
         return score
 
+class FileAction:
+    """A planned Phase 4 operation whose destination is already reserved."""
+    __slots__ = ('file', 'dest_path', 'dest_dev', 'id')
+
+    def __init__(self, file: MediaFile, dest_path: Path, dest_dev: int, action_id: int = 0):
+        self.file = file
+        self.dest_path = dest_path
+        self.dest_dev = dest_dev
+        self.id = action_id  # Journal record id
+
+    def __repr__(self):
+        return f"FileAction({self.file.path} -> {self.dest_path})"
+
 # =============================================================================
 # ENGINE
 # =============================================================================
@@ -168,93 +405,473 @@ class MediaEngine:
 
     def __init__(self, args):
         self.args = args
-        self.log_file = setup_logging("media_manager", Path(__file__).parent / "logs")
+        self.log_file = setup_logging("media_manager", Path(__file__).parent / "logs",
+                                      action_log=args.action_log, sample_every=args.log_sample)
         self.files: List[MediaFile] = []
-        self.used_destinations: Set[Path] = set()
+        self.scanned = 0
+        # Phase 4: destination folder -> names taken (existing on disk + reserved)
+        self.dest_index: Dict[Path, Set[str]] = {}
+        self.device_cache: Dict[str, int] = {}
+        self.journal: Optional[ActionJournal] = None
+        self.hash_cache: Optional[HashCache] = None
+        if args.hash_cache:
+            self.hash_cache = HashCache(Path(args.hash_cache), args.hash_algorithm)
+        self.catalog: Optional[MediaCatalog] = None
+        if args.catalog:
+            self.catalog = MediaCatalog(Path(args.catalog))
+
+        # Concurrency and read sizes follow the storage being read / written
+        self.source_storage = storage_profile(args.sources, args.storage_profile)
+        self.dest_storage = (storage_profile(args.dest, args.storage_profile)
+                             if args.dest else self.source_storage)
 
         print_success(f"Log file: {self.log_file}")
-
-    def scan(self):
-        """Phase 1: Scan source directories for media files."""
-        print_phase("Phase 1: Scanning Sources")
-        logging.info("=== Phase 1: Scanning Sources ===")
-
-        paths = []
+        print_success(f"Storage: {self.source_storage.describe()} -> {self.dest_storage.describe()}")
+        logging.info(f"Source storage: {self.source_storage.as_dict()}")
+        logging.info(f"Destination storage: {self.dest_storage.as_dict()}")
+        self.hash_limiter = worker_limiter("hash_workers", args.workers, self.source_storage.hash_workers)
+        if args.tree_hash:
+            # Segments get the CPUs the hash workers leave free (plus the one waiting on them)
+            set_tree_hash_workers(get_optimal_workers() - self.hash_limiter.maximum + 1)
+        set_cache_policy(args.cache_policy)
+        # Seek-bound sources read in on-disk order, one large file per disk at a time
+        self.io_order = self.source_storage.io_order if args.io_order == 'auto' else args.io_order
+        READERS.configure(self.source_storage.sequential_readers)
+        logging.info(f"I/O order: {self.io_order}, "
+                     f"{self.source_storage.sequential_readers} large reader(s) per device")
+
+    def scan(self) -> Iterator[ScanEntry]:
+        """Phase 1: Scan source directories for media files (streamed into Phase 2)."""
+        roots = []
         for src in self.args.sources:
             src_path = Path(src).resolve()
             if not src_path.exists():
                 print_warning(f"Source not found: {src}")
                 logging.warning(f"Source not found: {src}")
                 continue
-
             logging.info(f"Scanning: {src_path}")
-            for root, dirs, filenames in os.walk(src_path):
-                # Skip junk folders
-                dirs[:] = [d for d in dirs if d not in SKIP_DIRS]
+            roots.append(src_path)
 
-                for name in filenames:
-                    p = Path(root) / name
-                    if p.suffix.lower() in ALL_MEDIA_EXTENSIONS:
-                        paths.append(p)
+        # Single walk; entries carry their stat result into Phase 2
+        for entry in scan_media(roots, ALL_MEDIA_EXTENSIONS):
+            self.scanned += 1
+            yield entry
 
-        print_success(f"Found {len(paths):,} media files.")
-        logging.info(f"Found {len(paths):,} media files")
+    def process(self):
+        """Phases 1-2: Stream scan -> hash -> metadata through bounded queues.
 
-        if not paths:
+        Each stage runs on its own threads; bounded queues apply backpressure
+        so the scanner never runs far ahead of hashing, and finished files are
+        grouped as they arrive instead of after the whole library is done.
+        """
+        print_phase("Phase 1-2: Scanning, Hashing & Metadata", "Streaming pipeline: scan -> hash -> metadata")
+        logging.info("=== Phase 1-2: Scanning & Processing (streaming) ===")
+        METRICS.start_phase("scan")
+
+        metadata_limiter = worker_limiter("metadata_workers", self.args.workers, self.source_storage.workers)
+        get_exiftool_pool(metadata_limiter.maximum)  # One ExifTool process per metadata worker (started on demand)
+        logging.info(f"Using {self.hash_limiter.describe()} hash workers, "
+                     f"{metadata_limiter.describe()} metadata workers")
+        if not self._needs_full_hashes():
+            logging.info("Staged dedupe: deferring content hashing to Phase 3")
+
+        stages = [
+            PipelineStage("hash", self._hash_stage, limiter=self.hash_limiter),
+            PipelineStage("metadata", self._metadata_stage, limiter=metadata_limiter),
+        ]
+        entries = self.scan()
+        if self.io_order != 'walk':
+            # Sorting needs the whole scan first (no scan/hash overlap), but then reads sweep the disk
+            entries = sort_for_io(entries, self.io_order, path=lambda e: e.path,
+                                  inode=lambda e: (e.stat.st_dev, e.stat.st_ino))
+        for mf in tqdm(run_pipeline(self._prefetch(entries), stages, queue_size=PIPELINE_QUEUE_SIZE),
+                       desc="Processing", unit=" file"):
+            self._collect(mf)
+
+        print_success(f"Found {self.scanned:,} media files.")
+        logging.info(f"Found {self.scanned:,} media files")
+        if not self.scanned:
             print_error("No media files found!")
             sys.exit(1)
 
-    def process(self):
-        """Phase 2: Process metadata and compute hashes."""
-        print_phase("Phase 2: Processing Metadata & Hashing")
-        logging.info("=== Phase 2: Processing Metadata ===")
-
-        # Collect all paths first from scan
-        paths = []
-        for src in self.args.sources:
-            src_path = Path(src).resolve()
-            if not src_path.exists():
-                continue
-            for root, dirs, filenames in os.walk(src_path):
-                dirs[:] = [d for d in dirs if d not in SKIP_DIRS]
-                for name in filenames:
-                    p = Path(root) / name
-                    if p.suffix.lower() in ALL_MEDIA_EXTENSIONS:
-                        paths.append(p)
-
-        workers = get_optimal_workers()
-        logging.info(f"Using {workers} workers")
-
-        with ThreadPoolExecutor(max_workers=workers) as ex:
-            futures = {ex.submit(self._process_file_wrapper, p): p for p in paths}
-            for fut in tqdm(as_completed(futures), total=len(paths), desc="Processing"):
-                if res := fut.result():
-                    self.files.append(res)
-
         print_success(f"Processed {len(self.files):,} files successfully")
         logging.info(f"Processed {len(self.files):,} files")
 
-    @staticmethod
-    def _process_file_wrapper(path: Path) -> Optional[MediaFile]:
-        """Wrapper for parallel processing with error handling."""
+        if self.hash_cache:
+            self.hash_cache.flush()
+            logging.info(f"Hash cache: {self.hash_cache.hits:,} hits, {self.hash_cache.misses:,} misses")
+        if self.catalog:
+            self.catalog.flush()
+            logging.info(f"Catalog: {self.catalog.hits:,} unchanged files, {self.catalog.misses:,} new or changed")
+
+    def _prefetch(self, entries: Iterable[ScanEntry]) -> Iterator[Tuple[ScanEntry, Optional[Dict], Optional[str]]]:
+        """Pair scan entries with their media catalog record and cached full hash.
+
+        Both stores are queried once per PREFETCH_BATCH entries (indexed
+        bulk lookups on the scanner's stat results), not once per file.
+        """
+        entries = iter(entries)
+        algorithm = self.args.hash_algorithm
+        tree_chunk_size = self._tree_chunk_size()
+        hash_cache = self.hash_cache if self._needs_full_hashes() and not self.args.rehash else None
+        while batch := list(islice(entries, PREFETCH_BATCH)):
+            records = {}
+            if self.catalog:
+                records = self.catalog.lookup_many([e.path for e in batch], [e.stat for e in batch])
+            digests = {}
+            if hash_cache:
+                by_kind = defaultdict(list)
+                for entry in batch:
+                    kind = MediaFile.kind_for_size(entry.stat.st_size, algorithm, tree_chunk_size)
+                    record = records.get(entry.path)
+                    if not (record and record['hash'] and record['hash_algo'] == kind):
+                        by_kind[kind].append(file_identity(entry.stat))
+                for kind, keys in by_kind.items():
+                    digests.update(hash_cache.lookup_many(keys, kind))
+            for entry in batch:
+                yield entry, records.get(entry.path), digests.get(file_identity(entry.stat))
+
+    def _hash_stage(self, item: Tuple[ScanEntry, Optional[Dict], Optional[str]]) -> Optional[MediaFile]:
+        """Pipeline stage 1: build the MediaFile from the scan entry and hash it."""
+        THROTTLE.files()
+        entry, record, cached = item
         try:
-            mf = MediaFile(path)
-            mf.process()
+            mf = MediaFile(entry.to_path(), entry.stat)
+            if record:
+                self._load_cataloged(mf, record)
+            if self._needs_full_hashes() and not mf.cataloged & CATALOG_HASH:
+                if cached:
+                    mf.hash = cached
+                    mf.hash_algo = mf.hash_kind(self.args.hash_algorithm, self._tree_chunk_size())
+                else:
+                    # Already looked up by _prefetch()
+                    mf.compute_hash(self.hash_cache, self.args.rehash, self.args.hash_algorithm,
+                                    self._tree_chunk_size(), self.source_storage.read_chunk, lookup=False)
             return mf
         except Exception as e:
-            logging.error(f"Failed to process {path}: {e}")
+            logging.error(f"Failed to process {entry.path}: {e}")
             return None
 
+    def _metadata_stage(self, mf: MediaFile) -> Optional[MediaFile]:
+        """Pipeline stage 2: read ExifTool metadata (unless the catalog had it)."""
+        try:
+            if mf.cataloged & CATALOG_METADATA:
+                mf.find_sidecar()
+                facts = {}
+            else:
+                facts = mf.read_metadata()
+            if self.catalog:
+                self._catalog_record(mf, facts)
+            return mf
+        except Exception as e:
+            logging.error(f"Failed to process {mf.path}: {e}")
+            return None
+
+    def _load_cataloged(self, mf: MediaFile, record: Dict):
+        """Take what the media catalog holds for an unchanged file (recorded by any tool)."""
+        if all(record[field] is not None for field in CATALOG_METADATA_FIELDS):
+            mf.load_facts(record)
+            mf.cataloged |= CATALOG_METADATA
+        kind = mf.hash_kind(self.args.hash_algorithm, self._tree_chunk_size())
+        if record['hash'] and record['hash_algo'] == kind and not self.args.rehash:
+            mf.hash = record['hash']
+            mf.hash_algo = kind
+            mf.cataloged |= CATALOG_HASH
+
+    def _catalog_record(self, mf: MediaFile, facts: Dict):
+        """Record newly learned metadata and hashes in the media catalog."""
+        if mf.digest and not mf.cataloged & CATALOG_HASH:
+            facts.update(hash=mf.hash, hash_algo=mf.hash_algo)
+        if facts:
+            self.catalog.record(mf.path, mf.stat_identity, **facts)
+            mf.cataloged = CATALOG_METADATA | (CATALOG_HASH if mf.digest else 0)
+
+    def _collect(self, mf: MediaFile):
+        """Keep a finished file for Phase 3."""
+        self.files.append(mf)
+
+    def _tree_chunk_size(self) -> Optional[int]:
+        """Segment size for parallel tree hashing of large files (None = disabled)."""
+        return self.args.tree_chunk_mb * 1024 * 1024 if self.args.tree_hash else None
+
+    def _needs_full_hashes(self) -> bool:
+        """Full dedupe hashes every file while metadata is read (Phase 2)."""
+        return self.args.dedupe_method == 'full'
+
+    def _names_need_hashes(self) -> bool:
+        """Hash-based filenames need every file's full hash once duplicates are grouped."""
+        return self.args.rename or self.args.mode in ['rename', 'all']
+
+    def _group_by(self, column) -> List[List[MediaFile]]:
+        """Group self.files by a column of per-file keys (sort/unique)."""
+        files = self.files
+        return [[files[i] for i in rows] for rows in group_indices(column)]
+
+    def _group_by_hash(self) -> List[List[MediaFile]]:
+        """Group files by their full content hash (computed during Phase 2)."""
+        return self._group_by([f.digest for f in self.files])
+
+    def _group_staged(self) -> List[List[MediaFile]]:
+        """
+        Group identical files while reading as little data as possible.
+
+        1. Files with a unique size cannot have duplicates.
+        2. Hardlinks (same device + inode) are identical without reading.
+        3. Candidates already hashed (hash cache or catalog) need no reading.
+        4. Unknown candidates are compared by head/middle/tail samples; an
+           unknown candidate sharing its size with a known one is fully hashed.
+        5. Only files whose samples collide are fully hashed.
+
+        When filenames need hashes every inode is fully hashed anyway, so
+        sampling is skipped and each inode is read exactly once.
+
+        Produces the same groups as _group_by_hash(). Files whose read fails
+        are dropped from self.files, as full dedupe drops them in Phase 2.
+        """
+        groups: List[List[MediaFile]] = []
+        buckets: List[List[List[MediaFile]]] = []  # Per size: lists of hardlinked files
+
+        for files in self._group_by(array('q', (f.size for f in self.files))):
+            if len(files) == 1:
+                groups.append(files)
+                continue
+            by_inode = defaultdict(list)
+            for f in files:
+                by_inode[f.inode_key or id(f)].append(f)
+            if len(by_inode) == 1:
+                groups.append(files)  # All hardlinks to the same inode
+            else:
+                buckets.append(list(by_inode.values()))
+
+        reps = [links[0] for bucket in buckets for links in bucket]
+        logging.info(f"Staged dedupe: {len(groups):,} groups resolved by size/inode, "
+                     f"{len(reps):,} candidates to compare")
+
+        name_hashes = self._names_need_hashes()
+        if name_hashes:
+            reps += [files[0] for files in groups]  # Resolved groups are a single inode each
+
+        # Previously hashed files need no reading at all (digests from the catalog are already set)
+        algorithm = self.args.hash_algorithm
+        tree_chunk_size = self._tree_chunk_size()
+        if self.hash_cache and not self.args.rehash:
+            by_kind = defaultdict(list)
+            for f in (f for f in reps if not f.digest):
+                by_kind[f.hash_kind(algorithm, tree_chunk_size)].append(f)
+            for algo, files in by_kind.items():
+                cached = self.hash_cache.lookup_many([f.identity for f in files], algo)
+                for f in files:
+                    if f.identity in cached:
+                        f.hash = cached[f.identity]
+                        f.hash_algo = algo
+
+        to_hash = []
+        to_sample = []
+        if name_hashes:
+            to_hash = [f for f in reps if not f.digest]
+        else:
+            for bucket in buckets:
+                unknown = [links[0] for links in bucket if not links[0].digest]
+                if len(unknown) < len(bucket):
+                    to_hash.extend(unknown)  # Known digests are not re-read for samples
+                elif unknown:
+                    to_sample.extend(unknown)
+
+        # Sample candidates in buckets where nothing is known yet
+        samples = {}
+        sampled_bytes = 0
+        for f, (digest, read) in self._run_parallel(
+                lambda f: f.sample_hash(algorithm=algorithm), self._io_sorted(to_sample), "Sampling"):
+            samples[id(f)] = digest
+            sampled_bytes += read
+            if read == f.size and self.hash_cache:
+                self.hash_cache.put(f.identity, f.hash, f.path)
+        # Unreadable inodes are dropped, as full dedupe drops files it cannot hash
+        failed = {id(f) for f in to_sample if id(f) not in samples}
+
+        # Fully hash only sampled candidates whose samples collide
+        by_sample = defaultdict(list)
+        for f in to_sample:
+            if id(f) not in failed:
+                by_sample[(f.size, samples[id(f)])].append(f)
+        for same in by_sample.values():
+            if len(same) > 1:
+                to_hash.extend(f for f in same if not f.digest)
+
+        full_bytes = 0
+        hashed = set()
+        to_hash = self._io_sorted(to_hash)
+        for f, read in self._run_parallel(
+                lambda f: f.compute_hash(self.hash_cache, self.args.rehash, algorithm, tree_chunk_size,
+                                         self.source_storage.read_chunk, lookup=False),
+                to_hash, "Hashing"):
+            hashed.add(id(f))
+            full_bytes += read
+        failed.update(id(f) for f in to_hash if id(f) not in hashed)
+
+        # Group hashed inodes by hash; anything left unhashed is unique
+        dropped: List[MediaFile] = []
+        if name_hashes:
+            for files in groups:
+                for f in files[1:]:
+                    f.digest = files[0].digest
+                    f.hash_algo = files[0].hash_algo
+            dropped = [f for files in groups if id(files[0]) in failed for f in files]
+            groups = [files for files in groups if id(files[0]) not in failed]
+        for bucket in buckets:
+            by_hash = defaultdict(list)
+            for links in bucket:
+                rep = links[0]
+                if id(rep) in failed:
+                    dropped.extend(links)
+                elif rep.digest:
+                    for f in links:
+                        f.digest = rep.digest
+                        f.hash_algo = rep.hash_algo
+                    by_hash[rep.digest].extend(links)
+                else:
+                    groups.append(links)
+            groups.extend(by_hash.values())
+
+        if dropped:
+            gone = {id(f) for f in dropped}
+            self.files = [f for f in self.files if id(f) not in gone]
+            logging.warning(f"Staged dedupe: dropped {len(dropped):,} unreadable files")
+
+        total = sum(f.size for f in self.files)
+        logging.info(f"Staged dedupe: read {sampled_bytes / 1e6:,.1f} MB sampled + "
+                     f"{full_bytes / 1e6:,.1f} MB fully hashed of {total / 1e6:,.1f} MB total")
+        return groups
+
+    def _merge_near_duplicates(self, groups: List[List[MediaFile]]) -> List[List[MediaFile]]:
+        """
+        Merge exact-duplicate groups whose images look the same (resized,
+        re-encoded or format-converted copies).
+
+        One file per group is dHashed from its embedded preview. Groups are
+        then clustered around seed hashes found through a BK-tree, best
+        scoring groups first, so the usual get_score() winner selection
+        runs over each merged group. Seeds are never merged with each
+        other, so a chain of small differences cannot join unrelated images.
+        """
+        radius = self.args.near_distance
+        candidates = [i for i, group in enumerate(groups) if not group[0].is_video]
+        batches = [candidates[i:i + PHASH_BATCH_SIZE]
+                   for i in range(0, len(candidates), PHASH_BATCH_SIZE)]
+
+        hashes: Dict[int, int] = {}
+        for batch, values in self._run_parallel(
+                lambda b: perceptual_hashes([groups[i][0].path for i in b]), batches, "Perceptual hashing"):
+            hashes.update((i, h) for i, h in zip(batch, values) if h is not None)
+        logging.info(f"Near-duplicates: hashed {len(hashes):,} of {len(candidates):,} image groups")
+
+        tree = BKTree()
+        members: Dict[int, List[int]] = {}  # Seed group -> groups merged into it
+        best_first = sorted(hashes, key=lambda i: max(f.get_score() for f in groups[i]), reverse=True)
+        for i in best_first:
+            matches = tree.query(hashes[i], radius)
+            if matches:
+                distance, seed = matches[0]
+                members[seed].append(i)
+                logging.info(f"Near-duplicate (distance {distance}): {groups[i][0].path} ~ {groups[seed][0].path}")
+            else:
+                tree.add(hashes[i], i)
+                members[i] = [i]
+
+        merged_into = {i: seed for seed, group_ids in members.items() for i in group_ids[1:]}
+        result = []
+        for i, group in enumerate(groups):
+            if i in merged_into:
+                continue
+            if len(members.get(i, ())) > 1:
+                group = [f for g in members[i] for f in groups[g]]
+            result.append(group)
+
+        if merged_into:
+            print_warning(f"Near-duplicates found: {len(merged_into):,} (distance <= {radius})")
+        logging.info(f"Near-duplicates: {len(merged_into)} groups merged")
+        return result
+
+    def _io_sorted(self, files: List[MediaFile]) -> List[MediaFile]:
+        """Files in the order their data should be read (see --io-order)."""
+        return sort_for_io(files, self.io_order, path=lambda f: f.path, inode=lambda f: (f.dev, f.ino))
+
+    def _run_parallel(self, fn, items, desc: str):
+        """Run fn over items on a thread pool (one thread per source reader), yielding (item, result) pairs."""
+        items = list(items)
+        if not items:
+            return
+        with ThreadPoolExecutor(max_workers=self.hash_limiter.maximum) as ex:
+            results = run_adaptive(lambda item: ex.submit(fn, item), items, self.hash_limiter)
+            for item, fut in tqdm(results, total=len(items), desc=desc):
+                try:
+                    yield item, fut.result()
+                except Exception as e:
+                    logging.error(f"Failed to read {getattr(item, 'path', item)}: {e}")
+
     def execute(self):
         """Main execution logic."""
-        # Phase 1 & 2: Scan and Process
+        try:
+            self._execute()
+        finally:
+            if self.hash_cache:
+                self.hash_cache.close()
+            if self.catalog:
+                self.catalog.close()
+            if self.journal:
+                self.journal.close()
+
+    def _execute(self):
+        actions = self._resume_actions() if self.args.resume else None
+        if actions is None:
+            actions = self._plan()
+            if not self.args.dry_run:
+                self._journal_plan(actions)
+        elif not actions:
+            return
+
+        # Execute concurrently (per-device limits)
+        failed = 0
+        if self.args.dry_run:
+            actions_count = len(actions)
+        else:
+            actions_count, failed = self._execute_actions(actions)
+            self.journal.append('end', succeeded=actions_count, failed=failed)
+
+        # Summary
+        print_phase("Summary")
+        print_success(f"Files processed: {actions_count:,}")
+        if failed:
+            print_error(f"Failed: {failed:,} (see log for details)")
+        if self.args.dry_run:
+            print_warning("This was a DRY-RUN. Use --execute to apply changes.")
+        elif failed:
+            print_warning("Operation completed with errors.")
+        else:
+            print_success("Operation completed successfully!")
+
+        logging.info(f"Total actions: {actions_count}, failed: {failed}")
+        METRICS.finish()
+        METRICS.print_summary()
+
+    def _plan(self) -> List[FileAction]:
+        """Phases 1-3 plus Phase 4 planning: returns the actions to perform."""
+        # Phase 1 & 2: Scan and Process (streaming)
         self.process()
 
         # Phase 3: Group by Hash (Deduplication context)
         print_phase("Phase 3: Grouping Duplicates")
-        hash_groups = defaultdict(list)
-        for f in self.files:
-            hash_groups[f.hash].append(f)
+        METRICS.start_phase("group")
+        if self._needs_full_hashes():
+            hash_groups = self._group_by_hash()
+        else:
+            hash_groups = self._group_staged()
+        if self.catalog:
+            # Staged dedupe hashes only now; keep them for the next run
+            for f in self.files:
+                if f.digest and not f.cataloged & CATALOG_HASH:
+                    self._catalog_record(f, {})
+            self.catalog.flush()
 
         unique_hashes = len(hash_groups)
         total_files = len(self.files)
@@ -265,50 +882,199 @@ class MediaEngine:
             print_warning(f"Duplicates found: {duplicates:,}")
         logging.info(f"Unique: {unique_hashes}, Duplicates: {duplicates}")
 
+        if self.args.near_dupes:
+            METRICS.start_phase("near_dupes")
+            hash_groups = self._merge_near_duplicates(hash_groups)
+
         # Phase 4: Execute Actions
         print_phase(f"Phase 4: Executing Actions ({self.args.mode.upper()})")
         logging.info(f"=== Phase 4: {self.args.mode.upper()} Mode ===")
+        METRICS.start_phase("plan")
 
         if self.args.dry_run:
             print_warning("DRY-RUN MODE: No files will be modified")
             logging.info("DRY-RUN MODE ENABLED")
 
         # Sort groups by date for deterministic processing
-        sorted_groups = sorted(hash_groups.values(), key=lambda g: g[0].dt)
+        sorted_groups = sorted(hash_groups, key=lambda g: g[0].timestamp)
 
-        actions_count = 0
-        for group in tqdm(sorted_groups, desc="Organizing"):
+        # Plan sequentially (deterministic names and collision suffixes)
+        actions: List[FileAction] = []
+        for group in tqdm(sorted_groups, desc="Planning"):
             # 1. Select Winner (Best file from duplicate group)
             winner = max(group, key=lambda x: x.get_score())
             losers = [f for f in group if f != winner]
 
             # 2. Handle Winner
-            if self._handle_file(winner, is_duplicate=False):
-                actions_count += 1
+            if action := self._handle_file(winner, is_duplicate=False):
+                actions.append(action)
 
             # 3. Handle Duplicates
             if self.args.mode in ['deduplicate', 'all']:
                 for dup in losers:
-                    if self._handle_file(dup, is_duplicate=True, winner=winner):
-                        actions_count += 1
+                    if action := self._handle_file(dup, is_duplicate=True, winner=winner):
+                        actions.append(action)
             elif self.args.mode in ['organize']:
                 # In organize mode, treat all files equally
                 for dup in losers:
-                    if self._handle_file(dup, is_duplicate=False):
-                        actions_count += 1
+                    if action := self._handle_file(dup, is_duplicate=False):
+                        actions.append(action)
+
+        for action_id, action in enumerate(actions):
+            action.id = action_id
+        return actions
+
+    # ---- Action journal (--resume) ------------------------------------------
+
+    def _run_signature(self) -> Dict:
+        """Options that must match for a journal to be resumable."""
+        return {
+            'sources': [str(Path(src).resolve()) for src in self.args.sources],
+            'dest': str(Path(self.args.dest).resolve()) if self.args.dest else None,
+            'mode': self.args.mode,
+            'action': self.args.action,
+            'structure': self.args.structure,
+            'dupe_strategy': self.args.dupe_strategy,
+            'rename': self.args.rename,
+        }
+
+    def _journal_plan(self, actions: List[FileAction]):
+        """Start a new journal and durably record the full plan before executing."""
+        self.journal = ActionJournal(Path(self.args.journal))
+        self.journal.append('run', started=datetime.now().isoformat(timespec='seconds'),
+                            **self._run_signature())
+        for action in actions:
+            self.journal.append('plan', id=action.id, src=str(action.file.path),
+                                dst=str(action.dest_path),
+                                xmp=str(action.file.xmp_path) if action.file.xmp_path else None)
+        self.journal.append('planned', count=len(actions))
+        self.journal.sync()
+        logging.info(f"Journal: {self.args.journal} ({len(actions):,} planned actions)")
+
+    def _resume_actions(self) -> Optional[List[FileAction]]:
+        """Rebuild the pending actions of an interrupted run from the journal.
+
+        Returns None when there is no complete plan to resume (a fresh run is
+        needed; unchanged files still come from the hash cache).
+        """
+        journal_path = Path(self.args.journal)
+        if not journal_path.exists():
+            print_warning(f"No journal at {journal_path} - starting a fresh run")
+            return None
 
-        # Summary
-        print_phase("Summary")
-        print_success(f"Files processed: {actions_count:,}")
-        if self.args.dry_run:
-            print_warning("This was a DRY-RUN. Use --execute to apply changes.")
-        else:
-            print_success("Operation completed successfully!")
+        self.journal = ActionJournal(journal_path, resume=True)
+        header = self.journal.header()
+        if header is None or not any(r['t'] == 'planned' for r in self.journal.records):
+            print_warning("Journal has no complete plan - starting a fresh run")
+            self.journal.close()
+            self.journal = None
+            return None
+
+        signature = self._run_signature()
+        mismatched = [k for k, v in signature.items() if header.get(k) != v]
+        if mismatched:
+            print_error(f"ERROR: journal was written with different options ({', '.join(mismatched)}); "
+                        "run without --resume to start over")
+            sys.exit(1)
+        if any(r['t'] == 'end' for r in self.journal.records):
+            print_success("Journal shows the previous run completed - nothing to resume")
+            return []
+
+        completed = {r['id'] for r in self.journal.records if r['t'] == 'done'}
+        plans = [r for r in self.journal.records if r['t'] == 'plan' and r['id'] not in completed]
 
-        logging.info(f"Total actions: {actions_count}")
+        print_phase(f"Phase 4: Resuming Actions ({self.args.mode.upper()})")
+        print_success(f"Journal: {len(completed):,} completed, {len(plans):,} remaining")
+        logging.info(f"=== Resuming from {journal_path}: {len(completed)} completed, {len(plans)} remaining ===")
 
-    def _handle_file(self, file: MediaFile, is_duplicate: bool, winner: Optional[MediaFile] = None) -> bool:
-        """Determines destination and performs copy/move/rename."""
+        actions: List[FileAction] = []
+        for rec in plans:
+            if action := self._reconcile(rec):
+                actions.append(action)
+        return actions
+
+    def _reconcile(self, rec: Dict) -> Optional[FileAction]:
+        """Settle an unfinished journal entry against the filesystem.
+
+        Returns the action to (re)run, or None when it turns out to be done
+        or its source is gone.
+        """
+        src, dst = Path(rec['src']), Path(rec['dst'])
+        xmp = Path(rec['xmp']) if rec.get('xmp') else None
+        xmp_dst = dst.with_suffix('.xmp') if xmp else None
+        action_name = self.args.action
+
+        if not os.path.lexists(src):
+            if os.path.lexists(dst):
+                if action_name == 'move' and xmp and os.path.lexists(xmp):
+                    transfer_file(xmp, xmp_dst, 'move')  # Crashed between file and sidecar
+                self.journal.append('done', id=rec['id'])
+                return None
+            logging.warning(f"Resume: source and destination both missing, skipping: {src}")
+            return None
+
+        if os.path.lexists(dst):
+            if self._same_file(src, dst):
+                # Already done: in place, hardlinked, or a case-only rename on a
+                # case-insensitive destination (src and dst name one file)
+                if xmp and os.path.lexists(xmp) and not os.path.lexists(xmp_dst):
+                    transfer_file(xmp, xmp_dst, action_name)  # Crashed between file and sidecar
+                self.journal.append('done', id=rec['id'])
+                return None
+            # Interrupted copy (or cross-device move): the destination was
+            # reserved for us at planning time, so it is a partial result
+            logging.info(f"Resume: removing partial destination {dst}")
+            dst.unlink()
+            if xmp_dst and os.path.lexists(xmp_dst) and os.path.lexists(xmp):
+                xmp_dst.unlink()
+
+        mf = MediaFile(src)
+        mf.xmp_path = xmp if xmp and xmp.exists() else None
+        return FileAction(mf, dst, device_of(dst.parent, self.device_cache), rec['id'])
+
+    def _execute_actions(self, actions: List[FileAction]) -> Tuple[int, int]:
+        """Run planned actions in parallel, limited per source and destination device.
+
+        Returns:
+            Tuple of (succeeded, failed)
+        """
+        workers = self.args.copy_workers or min(self.source_storage.copy_workers, self.dest_storage.copy_workers)
+        per_source = self.args.per_device or self.source_storage.per_device
+        per_dest = self.args.per_device or self.dest_storage.per_device
+        limiter = None
+        if self.args.workers == 'auto' and not self.args.copy_workers:
+            limiter = AdaptiveLimiter("copy_workers", workers)
+        described = limiter.describe() if limiter else workers
+        logging.info(f"Executing {len(actions):,} actions with {described} workers "
+                     f"({per_source} per source device, {per_dest} per destination device)")
+        METRICS.start_phase("actions")
+        succeeded = failed = 0
+        actions = sort_for_io(actions, self.io_order, path=lambda a: a.file.path,
+                              inode=lambda a: (a.file.dev, a.file.ino))
+        results = run_device_limited(
+            actions, self._perform_action,
+            devices=lambda a: (a.file.dev, a.dest_dev),
+            workers=workers,
+            per_source=per_source,
+            per_dest=per_dest,
+            limiter=limiter,
+        )
+        for action, ok in tqdm(results, total=len(actions), desc="Organizing"):
+            if ok:
+                succeeded += 1
+                self.journal.append('done', id=action.id)
+            else:
+                failed += 1
+                self.journal.append('fail', id=action.id)
+        return succeeded, failed
+
+    def _handle_file(self, file: MediaFile, is_duplicate: bool,
+                     winner: Optional[MediaFile] = None) -> Optional[FileAction]:
+        """Determines the destination and reserves it.
+
+        Returns the planned action (or None when the file is skipped); the
+        copy/move itself runs later in _perform_action().
+        """
 
         # A. Determine Filename
         if self.args.rename or self.args.mode in ['rename', 'all']:
@@ -329,7 +1095,7 @@ class MediaEngine:
 
         # B. Determine Folder Structure
         if is_duplicate and self.args.dupe_strategy == 'skip':
-            logging.info(f"Skipping duplicate: {file.path}")
+            log_action(f"Skipping duplicate: {file.path}", action="skip", src=str(file.path))
             return False  # Skip duplicates completely
 
         if self.args.mode == 'rename':
@@ -369,49 +1135,116 @@ class MediaEngine:
         # C. Handle Collisions (Safety)
         dest_path = dest_folder / final_name
 
-        # Check if destination already used or exists
+        # Check if destination already used or exists (one listing per folder)
+        taken = self._dest_names(dest_folder)
         counter = 1
         original_stem = dest_path.stem
         original_ext = dest_path.suffix
-        while dest_path in self.used_destinations or (dest_path.exists() and not self.args.dry_run):
-            # If renaming in-place and name matches, it's fine
-            if self.args.action == 'move' and dest_path.resolve() == file.path.resolve():
-                break
+        while not self._dest_free(file, dest_path, taken):
             dest_path = dest_folder / f"{original_stem}_{counter}{original_ext}"
             counter += 1
+        if counter > 1:
+            METRICS.inc('collision_probes', counter - 1)
 
-        self.used_destinations.add(dest_path)
+        taken.add(dest_path.name.casefold())
+        if file.xmp_path:
+            taken.add(dest_path.with_suffix('.xmp').name.casefold())  # The sidecar travels with it
 
-        # D. Perform Action
         if self.args.dry_run:
             # Just log
-            logging.info(f"WOULD {self.args.action.upper()}: {file.path} -> {dest_path}")
+            log_action(f"WOULD {self.args.action.upper()}: {file.path} -> {dest_path}",
+                       action=self.args.action, dry_run=True, src=str(file.path), dst=str(dest_path))
+
+        return FileAction(file, dest_path, device_of(dest_folder, self.device_cache))
+
+    def _dest_free(self, file: MediaFile, dest_path: Path, taken: Set[str]) -> bool:
+        """Whether dest_path, and the sidecar name next to it, are free for file.
+
+        When renaming in place, the file's own current names are not taken.
+        """
+        in_place = self.args.action == 'move' and dest_path.parent == file.path.parent
+        names = [(dest_path, file.path)]
+        if file.xmp_path:
+            names.append((dest_path.with_suffix('.xmp'), file.xmp_path))
+        return all(dest.name.casefold() not in taken or (in_place and self._is_same_entry(dest, own))
+                   for dest, own in names)
+
+    @staticmethod
+    def _is_same_entry(dest_path: Path, src_path: Path) -> bool:
+        """Whether dest_path names src_path itself, not a different file.
+
+        A name differing only in case is the same entry only on a
+        case-insensitive filesystem; on a case-sensitive one it may be
+        another file that os.rename would overwrite.
+        """
+        if dest_path.name == src_path.name:
             return True
-        else:
-            dest_folder.mkdir(parents=True, exist_ok=True)
+        if dest_path.name.casefold() != src_path.name.casefold():
+            return False
+        return MediaEngine._same_file(dest_path, src_path)
 
-            try:
-                if self.args.action == 'move':
-                    if file.path.resolve() != dest_path.resolve():
-                        shutil.move(str(file.path), str(dest_path))
-                        logging.info(f"MOVED: {file.path} -> {dest_path}")
-                elif self.args.action == 'copy':
-                    shutil.copy2(str(file.path), str(dest_path))
-                    logging.info(f"COPIED: {file.path} -> {dest_path}")
-
-                # Handle XMP Sidecar
-                if file.xmp_path:
-                    xmp_dest = dest_path.with_suffix('.xmp')
-                    if self.args.action == 'move':
-                        shutil.move(str(file.xmp_path), str(xmp_dest))
-                    else:
-                        shutil.copy2(str(file.xmp_path), str(xmp_dest))
-
-                return True
-            except Exception as e:
-                logging.error(f"Failed to {self.args.action} {file.path}: {e}")
-                print_error(f"Failed: {file.path.name}")
-                return False
+    @staticmethod
+    def _same_file(a: Path, b: Path) -> bool:
+        """os.path.samefile, False when either path cannot be stat'ed."""
+        try:
+            return os.path.samefile(a, b)
+        except OSError:
+            return False  # Missing or unreadable: not provably the same file
+
+    def _dest_names(self, folder: Path) -> Set[str]:
+        """Names taken in a destination folder, listed once on first use.
+
+        Names are casefolded so case-insensitive destinations (SMB, NTFS,
+        APFS) never get two names that collide on disk. Dry runs skip the
+        listing, matching the old behaviour of not probing the destination.
+        """
+        names = self.dest_index.get(folder)
+        if names is None:
+            names = set()
+            if not self.args.dry_run:
+                METRICS.inc('dest_listings')
+                try:
+                    with os.scandir(folder) as it:
+                        names.update(entry.name.casefold() for entry in it)
+                except (FileNotFoundError, NotADirectoryError):
+                    pass
+            self.dest_index[folder] = names
+        return names
+
+    def _perform_action(self, action: FileAction) -> bool:
+        """D. Perform a planned copy/move (runs on an executor thread)."""
+        file, dest_path = action.file, action.dest_path
+        THROTTLE.files()
+        try:
+            dest_path.parent.mkdir(parents=True, exist_ok=True)
+
+            action_name = self.args.action
+            method = None
+            if action_name == 'move' and file.path.resolve() == dest_path.resolve():
+                pass  # Already in place
+            else:
+                method = transfer_file(file.path, dest_path, action_name)
+                log_action(f"{ACTION_VERBS[action_name]} ({method}): {file.path} -> {dest_path}",
+                           action=action_name, method=method, src=str(file.path), dst=str(dest_path))
+
+            # Handle XMP Sidecar (same action as its media file)
+            xmp_dest = None
+            if file.xmp_path:
+                xmp_dest = dest_path.with_suffix('.xmp')
+                transfer_file(file.xmp_path, xmp_dest, action_name)
+
+            # The destination has the same content: later runs over it start from the catalog
+            if self.catalog and method:
+                self.catalog.copy(file.path, file.stat_identity, dest_path, os.stat(dest_path),
+                                  str(xmp_dest) if xmp_dest else None)
+                if action_name == 'move':
+                    self.catalog.forget(file.path)
+
+            return True
+        except Exception as e:
+            logging.error(f"Failed to {self.args.action} {file.path}: {e}")
+            print_error(f"Failed: {file.path.name}")
+            return False
 
 # =============================================================================
 # CLI SETUP
@@ -446,9 +1279,11 @@ Examples:
 
     # Behavior
     parser.add_argument("--action",
-                        choices=['copy', 'move'],
+                        choices=list(ACTION_VERBS),
                         default='copy',
-                        help="Action type: copy (safe, default) or move (destructive)")
+                        help="Action type: copy (safe, default), move (destructive), "
+                             "reflink (copy-on-write clone, falls back to copy), "
+                             "hardlink (shares the source inode), auto (reflink if possible, else copy)")
 
     parser.add_argument("--structure",
                         choices=['simple', 'keywords'],
@@ -464,11 +1299,161 @@ Examples:
                         action="store_true",
                         help="Force rename using PowerShell-compatible format (YYYY-MM-DD-HHmmss-Make-Model-Hash.ext)")
 
+    parser.add_argument("--dedupe-method",
+                        choices=['staged', 'full'],
+                        default='staged',
+                        help="Duplicate detection: staged (size, then sampled blocks, then full hash "
+                             "only where needed) or full (hash every file). Hash-based renaming "
+                             "fully hashes every inode once, after size grouping.")
+
+    parser.add_argument("--hash-algorithm",
+                        choices=sorted(HASHERS),
+                        default=DEFAULT_HASH_ALGORITHM,
+                        help="Content hash: sha256 (default, required for hash-based filenames), "
+                             "blake2b, or xxh3_128/blake3 when installed (faster identity-only runs)")
+
+    parser.add_argument("--tree-hash",
+                        action="store_true",
+                        help=f"Hash files of {TREE_HASH_THRESHOLD // (1024 ** 3)} GB or more as parallel "
+                             "segment trees (identity-only; not compatible with hash-based renaming)")
+
+    parser.add_argument("--tree-chunk-mb",
+                        type=positive_int, default=64,
+                        help="Segment size for --tree-hash in MB (digests are only comparable "
+                             "for the same segment size; default: 64)")
+
+    parser.add_argument("--near-dupes",
+                        action="store_true",
+                        help="Also treat visually identical images (resized, re-encoded, HEIC->JPEG) as duplicates "
+                             "(requires Pillow; deduplicate/all modes)")
+
+    parser.add_argument("--near-distance",
+                        type=int, default=6,
+                        help="Max differing bits (of 64) between perceptual hashes for --near-dupes (default: 6)")
+
+    # Concurrency
+    parser.add_argument("--workers",
+                        type=parse_workers,
+                        help="Hash and metadata workers, or 'auto' to tune them (and Phase 4 copies) while "
+                             "running from measured throughput (default: from the storage profile)")
+
+    parser.add_argument("--copy-workers",
+                        type=int,
+                        help="Concurrent copy/move operations in Phase 4 (default: from the storage profiles)")
+
+    parser.add_argument("--per-device",
+                        type=int,
+                        help="Max concurrent operations reading from / writing to one device "
+                             "(default: from the storage profiles)")
+
+    parser.add_argument("--storage-profile",
+                        default="auto",
+                        metavar="NAME",
+                        help="Tuning profile for workers, read sizes and copy concurrency: auto (detect from "
+                             "the mount), nvme, ssd, hdd, network, default or one from "
+                             "configs/storage_profiles.json (default: auto)")
+
+    parser.add_argument("--io-order",
+                        choices=('auto',) + IO_ORDERS,
+                        default="auto",
+                        help="Order files are read in: walk (directory order, streams from the scan), "
+                             "inode, or physical (on-disk position via FIEMAP, for HDDs); auto follows "
+                             "the storage profile (physical on hdd) (default: auto)")
+
+    parser.add_argument("--cache-policy",
+                        choices=CACHE_POLICIES,
+                        default="drop",
+                        help="Page cache use while hashing and copying: keep (leave data cached), drop "
+                             "(release pages behind each file so other programs keep their cache) or "
+                             "direct (drop, plus O_DIRECT reads of very large files) (default: drop)")
+
+    # Throttling
+    parser.add_argument("--max-read-mb",
+                        type=float,
+                        metavar="MB_S",
+                        help="Cap on bytes read per second while hashing and copying (MB/s)")
+
+    parser.add_argument("--max-write-mb",
+                        type=float,
+                        metavar="MB_S",
+                        help="Cap on bytes written per second by Phase 4 copies (MB/s)")
+
+    parser.add_argument("--max-files",
+                        type=float,
+                        metavar="N",
+                        help="Cap on files processed per second (hashing/metadata and Phase 4 actions)")
+
+    parser.add_argument("--throttle-schedule",
+                        metavar="PATH",
+                        help="JSON schedule of time windows with their own caps, e.g. unthrottled "
+                             "01:00-06:00 (see README)")
+
+    parser.add_argument("--nice",
+                        type=int,
+                        help="CPU nice level for this run and its ExifTool processes (e.g. 10)")
+
+    parser.add_argument("--idle-io",
+                        action="store_true",
+                        help="Idle I/O priority (Linux): only use the disks when nothing else does")
+
+    # Hash cache
+    parser.add_argument("--hash-cache",
+                        default=str(Path(__file__).parent / "cache" / "hash_cache.db"),
+                        help="SQLite hash cache location (default: cache/hash_cache.db next to this script)")
+
+    parser.add_argument("--no-hash-cache",
+                        dest="hash_cache", action="store_const", const=None,
+                        help="Disable the hash cache (always read every file)")
+
+    parser.add_argument("--rehash",
+                        action="store_true",
+                        help="Ignore cached hashes and re-read every file (cache is refreshed)")
+
+    # Media catalog (shared with the other tools)
+    parser.add_argument("--catalog",
+                        default=str(default_catalog_path()),
+                        help="Media catalog shared by all tools; unchanged files it knows skip ExifTool and hashing "
+                             "(default: cache/catalog.db next to this script, or $MEDIA_TOOLS_CATALOG)")
+
+    parser.add_argument("--no-catalog",
+                        dest="catalog", action="store_const", const=None,
+                        help="Neither read nor update the media catalog")
+
+    # Resume
+    parser.add_argument("--journal",
+                        default=str(Path(__file__).parent / "cache" / "action_journal.jsonl"),
+                        help="Action journal location (default: cache/action_journal.jsonl next to this script)")
+
+    parser.add_argument("--resume",
+                        action="store_true",
+                        help="Continue an interrupted --execute run from its journal (skips scanning and hashing)")
+
     # Safety
     parser.add_argument("--execute",
                         action="store_true",
                         help="Actually perform actions (default is dry-run mode)")
 
+    # Instrumentation
+    parser.add_argument("--metrics",
+                        metavar="PATH",
+                        help="Write per-phase metrics at exit: Prometheus textfile if PATH ends in .prom, else JSON")
+
+    parser.add_argument("--trace",
+                        metavar="PATH",
+                        help="Write a Chrome trace-event timeline of hashes, ExifTool requests and copies "
+                             "(open in ui.perfetto.dev)")
+
+    parser.add_argument("--action-log",
+                        metavar="PATH",
+                        help="Write per-file actions as JSON lines to PATH instead of the text log and console")
+
+    parser.add_argument("--log-sample",
+                        type=int,
+                        default=1,
+                        metavar="N",
+                        help="Keep one in N per-file action lines in the text log (default: 1, all; "
+                             "warnings and errors are always kept)")
+
     parser.add_argument("--version", action="version", version=f"Media Manager v{__version__}")
 
     return parser.parse_args()
@@ -485,8 +1470,53 @@ if __name__ == "__main__":
         print_error(f"ERROR: --dest is required for mode '{args.mode}'")
         sys.exit(1)
 
+    if args.rename or args.mode in ['rename', 'all']:
+        if args.hash_algorithm != DEFAULT_HASH_ALGORITHM:
+            print_error(f"ERROR: --hash-algorithm {args.hash_algorithm} cannot be used with hash-based renaming "
+                        f"(filenames embed the {DEFAULT_HASH_ALGORITHM} prefix)")
+            sys.exit(1)
+        if args.tree_hash:
+            print_error("ERROR: --tree-hash cannot be used with hash-based renaming "
+                        f"(filenames embed the flat {DEFAULT_HASH_ALGORITHM} prefix)")
+            sys.exit(1)
+
+    if args.near_dupes:
+        if args.mode not in ['deduplicate', 'all']:
+            print_error("ERROR: --near-dupes requires --mode deduplicate or all")
+            sys.exit(1)
+        if not PERCEPTUAL_HASH_AVAILABLE:
+            print_error("ERROR: --near-dupes requires Pillow - run: pip install Pillow")
+            sys.exit(1)
+
+    if args.storage_profile != 'auto' and args.storage_profile not in storage_profile_names():
+        print_error(f"ERROR: Unknown --storage-profile '{args.storage_profile}' "
+                    f"(available: auto, {', '.join(storage_profile_names())})")
+        sys.exit(1)
+
+    if args.log_sample < 1:
+        print_error("ERROR: --log-sample must be at least 1")
+        sys.exit(1)
+
+    if any(v is not None and v <= 0 for v in (args.max_read_mb, args.max_write_mb, args.max_files)):
+        print_error("ERROR: --max-read-mb, --max-write-mb and --max-files must be positive")
+        sys.exit(1)
+
+    schedule = None
+    if args.throttle_schedule:
+        try:
+            schedule = load_throttle_schedule(args.throttle_schedule)
+        except ValueError as e:
+            print_error(f"ERROR: {e}")
+            sys.exit(1)
+    THROTTLE.configure(args.max_read_mb, args.max_write_mb, args.max_files, schedule)
+    priority = ", ".join(set_process_priority(args.nice, args.idle_io))
+
     args.dry_run = not args.execute
 
+    if args.resume and args.dry_run:
+        print_error("ERROR: --resume requires --execute")
+        sys.exit(1)
+
     # Configuration Summary
     print_phase("MEDIA MANAGER CONFIGURATION")
     print(f"Mode:           {args.mode.upper()}")
@@ -494,11 +1524,29 @@ if __name__ == "__main__":
     print(f"Structure:      {args.structure}")
     print(f"Duplicates:     {args.dupe_strategy}")
     print(f"Rename:         {args.rename}")
+    print(f"Hash:           {args.hash_algorithm}{f' (tree, {args.tree_chunk_mb} MB segments)' if args.tree_hash else ''}")
+    print(f"Hash Cache:     {args.hash_cache or 'disabled'}{' (rehash)' if args.rehash else ''}")
+    print(f"Catalog:        {args.catalog or 'disabled'}")
+    if args.near_dupes:
+        print(f"Near Dupes:     distance <= {args.near_distance}")
     print(f"Dry Run:        {args.dry_run}")
+    print(f"Storage:        {args.storage_profile}")
+    print(f"Workers:        {args.workers or 'from storage profile'}")
+    print(f"Copy Workers:   {args.copy_workers or 'auto'} ({args.per_device or 'auto'} per device)")
+    print(f"I/O Order:      {args.io_order}")
+    print(f"Page Cache:     {args.cache_policy}")
+    print(f"Throttle:       {THROTTLE.describe()}{f' ({priority})' if priority else ''}")
+    if args.resume:
+        print(f"Resume:         {args.journal}")
     if args.dest:
         print(f"Destination:    {args.dest}")
     print()
 
+    if args.metrics:
+        METRICS.export_at_exit(args.metrics, "media_manager")
+    if args.trace:
+        TRACE.save_at_exit(args.trace, "media_manager")
+
     # Execute
     engine = MediaEngine(args)
     engine.execute()
@@ -2,7 +2,7 @@
 """
 Metadata Scrubber Pro
 =====================
-Version: 3.0.0
+Version: 3.1.0
 
 Description:
     Removes 3rd-party metadata (Lightroom edits, PII) while preserving
@@ -16,6 +16,7 @@ Usage:
     python metadata-scrubber.py --help
 
 Changelog:
+    v3.1.0 - Performance: Single-pass os.scandir scan via media_common.scan_media
     v3.0.0 - Code unification: Refactored to use media_common.py shared library (~135 lines removed)
     v2.8.0 - Scrub mode selection: Choose embedded metadata, XMP sidecars, or both (wizard + CLI)
     v2.7.0 - XMP sidecar support: Added .xmp to supported extensions, clearer unsupported message
@@ -42,22 +43,23 @@ import json
 import re
 from pathlib import Path
 from datetime import datetime
-from concurrent.futures import ProcessPoolExecutor, as_completed
-from typing import List, Tuple
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple, Union
 import argparse
 
 # Import shared library
 try:
     sys.path.insert(0, str(Path(__file__).parent.parent))
     from lib.media_common import (
-        PHOTO_EXTENSIONS, VIDEO_EXTENSIONS, FILETYPE_TO_EXT, SKIP_DIRS,
-        WORKER_PROFILES, get_optimal_workers, setup_logging,
-        print_phase, print_success, print_error, print_warning,
-        check_exiftool
+        PHOTO_EXTENSIONS, VIDEO_EXTENSIONS, FILETYPE_TO_EXT, scan_media,
+        WORKER_PROFILES, worker_limiter, run_adaptive, parse_workers, available_cpus, setup_logging,
+        print_phase, print_success, print_error, print_warning, print_info,
+        check_exiftool, run_exiftool, METRICS, TRACE, run_with_metrics, merge_worker_metrics,
+        tqdm, module_available, storage_profile, storage_profile_names,
+        THROTTLE, load_throttle_schedule, set_process_priority, sort_for_io, IO_ORDERS,
+        MediaCatalog, default_catalog_path
     )
-    try:
-        from tqdm import tqdm
-    except ImportError:
+    if not module_available('tqdm'):
         print("ERROR: Missing tqdm. Run: pip install tqdm")
         sys.exit(1)
 except ImportError as e:
@@ -65,7 +67,7 @@ except ImportError as e:
     print(f"Make sure media_common.py is in: {Path(__file__).parent.parent / 'lib'}")
     sys.exit(1)
 
-__version__ = "3.0.0"
+__version__ = "3.1.0"
 
 
 # =============================================================================
@@ -90,13 +92,10 @@ _quiet_mode = False
 
 SCRIPT_DIR = Path(__file__).parent.resolve()
 config_dir = SCRIPT_DIR / "configs"
-config_dir.mkdir(exist_ok=True)
-
-# Use media_common setup_logging
-log_file = setup_logging("scrubber", SCRIPT_DIR / "logs")
+log_dir = SCRIPT_DIR / "logs"
 log = logging.getLogger()
 
-def save_configuration(source: str, target: str, workers: int, dry_run: bool, keep_backups: bool, scrub_mode: str, fix_extensions: bool) -> str:
+def save_configuration(source: str, target: str, workers: Union[int, str], dry_run: bool, keep_backups: bool, scrub_mode: str, fix_extensions: bool) -> str:
     """Save run configuration to JSON file."""
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     config = {
@@ -110,9 +109,10 @@ def save_configuration(source: str, target: str, workers: int, dry_run: bool, ke
         "keep_backups": keep_backups,
         "scrub_mode": scrub_mode,
         "fix_extensions": fix_extensions,
-        "cpu_cores": mp.cpu_count()
+        "cpu_cores": available_cpus()
     }
     config_filename = f"scrubber_{timestamp}.json"
+    config_dir.mkdir(exist_ok=True)
     config_path = config_dir / config_filename
     with open(config_path, 'w', encoding='utf-8') as f:
         json.dump(config, f, indent=2)
@@ -138,7 +138,7 @@ def signal_handler(signum, frame):
 # =============================================================================
 
 def find_media_files(directory: str, scrub_mode: str = 'both') -> Tuple[List[Path], List[Path]]:
-    """Scan directory using os.walk with OOM protection.
+    """Scan directory using the shared media_common scanner (OOM protection).
 
     scrub_mode: 'embedded' (photos/videos only), 'xmp' (sidecars only), 'both' (all)
 
@@ -153,6 +153,7 @@ def find_media_files(directory: str, scrub_mode: str = 'both') -> Tuple[List[Pat
         print_phase("PHASE 1: Scanning Directory", f"Searching: {directory} ({mode_desc.get(scrub_mode, 'all files')})")
 
     base_path = Path(directory)
+    METRICS.start_phase("scan")
 
     # Determine which extensions to look for based on mode
     if scrub_mode == 'xmp':
@@ -169,23 +170,16 @@ def find_media_files(directory: str, scrub_mode: str = 'both') -> Tuple[List[Pat
     with tqdm(desc="  Scanning", unit=" files", disable=_quiet_mode,
               bar_format='{desc}: {n_fmt} found') as pbar:
 
-        for root, dirs, files in os.walk(base_path):
+        # Junk and hidden directories are pruned during the walk (OOM protection)
+        for entry in scan_media(base_path, target_photo_ext | target_video_ext, skip_hidden=True):
             if _shutdown_requested:
                 break
 
-            # Prune junk directories in-place (OOM protection)
-            dirs[:] = [d for d in dirs if d not in SKIP_DIRS and not d.startswith('.')]
-
-            for file in files:
-                fpath = Path(root) / file
-                ext = fpath.suffix.lower()
-
-                if ext in target_photo_ext:
-                    photo_files.append(fpath)
-                    pbar.update(1)
-                elif ext in target_video_ext:
-                    video_files.append(fpath)
-                    pbar.update(1)
+            if entry.ext in target_photo_ext:
+                photo_files.append(entry.to_path())
+            else:
+                video_files.append(entry.to_path())
+            pbar.update(1)
 
     if not _quiet_mode:
         if scrub_mode == 'xmp':
@@ -196,10 +190,11 @@ def find_media_files(directory: str, scrub_mode: str = 'both') -> Tuple[List[Pat
     return photo_files, video_files
 
 
-def copy_files(files: List[Path], source: Path, target: Path):
-    """Copy files to target directory preserving structure."""
+def copy_files(files: List[Path], source: Path, target: Path, catalog: Optional[MediaCatalog] = None):
+    """Copy files to target directory preserving structure (copies inherit their catalog records)."""
     if not _quiet_mode:
         print_phase("PHASE 2: Copying Files", f"Target: {target}")
+    METRICS.start_phase("copy")
 
     with tqdm(total=len(files), desc="  Copying", unit=" file", disable=_quiet_mode) as pbar:
         for f in files:
@@ -209,7 +204,18 @@ def copy_files(files: List[Path], source: Path, target: Path):
             rel_path = f.relative_to(source)
             dest = target / rel_path
             dest.parent.mkdir(parents=True, exist_ok=True)
-            shutil.copy2(f, dest)
+            THROTTLE.files()
+            with TRACE.span('copy', 'copy', file=str(f)):
+                shutil.copy2(f, dest)
+            if catalog:
+                dest_st = os.stat(dest)
+                size = dest_st.st_size
+                catalog.copy(f, os.stat(f), dest, dest_st)
+            else:
+                size = os.path.getsize(dest)
+            METRICS.inc('bytes_written', size)
+            THROTTLE.read(size)
+            THROTTLE.write(size)
             pbar.update(1)
 
 
@@ -229,8 +235,8 @@ def detect_file_types(files: List[Path]) -> dict:
 
     try:
         cmd = ['exiftool', '-FileType', '-j', '-q'] + [str(f) for f in files]
-        result = subprocess.run(cmd, capture_output=True, text=True,
-                               timeout=120, encoding='utf-8', errors='replace')
+        result = run_exiftool(cmd, len(files), capture_output=True, text=True,
+                              timeout=120, encoding='utf-8', errors='replace')
         if result.returncode == 0 and result.stdout:
             data = json.loads(result.stdout)
             return {Path(item.get('SourceFile', '')): item.get('FileType', '') for item in data}
@@ -239,22 +245,32 @@ def detect_file_types(files: List[Path]) -> dict:
     return {}
 
 
-def scrub_batch(files: List[Path], is_video: bool, dry_run: bool, keep_backups: bool, fix_extensions: bool = False) -> Tuple[int, int, int, int, int, List[str]]:
+def scrub_batch(files: List[Path], is_video: bool, dry_run: bool, keep_backups: bool, fix_extensions: bool = False,
+                known_types: Optional[Dict[str, str]] = None) -> Tuple[int, int, int, int, int, List[str], List[Tuple[str, str, str]]]:
     """
     Process a batch of files with ExifTool.
-    Detects actual file types to handle mismatched extensions correctly.
+    Detects actual file types to handle mismatched extensions correctly
+    (known_types: str(path) -> FileType already known from the media catalog).
     Optionally renames files to correct extensions.
-    Returns: (updated_count, unchanged_count, error_count, renamed_count, unsupported_count, error_msgs)
+    Returns: (updated_count, unchanged_count, error_count, renamed_count, unsupported_count, error_msgs,
+              file_types) where file_types lists (old path, final path, FileType) for the catalog
     """
     if not files:
-        return 0, 0, 0, 0, 0, []
+        return 0, 0, 0, 0, 0, [], []
 
     if dry_run:
-        return len(files), 0, 0, 0, 0, []
+        return len(files), 0, 0, 0, 0, [], []
+
+    with TRACE.span('scrub_batch', 'batch', files=len(files), first=str(files[0]), video=is_video):
+        return _scrub_batch(files, is_video, keep_backups, fix_extensions, known_types or {})
 
+
+def _scrub_batch(files: List[Path], is_video: bool, keep_backups: bool, fix_extensions: bool,
+                 known_types: Dict[str, str]) -> Tuple[int, int, int, int, int, List[str], List[Tuple[str, str, str]]]:
     try:
-        # Detect actual file types to handle mismatched extensions
-        type_map = detect_file_types(files)
+        # Detect actual file types to handle mismatched extensions (ExifTool only for unknown files)
+        type_map = {f: known_types[str(f)] for f in files if str(f) in known_types}
+        type_map.update(detect_file_types([f for f in files if f not in type_map]))
 
         # Split into actual photos vs actual videos based on FileType
         actual_photos = []
@@ -304,8 +320,8 @@ def scrub_batch(files: List[Path], is_video: bool, dry_run: bool, keep_backups:
             cmd = ['exiftool', '-XMP:All=', '-IPTC:All=', '-Photoshop:All=']
             cmd.append('-overwrite_original_in_place' if keep_backups else '-overwrite_original')
             cmd.extend([str(f) for f in actual_photos])
-            result = subprocess.run(cmd, capture_output=True, text=True,
-                                   timeout=600, encoding='utf-8', errors='replace')
+            result = run_exiftool(cmd, len(actual_photos), capture_output=True, text=True,
+                                  timeout=600, encoding='utf-8', errors='replace')
             total_updated += parse_exiftool_count(result.stdout, "image files updated")
             total_unchanged += parse_exiftool_count(result.stdout, "image files unchanged")
 
@@ -314,8 +330,8 @@ def scrub_batch(files: List[Path], is_video: bool, dry_run: bool, keep_backups:
             cmd = ['exiftool', '-XMP:All=']
             cmd.append('-overwrite_original_in_place' if keep_backups else '-overwrite_original')
             cmd.extend([str(f) for f in actual_videos])
-            result = subprocess.run(cmd, capture_output=True, text=True,
-                                   timeout=600, encoding='utf-8', errors='replace')
+            result = run_exiftool(cmd, len(actual_videos), capture_output=True, text=True,
+                                  timeout=600, encoding='utf-8', errors='replace')
             total_updated += parse_exiftool_count(result.stdout, "image files updated")
             total_unchanged += parse_exiftool_count(result.stdout, "image files unchanged")
 
@@ -326,30 +342,61 @@ def scrub_batch(files: List[Path], is_video: bool, dry_run: bool, keep_backups:
 
         # Rename files with wrong extensions (after scrubbing completes)
         total_renamed = 0
+        renamed = {}
         for old_path, new_path, actual_type in files_to_rename:
             try:
                 if old_path.exists() and not new_path.exists():
                     old_path.rename(new_path)
                     total_renamed += 1
+                    renamed[old_path] = new_path
                     logging.info(f"Renamed: {old_path.name} → {new_path.name} ({actual_type})")
             except Exception:
                 pass
 
-        return total_updated, total_unchanged, total_errors, total_renamed, total_unsupported, err_msgs
+        file_types = [(str(f), str(renamed.get(f, f)), t) for f, t in type_map.items() if t]
+        return total_updated, total_unchanged, total_errors, total_renamed, total_unsupported, err_msgs, file_types
 
     except subprocess.TimeoutExpired:
-        return 0, 0, len(files), 0, 0, ["Batch timeout (600s)"]
+        return 0, 0, len(files), 0, 0, ["Batch timeout (600s)"], []
     except Exception as e:
-        return 0, 0, len(files), 0, 0, [str(e)[:200]]
+        return 0, 0, len(files), 0, 0, [str(e)[:200]], []
 
 
-def run_scrubber(source: str, target: str, workers: int, dry_run: bool = False,
-                 keep_backups: bool = True, batch_size: int = 50, fix_extensions: bool = False,
-                 scrub_mode: str = 'both'):
-    """Main scrubbing workflow."""
-    src_path = Path(source)
-
-    # Save configuration and log startup
+def record_file_types(catalog: MediaCatalog, file_types: List[Tuple[str, str, str]]):
+    """Record FileTypes in the media catalog under each file's post-scrub identity and name."""
+    for old, new, file_type in file_types:
+        try:
+            st = os.stat(new)
+        except OSError:
+            continue
+        if new != old:
+            catalog.forget(old)
+        catalog.record(new, st, file_type=file_type)
+
+
+def run_scrubber(source: str, target: str, workers: Union[int, str, None] = None, dry_run: bool = False,
+                 keep_backups: bool = True, batch_size: Optional[int] = None, fix_extensions: bool = False,
+                 scrub_mode: str = 'both', storage: Optional[str] = None, io_order: Optional[str] = None,
+                 catalog: Optional[str] = None):
+    """Main scrubbing workflow.
+
+    Workers and batch sizes default to the storage profile of the directory
+    being rewritten (the target, or the source in place); `storage` forces
+    a profile by name. workers='auto' starts at the profile's count and
+    adapts it to the measured throughput while scrubbing. Files are copied
+    and batched in `io_order` (default: the profile's, physical on HDDs).
+    With a media `catalog` path, FileTypes it knows skip ExifTool detection
+    and scrubbed files are recorded under their new identity.
+    """
+    profile = storage_profile(target or source, storage)
+    limiter = worker_limiter("scrub_workers", workers, profile.workers)
+    workers = 'auto' if limiter.adaptive else limiter.limit
+    batch_size = batch_size or profile.photo_batch
+    if io_order in (None, 'auto'):
+        io_order = profile.io_order
+
+    # Save configuration and log startup (logging starts with the run, not at import)
+    log_file = setup_logging("scrubber", log_dir)
     config_filename = save_configuration(source, target, workers, dry_run, keep_backups, scrub_mode, fix_extensions)
     log.info(f"Fix extensions: {fix_extensions}")
     log.info(f"Scrub mode: {scrub_mode}")
@@ -357,10 +404,30 @@ def run_scrubber(source: str, target: str, workers: int, dry_run: bool = False,
     log.info(f"Config saved: configs/{config_filename}")
     log.info(f"Source: {source}")
     log.info(f"Target: {target or 'IN-PLACE'}")
-    log.info(f"Workers: {workers}")
+    log.info(f"Workers: {limiter.describe()}")
+    log.info(f"Storage: {profile.describe()} (batches: {batch_size} photos, {profile.video_batch} videos)")
+    log.info(f"Throttle: {THROTTLE.describe()}")
+    log.info(f"I/O order: {io_order}")
+    log.info(f"Catalog: {catalog or 'disabled'}")
+    catalog = MediaCatalog(Path(catalog)) if catalog else None
+    try:
+        _run_scrubber(source, target, dry_run, keep_backups, batch_size, fix_extensions, scrub_mode,
+                      profile, limiter, io_order, catalog)
+    finally:
+        if catalog:
+            catalog.close()
+
+
+def _run_scrubber(source: str, target: Optional[str], dry_run: bool, keep_backups: bool, batch_size: int,
+                  fix_extensions: bool, scrub_mode: str, profile, limiter, io_order: str,
+                  catalog: Optional[MediaCatalog]):
+    src_path = Path(source)
 
     # Phase 1: Scan
     photos, videos = find_media_files(source, scrub_mode)
+    if target:
+        photos = sort_for_io(photos, io_order)
+        videos = sort_for_io(videos, io_order)
     all_files = photos + videos
 
     if not all_files:
@@ -373,49 +440,66 @@ def run_scrubber(source: str, target: str, workers: int, dry_run: bool = False,
 
     if target:
         tgt_path = Path(target)
-        copy_files(all_files, src_path, tgt_path)
+        copy_files(all_files, src_path, tgt_path, catalog)
         # Re-map paths to target
         work_files = [tgt_path / f.relative_to(src_path) for f in all_files]
         phase_num = 3
 
     # Phase 3: Scrub
-    mode_str = "DRY RUN" if dry_run else f"Workers: {workers}"
+    mode_str = "DRY RUN" if dry_run else f"Workers: {limiter.describe()}"
     print_phase(f"PHASE {phase_num}: Scrubbing Metadata", mode_str)
+    METRICS.start_phase("scrub")
+
+    # FileTypes the catalog knows for unchanged files (no ExifTool detection for those)
+    known_types = {}
+    if catalog and not dry_run:
+        catalog.flush()  # Records of the copies made in Phase 2
+        known = catalog.lookup_many(work_files)
+        known_types = {path: record['file_type'] for path, record in known.items() if record['file_type']}
+        log.info(f"Catalog: {len(known_types):,} of {len(work_files):,} FileTypes known")
+
+    def batch_types(chunk):
+        return {str(f): known_types[str(f)] for f in chunk if str(f) in known_types}
 
     # Build batches
     chunks = []
 
-    # Photo batches
-    photo_work = work_files[:len(photos)]
+    # Photo batches (consecutive files in read order, so each ExifTool run sweeps one region)
+    photo_work = sort_for_io(work_files[:len(photos)], io_order)
     for i in range(0, len(photo_work), batch_size):
         chunk = photo_work[i:i + batch_size]
         if chunk:
-            chunks.append((chunk, False))  # False = photo
+            chunks.append((chunk, False, batch_types(chunk)))  # False = photo
 
     # Video batches (smaller batch size for stability)
-    video_work = work_files[len(photos):]
-    video_batch_size = 10
+    video_work = sort_for_io(work_files[len(photos):], io_order)
+    video_batch_size = min(batch_size, profile.video_batch)
     for i in range(0, len(video_work), video_batch_size):
         chunk = video_work[i:i + video_batch_size]
         if chunk:
-            chunks.append((chunk, True))  # True = video
+            chunks.append((chunk, True, batch_types(chunk)))  # True = video
 
     stats = {'updated': 0, 'unchanged': 0, 'errors': 0, 'renamed': 0, 'unsupported': 0}
     all_errors = []
 
-    with ProcessPoolExecutor(max_workers=workers) as pool:
-        futures = {
-            pool.submit(scrub_batch, c[0], c[1], dry_run, keep_backups, fix_extensions): c
-            for c in chunks
-        }
+    def submit(chunk):
+        # ExifTool reads and rewrites every file of the batch (dry runs touch no files)
+        THROTTLE.batch(chunk[0], read=not dry_run, write=not dry_run)
+        return pool.submit(run_with_metrics, scrub_batch, chunk[0], chunk[1], dry_run, keep_backups, fix_extensions,
+                           chunk[2])
+
+    with ProcessPoolExecutor(max_workers=limiter.maximum) as pool:
+        results = run_adaptive(submit, chunks, limiter, weight=lambda c: len(c[0]))
 
         with tqdm(total=len(work_files), desc="  Scrubbing", unit=" file", disable=_quiet_mode) as pbar:
-            for fut in as_completed(futures):
+            for _, fut in results:
                 if _shutdown_requested:
                     pool.shutdown(wait=False, cancel_futures=True)
                     break
 
-                up, un, err, ren, unsup, msgs = fut.result()
+                up, un, err, ren, unsup, msgs, file_types = merge_worker_metrics(fut.result())
+                if catalog:
+                    record_file_types(catalog, file_types)
                 stats['updated'] += up
                 stats['unchanged'] += un
                 stats['errors'] += err
@@ -456,6 +540,10 @@ def run_scrubber(source: str, target: str, workers: int, dry_run: bool = False,
     # Log final stats
     log.info(f"COMPLETE: {stats['updated']:,} scrubbed, {stats['unchanged']:,} unchanged, {stats['renamed']:,} renamed, {stats['unsupported']:,} unsupported, {stats['errors']:,} errors")
 
+    METRICS.finish()
+    if not _quiet_mode:
+        METRICS.print_summary()
+
     if not dry_run and not _shutdown_requested:
         print()
         print_success("Mission Complete.")
@@ -473,7 +561,7 @@ def main_interactive():
 
     print(f"\n{Fore.MAGENTA}{Style.BRIGHT}Metadata Scrubber Pro v{__version__}{Style.RESET_ALL}")
     print(f"{Fore.WHITE}Removes edit history & PII. Keeps EXIF & Video GPS.{Style.RESET_ALL}")
-    print(f"{Fore.WHITE}Detected {mp.cpu_count()} CPU cores{Style.RESET_ALL}\n")
+    print(f"{Fore.WHITE}Detected {available_cpus()} CPU cores{Style.RESET_ALL}\n")
 
     # 1. Source
     while True:
@@ -536,7 +624,8 @@ def main_interactive():
 
     # Run
     print()
-    run_scrubber(src, target, workers, dry_run=dry_run, keep_backups=True, fix_extensions=fix_ext, scrub_mode=scrub_mode)
+    run_scrubber(src, target, workers, dry_run=dry_run, keep_backups=True, fix_extensions=fix_ext, scrub_mode=scrub_mode,
+                 catalog=str(default_catalog_path()))
 
 
 def main():
@@ -549,18 +638,63 @@ def main():
     parser.add_argument("--target", help="Target directory (copy mode)")
     parser.add_argument("--in-place", action="store_true", help="Modify source files directly")
     parser.add_argument("--dry-run", action="store_true", help="Simulate only")
-    parser.add_argument("--workers", type=int, help="Parallel workers")
+    parser.add_argument("--workers", type=parse_workers,
+                        help="Parallel workers, or 'auto' to tune the count while running (default: from the storage profile)")
+    parser.add_argument("--storage-profile", default="auto", metavar="NAME",
+                        help="Tuning profile for workers and batch sizes: auto (detect from the mount), "
+                             "nvme, ssd, hdd, network, default or one from configs/storage_profiles.json")
+    parser.add_argument("--io-order", choices=('auto',) + IO_ORDERS, default="auto",
+                        help="Order files are copied and batched in: walk, inode or physical (FIEMAP); "
+                             "auto follows the storage profile (physical on hdd)")
     parser.add_argument("--quiet", action="store_true", help="Suppress output")
     parser.add_argument("--no-backups", action="store_true", help="Don't create .original files")
     parser.add_argument("--fix-extensions", action="store_true", help="Rename files with wrong extensions")
     parser.add_argument("--scrub-mode", choices=['embedded', 'xmp', 'both'], default='both',
                         help="What to scrub: embedded (photos/videos), xmp (sidecars), both (default)")
+    parser.add_argument("--max-read-mb", type=float, metavar="MB_S",
+                        help="Cap on bytes read by copies and scrubbing per second (MB/s)")
+    parser.add_argument("--max-write-mb", type=float, metavar="MB_S",
+                        help="Cap on bytes written by copies and scrubbing per second (MB/s)")
+    parser.add_argument("--max-files", type=float, metavar="N",
+                        help="Cap on files copied or handed to ExifTool per second")
+    parser.add_argument("--throttle-schedule", metavar="PATH",
+                        help="JSON schedule of time windows with their own caps, e.g. unthrottled 01:00-06:00")
+    parser.add_argument("--nice", type=int, help="CPU nice level for this run and its ExifTool processes (e.g. 10)")
+    parser.add_argument("--idle-io", action="store_true",
+                        help="Idle I/O priority (Linux): only use the disks when nothing else does")
+    parser.add_argument("--catalog", default=str(default_catalog_path()), metavar="PATH",
+                        help="Media catalog shared by all tools; known FileTypes skip ExifTool detection "
+                             "(default: cache/catalog.db in the tools folder, or $MEDIA_TOOLS_CATALOG)")
+    parser.add_argument("--no-catalog", dest="catalog", action="store_const", const=None,
+                        help="Neither read nor update the media catalog")
+    parser.add_argument("--metrics", metavar="PATH",
+                        help="Write per-phase metrics at exit (.prom = Prometheus textfile, else JSON)")
+    parser.add_argument("--trace", metavar="PATH",
+                        help="Write a Chrome trace-event timeline of batches and ExifTool runs (open in ui.perfetto.dev)")
 
     args = parser.parse_args()
 
     global _quiet_mode
     _quiet_mode = args.quiet
 
+    if args.metrics:
+        METRICS.export_at_exit(args.metrics, "scrubber")
+    if args.trace:
+        TRACE.save_at_exit(args.trace, "scrubber")
+
+    if args.storage_profile != 'auto' and args.storage_profile not in storage_profile_names():
+        parser.error(f"unknown storage profile '{args.storage_profile}' "
+                     f"(available: auto, {', '.join(storage_profile_names())})")
+
+    if any(v is not None and v <= 0 for v in (args.max_read_mb, args.max_write_mb, args.max_files)):
+        parser.error("--max-read-mb, --max-write-mb and --max-files must be positive")
+    try:
+        schedule = load_throttle_schedule(args.throttle_schedule) if args.throttle_schedule else None
+    except ValueError as e:
+        parser.error(str(e))
+    THROTTLE.configure(args.max_read_mb, args.max_write_mb, args.max_files, schedule)
+    set_process_priority(args.nice, args.idle_io)
+
     # Check ExifTool
     if not check_exiftool():
         print("ERROR: ExifTool not found in PATH.")
@@ -574,20 +708,23 @@ def main():
             print("\nCancelled.")
     else:
         # CLI mode
-        workers = args.workers or get_optimal_workers()
+        workers = args.workers
 
         scrub_mode = args.scrub_mode.replace('-', '_')  # Handle 'xmp' vs potential 'xmp-sidecar'
         if args.target:
             run_scrubber(args.source, args.target, workers, args.dry_run, not args.no_backups,
-                        fix_extensions=args.fix_extensions, scrub_mode=scrub_mode)
+                        fix_extensions=args.fix_extensions, scrub_mode=scrub_mode,
+                        storage=args.storage_profile, io_order=args.io_order, catalog=args.catalog)
         elif args.in_place:
             run_scrubber(args.source, None, workers, args.dry_run, not args.no_backups,
-                        fix_extensions=args.fix_extensions, scrub_mode=scrub_mode)
+                        fix_extensions=args.fix_extensions, scrub_mode=scrub_mode,
+                        storage=args.storage_profile, io_order=args.io_order, catalog=args.catalog)
         else:
             # Default: create 'cleaned' subfolder
             tgt = str(Path(args.source) / "cleaned")
             run_scrubber(args.source, tgt, workers, args.dry_run, not args.no_backups,
-                        fix_extensions=args.fix_extensions, scrub_mode=scrub_mode)
+                        fix_extensions=args.fix_extensions, scrub_mode=scrub_mode,
+                        storage=args.storage_profile, io_order=args.io_order, catalog=args.catalog)
 
 
 if __name__ == "__main__":
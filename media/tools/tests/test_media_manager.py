@@ -0,0 +1,157 @@
+"""
+Tests for media-manager duplicate grouping, collision handling and resume.
+
+Run from media/tools:
+    python -m pytest -q tests
+"""
+
+import importlib.util
+import json
+import os
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+TOOLS_DIR = Path(__file__).resolve().parent.parent
+
+spec = importlib.util.spec_from_file_location("media_manager", TOOLS_DIR / "media-manager.py")
+media_manager = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(media_manager)
+MediaEngine = media_manager.MediaEngine
+MediaFile = media_manager.MediaFile
+ActionJournal = media_manager.ActionJournal
+ScanEntry = media_manager.ScanEntry
+
+
+def resume_engine(tmp_path, action):
+    """An engine with just the state _reconcile() uses (no logging setup)."""
+    engine = MediaEngine.__new__(MediaEngine)
+    engine.args = SimpleNamespace(action=action)
+    engine.device_cache = {}
+    engine.journal = ActionJournal(tmp_path / "journal.jsonl")
+    return engine
+
+
+def grouping_engine(mode, dedupe_method):
+    """An engine with just the state Phase 2 hashing and Phase 3 grouping use."""
+    engine = MediaEngine.__new__(MediaEngine)
+    engine.args = SimpleNamespace(mode=mode, rename=False, dedupe_method=dedupe_method,
+                                  hash_algorithm=media_manager.DEFAULT_HASH_ALGORITHM,
+                                  rehash=False, tree_hash=False, tree_chunk_mb=64)
+    engine.hash_cache = None
+    engine.catalog = None
+    engine.hash_limiter = media_manager.worker_limiter("hash_workers", None, 2)
+    engine.source_storage = SimpleNamespace(read_chunk=1024 * 1024)
+    engine.io_order = 'walk'
+    return engine
+
+
+def path_groups(groups):
+    return sorted(sorted(f.name for f in group) for group in groups)
+
+
+def journal_types(engine):
+    engine.journal.close()
+    return [json.loads(line)['t'] for line in engine.journal.path.read_text().splitlines()]
+
+
+def test_same_entry_exact_name(tmp_path):
+    src = tmp_path / "IMG_0001.jpg"
+    src.write_bytes(b"photo")
+
+    assert MediaEngine._is_same_entry(tmp_path / "IMG_0001.jpg", src)
+
+
+def test_same_entry_rejects_other_file_differing_in_case(tmp_path):
+    src = tmp_path / "img_0001.jpg"
+    other = tmp_path / "IMG_0001.jpg"
+    src.write_bytes(b"photo")
+    other.write_bytes(b"another photo")
+    if src.samefile(other):
+        return  # Case-insensitive filesystem: both names are one file
+
+    assert not MediaEngine._is_same_entry(other, src)
+
+
+def test_same_entry_case_change_to_free_name(tmp_path):
+    src = tmp_path / "img_0001.jpg"
+    src.write_bytes(b"photo")
+    dest = tmp_path / "IMG_0001.jpg"
+
+    # Same file only where the filesystem folds case
+    assert MediaEngine._is_same_entry(dest, src) == dest.exists()
+
+
+def test_resume_case_only_move_is_done(tmp_path):
+    # On a case-insensitive destination IMG_0001.JPG and IMG_0001.jpg name one
+    # file; a second hardlinked name reproduces that on any filesystem
+    src = tmp_path / "IMG_0001.JPG"
+    dst = tmp_path / "IMG_0001.jpg"
+    src.write_bytes(b"photo")
+    os.link(src, dst)
+    engine = resume_engine(tmp_path, 'move')
+
+    assert engine._reconcile({'id': 1, 'src': str(src), 'dst': str(dst)}) is None
+
+    assert dst.read_bytes() == b"photo"
+    assert journal_types(engine) == ['done']
+
+
+def test_resume_removes_partial_copy(tmp_path):
+    src = tmp_path / "IMG_0001.jpg"
+    dst = tmp_path / "out" / "IMG_0001.jpg"
+    src.write_bytes(b"photo")
+    dst.parent.mkdir()
+    dst.write_bytes(b"ph")
+    engine = resume_engine(tmp_path, 'copy')
+
+    action = engine._reconcile({'id': 1, 'src': str(src), 'dst': str(dst)})
+
+    assert action.dest_path == dst
+    assert not dst.exists()
+    assert journal_types(engine) == []
+
+
+@pytest.mark.parametrize("mode, unreadable", [
+    ('deduplicate', {"bad.jpg"}),
+    ('rename', {"bad.jpg", "lonely_bad.jpg"}),  # Renaming reads every inode
+])
+def test_staged_groups_match_full_with_unreadable_file(tmp_path, monkeypatch, mode, unreadable):
+    size = 1024 * 1024
+    photo = os.urandom(size)
+    contents = {
+        "a.jpg": photo,
+        "a_copy.jpg": photo,
+        "bad.jpg": photo,
+        "other.jpg": os.urandom(size),
+        "lonely.jpg": os.urandom(size // 2),
+        "lonely_bad.jpg": os.urandom(size // 3),
+    }
+    for name, data in contents.items():
+        (tmp_path / name).write_bytes(data)
+    os.link(tmp_path / "a.jpg", tmp_path / "a_link.jpg")
+
+    def failing(method):
+        def read(self, *args, **kwargs):
+            if self.name in unreadable:
+                raise OSError(5, "Input/output error")
+            return method(self, *args, **kwargs)
+        return read
+    monkeypatch.setattr(MediaFile, "sample_hash", failing(MediaFile.sample_hash))
+    monkeypatch.setattr(MediaFile, "compute_hash", failing(MediaFile.compute_hash))
+
+    paths = sorted(tmp_path.iterdir())
+    full = grouping_engine(mode, 'full')
+    full.files = [mf for p in paths
+                  if (mf := full._hash_stage((ScanEntry(str(p), p.name, p.suffix, p.stat()), None, None)))]
+    staged = grouping_engine(mode, 'staged')
+    staged.files = [MediaFile(p) for p in paths]
+
+    staged_groups = staged._group_staged()
+
+    assert path_groups(staged_groups) == path_groups(full._group_by_hash())
+    assert sorted(f.name for f in staged.files) == sorted(f.name for f in full.files)
+    assert not {f.name for f in staged.files} & unreadable
+    if mode == 'rename':
+        assert all(f.digest for f in staged.files)
@@ -0,0 +1,53 @@
+"""
+Tests for media_common file transfers.
+
+Run from media/tools:
+    python -m pytest -q tests
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+TOOLS_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(TOOLS_DIR / "lib"))
+
+from media_common import reflink_file, transfer_file  # noqa: E402
+
+
+@pytest.mark.skipif(not sys.platform.startswith('linux'), reason="reflink is Linux only")
+def test_reflink_keeps_existing_destination(tmp_path):
+    src = tmp_path / "IMG_0001.xmp"
+    dst = tmp_path / "2024-01-01_120000.xmp"
+    src.write_bytes(b"new sidecar")
+    dst.write_bytes(b"existing sidecar")
+
+    with pytest.raises(FileExistsError):
+        reflink_file(src, dst)
+
+    assert dst.read_bytes() == b"existing sidecar"
+
+
+@pytest.mark.parametrize("action", ['copy', 'reflink', 'auto', 'hardlink'])
+def test_transfer_keeps_existing_destination(tmp_path, action):
+    src = tmp_path / "IMG_0001.xmp"
+    dst = tmp_path / "2024-01-01_120000.xmp"
+    src.write_bytes(b"new sidecar")
+    dst.write_bytes(b"existing sidecar")
+
+    with pytest.raises(FileExistsError):
+        transfer_file(src, dst, action)
+
+    assert dst.read_bytes() == b"existing sidecar"
+    assert src.read_bytes() == b"new sidecar"
+
+
+def test_transfer_copies_to_new_destination(tmp_path):
+    src = tmp_path / "IMG_0001.jpg"
+    dst = tmp_path / "2024-01-01_120000.jpg"
+    src.write_bytes(b"photo" * 1000)
+
+    transfer_file(src, dst, 'copy')
+
+    assert dst.read_bytes() == src.read_bytes()
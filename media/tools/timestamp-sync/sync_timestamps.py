@@ -17,72 +17,84 @@ Date: 2025-11-21
 import os
 import sys
 import json
-import subprocess
 import argparse
-from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
 from pathlib import Path
 
 # Import shared library
 sys.path.append(str(Path(__file__).parent.parent))
 from lib.media_common import (
-    get_exiftool_path, ALL_MEDIA_EXTENSIONS, check_dependencies,
+    get_exiftool_path, get_exiftool_version, get_exiftool_pool, scan_media, ExifToolTimeout,
+    ALL_MEDIA_EXTENSIONS, check_dependencies,
     print_phase, print_success, print_warning, print_error,
-    setup_logging
+    setup_logging, run_exiftool, METRICS, storage_profile, storage_profile_names, parse_exif_date,
+    MediaCatalog, catalog_dates, default_catalog_path
 )
 
-def get_all_metadata(directory, recursive=True):
-    """Reads metadata for ALL files in directory in one massive batch."""
-    print(f"Reading metadata from: {directory}")
-    if recursive:
-        print("  (Recursive scan enabled)")
+EPOCH = datetime(1970, 1, 1)
 
-    exiftool_exe = get_exiftool_path()
+# Includes every CATALOG_DATE_TAGS tag, so what is read can be recorded in the media catalog
+DATE_TAGS = ["-DateTimeOriginal", "-CreateDate", "-ModifyDate", "-MediaCreateDate",
+             "-QuickTime:CreationDate", "-FileModifyDate"]
 
-    # Dynamic extension filters from shared library
-    ext_args = []
-    for ext in ALL_MEDIA_EXTENSIONS:
-        clean_ext = ext.lstrip('.')
-        ext_args.extend(["-ext", clean_ext])
-
-    cmd = [
-        exiftool_exe,
-        "-json",
-        "-DateTimeOriginal",
-        "-CreateDate",
-        "-ModifyDate",
-        "-MediaCreateDate",
-        "-FileModifyDate",
-    ] + ext_args
+def get_all_metadata(directory, recursive=True, storage=None, catalog=None):
+    """
+    Reads metadata for ALL media files in directory.
+
+    The tree is walked once with the shared scanner (SKIP_DIRS pruned) and
+    dates are read in batches on the persistent ExifTool pool. Batch size and
+    pool size come from the directory's storage profile (`storage` forces one).
+    With a media catalog, files it knows unchanged (from any tool's run)
+    are not read again, and the dates of the others are recorded.
 
+    Returns: list of (metadata_dict, stat_result) tuples
+    """
+    print(f"Reading metadata from: {directory}")
     if recursive:
-        cmd.append("-r")
+        print("  (Recursive scan enabled)")
+
+    entries = list(scan_media(directory, ALL_MEDIA_EXTENSIONS, recursive=recursive))
+    if not entries:
+        print("No metadata found.")
+        return []
 
-    cmd.append(directory)
+    metadata = []
+    if catalog:
+        known = catalog.lookup_many([e.path for e in entries], [e.stat for e in entries])
+        to_read = []
+        for entry in entries:
+            record = known.get(entry.path)
+            if record and record['dates'] is not None:
+                metadata.append((ungroup_tags({"SourceFile": entry.path, **record['dates']}), entry.stat))
+            else:
+                to_read.append(entry)
+        print(f"  Catalog: {len(metadata)} unchanged files, {len(to_read)} to read")
+        entries = to_read
+        if not entries:
+            return metadata
+
+    profile = storage_profile(directory, storage)
+    batch_size = profile.metadata_batch
+    batches = [entries[i:i + batch_size] for i in range(0, len(entries), batch_size)]
+    print(f"Reading {len(entries)} files in {len(batches)} batches (persistent ExifTool pool)...")
+    print(f"  Storage: {profile.describe()}")
+
+    pool = get_exiftool_pool(profile.workers)
+    args = ["-json", "-G"] + DATE_TAGS  # Grouped keys are what the catalog keeps
+
+    def read_batch(batch):
+        return pool.get_metadata_batch([e.path for e in batch], args, timeout=600)
 
     try:
-        print(f"Executing: {' '.join(cmd[:5])}... (batch mode)")
-        result = subprocess.run(
-            cmd,
-            capture_output=True,
-            text=True,
-            encoding='utf-8',
-            errors='ignore',
-            timeout=600  # 10 minute timeout for very large directories
-        )
-
-        if result.returncode != 0:
-            print(f"ExifTool warning/error: {result.stderr}", file=sys.stderr)
-            # Continue anyway, ExifTool often returns non-zero for warnings
-
-        if not result.stdout.strip():
-            print("No metadata found.")
-            return []
-
-        metadata = json.loads(result.stdout)
-        print(f"✓ Read metadata for {len(metadata)} files")
-        return metadata
-
-    except subprocess.TimeoutExpired:
+        with ThreadPoolExecutor(max_workers=pool.size) as ex:
+            for batch, items in zip(batches, ex.map(read_batch, batches)):
+                for entry, item in zip(batch, items):
+                    if item:
+                        metadata.append((ungroup_tags(item), entry.stat))
+                        if catalog:
+                            catalog.record(entry.path, entry.stat, dates=catalog_dates(item))
+    except ExifToolTimeout:
         print("Error: ExifTool timed out. Directory too large or ExifTool hung.", file=sys.stderr)
         return []
     except json.JSONDecodeError as e:
@@ -92,17 +104,19 @@ def get_all_metadata(directory, recursive=True):
         print(f"Error executing ExifTool: {e}", file=sys.stderr)
         return []
 
-def parse_date(date_str):
-    """Parses ExifTool date format YYYY:MM:DD HH:MM:SS"""
-    if not date_str:
-        return None
+    print(f"✓ Read metadata for {len(metadata)} files")
+    return metadata
 
-    try:
-        # Handle subseconds and timezone info
-        clean_str = date_str.split('.')[0].split('+')[0].split('-')[0].strip()
-        return datetime.strptime(clean_str, "%Y:%m:%d %H:%M:%S")
-    except ValueError:
+def ungroup_tags(item):
+    """Drops the -G group prefixes (the same record ExifTool returns without -G)"""
+    return {key.partition(":")[2] or key: value for key, value in item.items()}
+
+def parse_date(date_str):
+    """Parses ExifTool date format YYYY:MM:DD HH:MM:SS (sub-seconds and offsets ignored)"""
+    parsed = parse_exif_date(date_str)
+    if parsed is None:
         return None
+    return EPOCH + timedelta(seconds=parsed[0])
 
 def is_suspicious(dt):
     """
@@ -111,15 +125,15 @@ def is_suspicious(dt):
     """
     return (dt.hour == 0 and dt.minute == 0 and dt.second == 0)
 
-def process_file(item, dry_run, verbose=False):
+def process_file(item, dry_run, verbose=False, stat=None):
     """
     Analyzes a single file's dates and determines needed updates.
 
+    stat: stat result from the scan (avoids a second stat call)
+
     Returns: (path, target_date_str) if EXIF update needed, None otherwise
     """
     path = Path(item.get("SourceFile"))
-    if not path.exists():
-        return None
 
     # 1. Gather EXIF Dates
     exif_dates = []
@@ -131,7 +145,8 @@ def process_file(item, dry_run, verbose=False):
 
     # 2. Get File System Dates
     try:
-        stat = path.stat()
+        if stat is None:
+            stat = path.stat()
         fs_dates = [
             datetime.fromtimestamp(stat.st_mtime),
             datetime.fromtimestamp(stat.st_ctime)
@@ -181,6 +196,27 @@ def process_file(item, dry_run, verbose=False):
 
     return None
 
+def update_catalog(catalog, metadata_list, exif_updates):
+    """
+    Brings the media catalog up to date after a sync.
+
+    Files ExifTool rewrote are dropped (their content changed, so the next
+    run reads them again); files that only got new file system timestamps
+    keep their record under the new mtime.
+    """
+    rewritten = {path for path, _ in exif_updates}
+    for item, stat in metadata_list:
+        path = str(Path(item.get("SourceFile")))
+        if path in rewritten:
+            catalog.forget(path)
+            continue
+        try:
+            st = os.stat(path)
+        except OSError:
+            continue
+        if st.st_mtime_ns != stat.st_mtime_ns:
+            catalog.restat(path, st)
+
 def batch_update_exif(updates, dry_run=False):
     """
     Writes EXIF updates in a single batch operation using ExifTool argfile.
@@ -220,7 +256,7 @@ def batch_update_exif(updates, dry_run=False):
 
         # Run ExifTool with argument file
         cmd = [exiftool_exe, "-@", arg_file]
-        result = subprocess.run(cmd, capture_output=True, text=True)
+        result = run_exiftool(cmd, count, capture_output=True, text=True)
 
         if result.returncode == 0:
             print(f"✓ Successfully updated {count} files")
@@ -252,23 +288,38 @@ Examples:
     parser.add_argument("--dry-run", action="store_true", help="Preview changes without modifying files")
     parser.add_argument("--no-recursive", action="store_true", help="Don't process subdirectories")
     parser.add_argument("--verbose", action="store_true", help="Show detailed per-file updates")
+    parser.add_argument("--storage-profile", default="auto", metavar="NAME",
+                        help="Tuning profile for ExifTool processes and batch sizes: auto (detect from the mount), "
+                             "nvme, ssd, hdd, network, default or one from configs/storage_profiles.json")
+    parser.add_argument("--catalog", default=str(default_catalog_path()), metavar="PATH",
+                        help="Media catalog shared by all tools; unchanged files it knows are not read again "
+                             "(default: cache/catalog.db in the tools folder, or $MEDIA_TOOLS_CATALOG)")
+    parser.add_argument("--no-catalog", dest="catalog", action="store_const", const=None,
+                        help="Neither read nor update the media catalog")
+    parser.add_argument("--metrics", metavar="PATH",
+                        help="Write per-phase metrics at exit (.prom = Prometheus textfile, else JSON)")
 
     args = parser.parse_args()
 
+    if args.storage_profile != "auto" and args.storage_profile not in storage_profile_names():
+        parser.error(f"unknown storage profile '{args.storage_profile}' "
+                     f"(available: auto, {', '.join(storage_profile_names())})")
+
+    if args.metrics:
+        METRICS.export_at_exit(args.metrics, "timestamp_sync")
+
     # Validate directory
     if not os.path.isdir(args.directory):
         print(f"Error: '{args.directory}' is not a valid directory", file=sys.stderr)
         sys.exit(1)
 
-    # Check ExifTool availability
-    exiftool_exe = get_exiftool_path()
-    try:
-        result = subprocess.run([exiftool_exe, "-ver"], capture_output=True, text=True, timeout=5)
-        print(f"Using ExifTool version: {result.stdout.strip()}")
-    except Exception:
-        print(f"Error: ExifTool not found at: {exiftool_exe}", file=sys.stderr)
+    # Check ExifTool availability (path and version are cached between runs)
+    exiftool_version = get_exiftool_version()
+    if exiftool_version is None:
+        print(f"Error: ExifTool not found at: {get_exiftool_path()}", file=sys.stderr)
         print("Please install ExifTool or update EXIFTOOL path in script", file=sys.stderr)
         sys.exit(1)
+    print(f"Using ExifTool version: {exiftool_version}")
 
     print("=" * 60)
     print("Bidirectional Timestamp Sync (Optimized)")
@@ -277,20 +328,26 @@ Examples:
     # 1. Batch Read All Metadata
     start_time = datetime.now()
     recursive = not args.no_recursive
-    metadata_list = get_all_metadata(args.directory, recursive=recursive)
+    METRICS.start_phase("read")
+    catalog = MediaCatalog(Path(args.catalog)) if args.catalog else None
+    metadata_list = get_all_metadata(args.directory, recursive=recursive, storage=args.storage_profile,
+                                     catalog=catalog)
 
     if not metadata_list:
+        if catalog:
+            catalog.close()
         print("No files found or metadata could not be read.")
         sys.exit(0)
 
     print(f"\nAnalyzing {len(metadata_list)} files...")
+    METRICS.start_phase("analyze")
 
     # 2. Process Logic In-Memory
     exif_updates = []
     fs_update_count = 0
 
-    for item in metadata_list:
-        result = process_file(item, args.dry_run, args.verbose)
+    for item, stat in metadata_list:
+        result = process_file(item, args.dry_run, args.verbose, stat)
         if result:
             exif_updates.append(result)
 
@@ -300,7 +357,13 @@ Examples:
 
     # 3. Batch Write EXIF Updates
     if exif_updates:
+        METRICS.start_phase("write")
         batch_update_exif(exif_updates, args.dry_run)
+    if catalog:
+        if not args.dry_run:
+            update_catalog(catalog, metadata_list, exif_updates)
+        catalog.close()
+    METRICS.finish()
 
     # Summary
     end_time = datetime.now()
@@ -316,6 +379,8 @@ Examples:
         print(f"Avg per file:     {(duration / len(metadata_list) * 1000):.2f} ms")
     print("=" * 60)
 
+    METRICS.print_summary()
+
     if args.dry_run:
         print("\n[Dry Run] No changes were made. Run without --dry-run to apply updates.")
 
@@ -27,42 +27,36 @@ __license__ = "MIT"
 
 import os
 import sys
-import shutil
 import subprocess
 import signal
 import logging
 import json
 import multiprocessing as mp
 from pathlib import Path
-from concurrent.futures import ProcessPoolExecutor, as_completed
-from typing import List, Tuple
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Set, Tuple, Union
 import argparse
 from datetime import datetime
 import re
+from collections import Counter
 
 # Import shared library
 sys.path.append(str(Path(__file__).parent.parent))
 from lib.media_common import (
-    PHOTO_EXTENSIONS, VIDEO_EXTENSIONS, SKIP_DIRS,
-    WORKER_PROFILES, get_optimal_workers,
-    print_phase, print_success, print_error, print_warning
+    PHOTO_EXTENSIONS, VIDEO_EXTENSIONS, scan_media,
+    WORKER_PROFILES, storage_profile, storage_profile_names,
+    worker_limiter, run_adaptive, parse_workers, available_cpus,
+    THROTTLE, load_throttle_schedule, set_process_priority, sort_for_io, IO_ORDERS,
+    print_phase, print_success, print_error, print_warning, print_info,
+    setup_logging, run_exiftool, METRICS, TRACE, run_with_metrics, merge_worker_metrics,
+    check_exiftool, tqdm, module_available, Fore, Style,
+    MediaCatalog, default_catalog_path
 )
 
-try:
-    from tqdm import tqdm
-except ImportError:
+if not module_available('tqdm'):
     print("ERROR: tqdm not installed. Run: pip install tqdm colorama")
     sys.exit(1)
 
-try:
-    from colorama import init, Fore, Style
-    init(autoreset=True)
-except ImportError:
-    class Fore:
-        GREEN = RED = YELLOW = CYAN = MAGENTA = BLUE = WHITE = ''
-    class Style:
-        BRIGHT = RESET_ALL = ''
-
 # Global flags
 _shutdown_requested = False
 _quiet_mode = False
@@ -72,32 +66,13 @@ _quiet_mode = False
 # =============================================================================
 
 SCRIPT_DIR = Path(__file__).parent.resolve()
-log_dir = SCRIPT_DIR / "logs"
-log_dir.mkdir(exist_ok=True)
 config_dir = SCRIPT_DIR / "configs"
-config_dir.mkdir(exist_ok=True)
-
-timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-log_file = log_dir / f"sidecar_{timestamp}.log"
-
-class FlushingFileHandler(logging.FileHandler):
-    def emit(self, record):
-        super().emit(record)
-        self.flush()
-
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s | %(levelname)-7s | %(message)s',
-    datefmt='%Y-%m-%d %H:%M:%S',
-    handlers=[
-        FlushingFileHandler(log_file, encoding="utf-8", mode='w'),
-        logging.StreamHandler()
-    ]
-)
+log_dir = SCRIPT_DIR / "logs"
 log = logging.getLogger()
 
-def save_configuration(directory: str, workers: int, batch_size: int, skip_existing: bool, dry_run: bool, naming: str) -> str:
+def save_configuration(directory: str, workers: Union[int, str], batch_size: int, skip_existing: bool, dry_run: bool, naming: str) -> str:
     """Save run configuration to JSON file."""
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     config = {
         "timestamp": datetime.now().isoformat(),
         "version": __version__,
@@ -107,9 +82,10 @@ def save_configuration(directory: str, workers: int, batch_size: int, skip_exist
         "skip_existing": skip_existing,
         "dry_run": dry_run,
         "naming_convention": naming,
-        "cpu_cores": mp.cpu_count()
+        "cpu_cores": available_cpus()
     }
     config_filename = f"sidecar_{timestamp}.json"
+    config_dir.mkdir(exist_ok=True)
     config_path = config_dir / config_filename
     with open(config_path, 'w', encoding='utf-8') as f:
         json.dump(config, f, indent=2)
@@ -143,49 +119,46 @@ def find_media_files(directory: str, verbose: bool = True) -> Tuple[List[Path],
     with tqdm(desc="  Scanning", unit=" files", disable=_quiet_mode,
               bar_format='{desc}: {n_fmt} found') as pbar:
 
-        for root, dirs, files in os.walk(directory):
+        # OOM Protection: junk and hidden directories are pruned during the walk
+        for entry in scan_media(directory, PHOTO_EXTENSIONS | VIDEO_EXTENSIONS, skip_hidden=True):
             if _shutdown_requested: break
 
-            # OOM Protection: Prune junk directories in-place
-            dirs[:] = [d for d in dirs if d not in SKIP_DIRS and not d.startswith('.')]
-
-            for file in files:
-                file_path = Path(root) / file
-                ext = file_path.suffix.lower()
-
-                if ext in PHOTO_EXTENSIONS:
-                    photo_files.append(file_path)
-                    pbar.update(1)
-                elif ext in VIDEO_EXTENSIONS:
-                    video_files.append(file_path)
-                    pbar.update(1)
+            if entry.ext in PHOTO_EXTENSIONS:
+                photo_files.append(entry.to_path())
+            else:
+                video_files.append(entry.to_path())
+            pbar.update(1)
 
     if verbose:
         print_success(f"Found {len(photo_files):,} photos and {len(video_files):,} videos")
 
     return photo_files, video_files
 
+def sidecar_path(file: Path, naming: str = 'adobe') -> Path:
+    """Sidecar path for a media file under a naming convention."""
+    if naming == 'ext':
+        # file.ext.xmp (e.g. image.jpg.xmp)
+        return file.parent / f"{file.name}.xmp"
+    # file.xmp (e.g. image.xmp) - Adobe standard
+    return file.with_suffix('.xmp')
+
 def export_metadata_batch(files: List[Path], skip_existing: bool = False,
-                          dry_run: bool = False, naming: str = 'adobe') -> Tuple[int, int, int, int, List[str]]:
+                          dry_run: bool = False, naming: str = 'adobe') -> Tuple[int, int, int, int, List[str], List[str]]:
     """
     Export metadata for a batch of files.
     naming: 'adobe' (file.xmp) or 'ext' (file.ext.xmp)
-    Returns: (success, skipped, no_data, errors, error_messages)
+    Returns: (success, skipped, no_data, errors, error_messages, exported)
+    where exported lists the files whose sidecar was written
     """
     if not files or _shutdown_requested:
-        return 0, 0, 0, 0, []
+        return 0, 0, 0, 0, [], []
 
     skipped_count = 0
     files_to_process = []
+    stale = set()  # Sidecars that could not be removed (not written by this run)
 
     for file in files:
-        # Determine sidecar path based on naming convention
-        if naming == 'ext':
-            # file.ext.xmp (e.g. image.jpg.xmp)
-            sidecar = file.parent / f"{file.name}.xmp"
-        else:
-            # file.xmp (e.g. image.xmp) - Adobe standard
-            sidecar = file.with_suffix('.xmp')
+        sidecar = sidecar_path(file, naming)
 
         if sidecar.exists():
             if skip_existing:
@@ -196,15 +169,24 @@ def export_metadata_batch(files: List[Path], skip_existing: bool = False,
                 try:
                     sidecar.unlink()
                 except Exception:
-                    pass  # If delete fails, ExifTool will report the error
+                    stale.add(file)  # If delete fails, ExifTool will report the error
         files_to_process.append(file)
 
     if not files_to_process:
-        return 0, skipped_count, 0, 0, []
+        return 0, skipped_count, 0, 0, [], []
 
     if dry_run:
-        return len(files_to_process), skipped_count, 0, 0, []
+        return len(files_to_process), skipped_count, 0, 0, [], []
+
+    with TRACE.span('export_batch', 'batch', files=len(files_to_process), first=str(files_to_process[0])):
+        result = _export_batch(files_to_process, skipped_count, naming)
+    # Existing sidecars were removed above, so any other sidecar now present is new
+    exported = [str(f) for f in files_to_process
+                if f not in stale and sidecar_path(f, naming).exists()]
+    return (*result, exported)
 
+def _export_batch(files_to_process: List[Path], skipped_count: int,
+                  naming: str) -> Tuple[int, int, int, int, List[str]]:
     try:
         # Build ExifTool command based on naming convention
         # -o %d%f.xmp    -> filename.xmp
@@ -264,7 +246,7 @@ def export_metadata_batch(files: List[Path], skip_existing: bool = False,
         for file in files_to_process:
             cmd.append(str(file))
 
-        result = subprocess.run(cmd, capture_output=True, text=True, timeout=300)
+        result = run_exiftool(cmd, len(files_to_process), capture_output=True, text=True, timeout=300)
 
         # Parse success count (ExifTool says "X image files created")
         success_match = re.search(r'(\d+) image files? created', result.stdout)
@@ -294,22 +276,59 @@ def export_metadata_batch(files: List[Path], skip_existing: bool = False,
     except Exception as e:
         return 0, skipped_count, 0, len(files_to_process), [str(e)]
 
+def shared_sidecars(files: List[Path], naming: str) -> Set[Path]:
+    """Sidecar paths claimed by more than one media file (e.g. IMG_1.CR2 + IMG_1.JPG -> IMG_1.xmp)."""
+    claims = Counter(sidecar_path(f, naming) for f in files)
+    return {sidecar for sidecar, count in claims.items() if count > 1}
+
+def record_sidecars(catalog: MediaCatalog, exported: List[str], naming: str, shared: Set[Path]):
+    """Record freshly exported sidecars in the media catalog (for the media file's current identity).
+
+    A shared sidecar was written for only one of its files, and which one is
+    unknown, so it is never recorded.
+    """
+    for path in exported:
+        if sidecar_path(Path(path), naming) in shared:
+            continue
+        try:
+            st = os.stat(path)
+        except OSError:
+            continue
+        catalog.record(path, st, sidecar=str(sidecar_path(Path(path), naming)))
+
 def chunk_list(items: List, chunk_size: int) -> List[List]:
     return [items[i:i + chunk_size] for i in range(0, len(items), chunk_size)]
 
-def export_metadata(directory: str, workers: int, batch_size: int,
+def export_metadata(directory: str, workers: Union[int, str, None], batch_size: Optional[int],
                     skip_existing: bool = False, dry_run: bool = False,
-                    naming: str = 'adobe', verbose: bool = True):
-    """Main export function."""
-
+                    naming: str = 'adobe', verbose: bool = True, storage: Optional[str] = None,
+                    io_order: Optional[str] = None, catalog: Optional[str] = None):
+    """Main export function (workers/batch_size of None come from the storage profile;
+    workers='auto' adapts the worker count to the measured throughput; batches
+    follow io_order, by default the profile's). With a media `catalog` path,
+    files unchanged since their sidecar was exported are left alone."""
+    profile = storage_profile(directory, storage)
+    limiter = worker_limiter("export_workers", workers, profile.workers)
+    workers = 'auto' if limiter.adaptive else limiter.limit
+    batch_size = batch_size or profile.photo_batch
+    if io_order in (None, 'auto'):
+        io_order = profile.io_order
+
+    # Logging starts with the run, not at import
+    log_file = setup_logging("sidecar", log_dir)
     config_filename = save_configuration(directory, workers, batch_size, skip_existing, dry_run, naming)
     log.info(f"Config saved: configs/{config_filename}")
     log.info(f"Log file: logs/{log_file.name}")
     log.info(f"Naming: {naming} ({'filename.xmp' if naming == 'adobe' else 'filename.ext.xmp'})")
     log.info(f"Directory: {directory}")
-    log.info(f"Workers: {workers}")
+    log.info(f"Workers: {limiter.describe()}")
+    log.info(f"Storage: {profile.describe()} (batches: {batch_size} photos, {profile.video_batch} videos)")
+    log.info(f"Throttle: {THROTTLE.describe()}")
+    log.info(f"I/O order: {io_order}")
+    log.info(f"Catalog: {catalog or 'disabled'}")
 
     # Phase 1: Scan
+    METRICS.start_phase("scan")
     photo_files, video_files = find_media_files(directory, verbose)
     all_files = photo_files + video_files
 
@@ -317,16 +336,38 @@ def export_metadata(directory: str, workers: int, batch_size: int,
         print_error("No media files found!")
         return False
 
+    # Files whose sidecar was exported from their current content (and is still there) need no new one
+    catalog = MediaCatalog(Path(catalog)) if catalog else None
+    total_current = 0
+    shared = shared_sidecars(all_files, naming)
+    if shared:
+        log.info(f"{len(shared):,} sidecar names are shared by several files (never up to date)")
+    if catalog and not dry_run:
+        known = catalog.lookup_many(all_files)
+
+        def current(file):
+            record = known.get(str(file))
+            sidecar = sidecar_path(file, naming)
+            return (record is not None and record['sidecar'] == str(sidecar)
+                    and sidecar not in shared and sidecar.exists())
+        photo_files = [f for f in photo_files if not current(f)]
+        video_files = [f for f in video_files if not current(f)]
+        total_current = len(all_files) - len(photo_files) - len(video_files)
+        log.info(f"Catalog: {total_current:,} sidecars up to date")
+
     # Phase 2: Export
-    mode_str = "DRY RUN" if dry_run else f"Workers: {workers}"
+    mode_str = "DRY RUN" if dry_run else f"Workers: {limiter.describe()}"
     if not _quiet_mode:
         print_phase("PHASE 2: Exporting Metadata", mode_str)
+    METRICS.start_phase("export")
 
-    photo_batches = chunk_list(photo_files, batch_size)
-    video_batches = chunk_list(video_files, min(10, batch_size))
+    # Consecutive files in read order, so each ExifTool run sweeps one region of the disk
+    photo_batches = chunk_list(sort_for_io(photo_files, io_order), batch_size)
+    video_batches = chunk_list(sort_for_io(video_files, io_order), min(profile.video_batch, batch_size))
     all_batches = photo_batches + video_batches
 
     if verbose:
+        if total_current: print_info(f"Up to date: {total_current:,} sidecars (files unchanged since export)")
         print_info(f"Batching: {len(photo_batches)} photo batches, {len(video_batches)} video batches")
         if skip_existing: print_info("Skip existing: ON")
         print()
@@ -337,44 +378,56 @@ def export_metadata(directory: str, workers: int, batch_size: int,
     total_errors = 0
     all_errors = []
 
-    with ProcessPoolExecutor(max_workers=workers) as executor:
-        future_to_batch = {
-            executor.submit(export_metadata_batch, batch, skip_existing, dry_run, naming): i
-            for i, batch in enumerate(all_batches, 1)
-        }
-
-        with tqdm(total=len(all_files), desc="  Exporting", unit=" file", disable=_quiet_mode) as pbar:
-            for future in as_completed(future_to_batch):
-                if _shutdown_requested:
-                    executor.shutdown(wait=False, cancel_futures=True)
-                    break
-
-                try:
-                    suc, skip, no_data, err, msgs = future.result()
-                    total_success += suc
-                    total_skipped += skip
-                    total_no_data += no_data
-                    total_errors += err
-                    if msgs: all_errors.extend(msgs)
-
-                    pbar.update(suc + skip + no_data + err)
-                    pbar.set_postfix(ok=total_success, skip=total_skipped, empty=total_no_data, err=total_errors)
+    def submit(batch):
+        THROTTLE.batch(batch[1])  # ExifTool reads only the metadata blocks: files/s only
+        return executor.submit(run_with_metrics, export_metadata_batch, batch[1], skip_existing, dry_run, naming)
 
-                except Exception as e:
-                    batch_idx = future_to_batch[future]
-                    all_errors.append(f"Batch {batch_idx} failed: {e}")
+    try:
+        with ProcessPoolExecutor(max_workers=limiter.maximum) as executor:
+            results = run_adaptive(submit, enumerate(all_batches, 1), limiter, weight=lambda b: len(b[1]))
+
+            with tqdm(total=len(all_files), initial=total_current, desc="  Exporting", unit=" file",
+                      disable=_quiet_mode) as pbar:
+                for (batch_idx, _), future in results:
+                    if _shutdown_requested:
+                        executor.shutdown(wait=False, cancel_futures=True)
+                        break
+
+                    try:
+                        suc, skip, no_data, err, msgs, exported = merge_worker_metrics(future.result())
+                        total_success += suc
+                        total_skipped += skip
+                        total_no_data += no_data
+                        total_errors += err
+                        if msgs: all_errors.extend(msgs)
+                        if catalog:
+                            record_sidecars(catalog, exported, naming, shared)
+
+                        pbar.update(suc + skip + no_data + err)
+                        pbar.set_postfix(ok=total_success, skip=total_skipped, empty=total_no_data, err=total_errors)
+
+                    except Exception as e:
+                        all_errors.append(f"Batch {batch_idx} failed: {e}")
+    finally:
+        if catalog:
+            catalog.close()
 
     # Phase 3: Summary
-    log.info(f"COMPLETE: {total_success:,} exported, {total_skipped:,} skipped, {total_no_data:,} no data, {total_errors:,} errors")
+    log.info(f"COMPLETE: {total_success:,} exported, {total_current:,} up to date, {total_skipped:,} skipped, "
+             f"{total_no_data:,} no data, {total_errors:,} errors")
+    METRICS.finish()
 
     if _quiet_mode:
         if _shutdown_requested: return False
-        print(f"COMPLETE: {total_success}/{len(all_files)} exported, {total_skipped} skipped, {total_no_data} no data, {total_errors} errors")
+        print(f"COMPLETE: {total_success}/{len(all_files)} exported, {total_current} up to date, {total_skipped} skipped, "
+              f"{total_no_data} no data, {total_errors} errors")
         return total_errors == 0
 
     print_phase("SUMMARY")
     print(f"  Total Files:  {len(all_files):,}")
     print(f"  {Fore.GREEN}Exported:     {total_success:,}{Style.RESET_ALL}")
+    if total_current > 0:
+        print(f"  {Fore.GREEN}Up to Date:   {total_current:,} (unchanged since export){Style.RESET_ALL}")
     print(f"  {Fore.YELLOW}Skipped:      {total_skipped:,} (existing){Style.RESET_ALL}")
     if total_no_data > 0:
         print(f"  {Fore.MAGENTA}No Data:      {total_no_data:,} (no metadata to export){Style.RESET_ALL}")
@@ -386,6 +439,8 @@ def export_metadata(directory: str, workers: int, batch_size: int,
     else:
         print(f"  {Fore.GREEN}Errors:       0{Style.RESET_ALL}")
 
+    METRICS.print_summary()
+
     if not dry_run and not _shutdown_requested:
         print()
         print_success("Mission Complete.")
@@ -399,7 +454,7 @@ def get_user_input(prompt: str, default: str = None) -> str:
 
 def interactive_mode():
     print(f"\n{Fore.MAGENTA}{Style.BRIGHT}XMP Sidecar Pro v{__version__}{Style.RESET_ALL}")
-    print(f"{Fore.WHITE}Detected {mp.cpu_count()} CPU cores{Style.RESET_ALL}\n")
+    print(f"{Fore.WHITE}Detected {available_cpus()} CPU cores{Style.RESET_ALL}\n")
 
     # 1. Directory
     while True:
@@ -432,7 +487,7 @@ def interactive_mode():
     dry = get_user_input("Dry run? (y/N)", "n").lower() == 'y'
 
     print()
-    export_metadata(directory, workers, 50, skip, dry, naming)
+    export_metadata(directory, workers, None, skip, dry, naming, catalog=str(default_catalog_path()))
 
 def main():
     signal.signal(signal.SIGINT, signal_handler)
@@ -440,33 +495,74 @@ def main():
     # Convenience: if single argument is a directory, use it directly
     if len(sys.argv) == 2 and os.path.isdir(sys.argv[1]):
         directory = sys.argv[1]
-        workers = get_optimal_workers()
 
         global _quiet_mode
         _quiet_mode = False
 
-        if shutil.which('exiftool') is None:
+        if not check_exiftool():
             print("ERROR: ExifTool not found.")
             sys.exit(1)
 
-        export_metadata(directory, workers, 50, skip_existing=True, dry_run=False, naming='adobe')
+        export_metadata(directory, None, None, skip_existing=True, dry_run=False, naming='adobe',
+                        catalog=str(default_catalog_path()))
         return
 
     parser = argparse.ArgumentParser(description='XMP Sidecar Pro - Export metadata to XMP sidecars')
     parser.add_argument('directory', nargs='?', help='Source directory')
-    parser.add_argument('--workers', '-w', type=int, help='Worker threads')
-    parser.add_argument('--batch-size', '-b', type=int, default=50, help='Batch size')
+    parser.add_argument('--workers', '-w', type=parse_workers,
+                        help="Worker processes, or 'auto' to tune the count while running (default: from the storage profile)")
+    parser.add_argument('--batch-size', '-b', type=int, help='Batch size (default: from the storage profile)')
+    parser.add_argument('--storage-profile', default='auto', metavar='NAME',
+                        help='Tuning profile for workers and batch sizes: auto (detect from the mount), '
+                             'nvme, ssd, hdd, network, default or one from configs/storage_profiles.json')
+    parser.add_argument('--io-order', choices=('auto',) + IO_ORDERS, default='auto',
+                        help='Order files are batched in: walk, inode or physical (FIEMAP); '
+                             'auto follows the storage profile (physical on hdd)')
     parser.add_argument('--skip-existing', '-s', action='store_true', help='Skip existing XMPs')
     parser.add_argument('--dry-run', action='store_true', help='Simulate')
     parser.add_argument('--quiet', '-q', action='store_true', help='Minimal output')
     parser.add_argument('--naming', choices=['adobe', 'ext'], default='adobe',
                         help='Naming: adobe (file.xmp) or ext (file.ext.xmp)')
+    parser.add_argument('--max-files', type=float, metavar='N',
+                        help='Cap on files handed to ExifTool per second')
+    parser.add_argument('--throttle-schedule', metavar='PATH',
+                        help='JSON schedule of time windows with their own caps, e.g. unthrottled 01:00-06:00')
+    parser.add_argument('--nice', type=int, help='CPU nice level for this run and its ExifTool processes (e.g. 10)')
+    parser.add_argument('--idle-io', action='store_true',
+                        help='Idle I/O priority (Linux): only use the disks when nothing else does')
+    parser.add_argument('--catalog', default=str(default_catalog_path()), metavar='PATH',
+                        help='Media catalog shared by all tools; files unchanged since their export are skipped '
+                             '(default: cache/catalog.db in the tools folder, or $MEDIA_TOOLS_CATALOG)')
+    parser.add_argument('--no-catalog', dest='catalog', action='store_const', const=None,
+                        help='Neither read nor update the media catalog')
+    parser.add_argument('--metrics', metavar='PATH',
+                        help='Write per-phase metrics at exit (.prom = Prometheus textfile, else JSON)')
+    parser.add_argument('--trace', metavar='PATH',
+                        help='Write a Chrome trace-event timeline of batches and ExifTool runs (open in ui.perfetto.dev)')
 
     args = parser.parse_args()
 
     _quiet_mode = args.quiet
 
-    if shutil.which('exiftool') is None:
+    if args.storage_profile != 'auto' and args.storage_profile not in storage_profile_names():
+        parser.error(f"unknown storage profile '{args.storage_profile}' "
+                     f"(available: auto, {', '.join(storage_profile_names())})")
+
+    if args.max_files is not None and args.max_files <= 0:
+        parser.error("--max-files must be positive")
+    try:
+        schedule = load_throttle_schedule(args.throttle_schedule) if args.throttle_schedule else None
+    except ValueError as e:
+        parser.error(str(e))
+    THROTTLE.configure(files_per_s=args.max_files, schedule=schedule)
+    set_process_priority(args.nice, args.idle_io)
+
+    if args.metrics:
+        METRICS.export_at_exit(args.metrics, 'sidecar')
+    if args.trace:
+        TRACE.save_at_exit(args.trace, 'sidecar')
+
+    if not check_exiftool():
         print("ERROR: ExifTool not found.")
         sys.exit(1)
 
@@ -476,9 +572,9 @@ def main():
         except KeyboardInterrupt:
             print("\nCancelled.")
     else:
-        workers = args.workers or get_optimal_workers()
-        export_metadata(args.directory, workers, args.batch_size,
-                       args.skip_existing, args.dry_run, args.naming)
+        export_metadata(args.directory, args.workers, args.batch_size,
+                       args.skip_existing, args.dry_run, args.naming, storage=args.storage_profile,
+                       io_order=args.io_order, catalog=args.catalog)
 
 if __name__ == '__main__':
     mp.freeze_support()